@@ -0,0 +1,12 @@
+"""
+Benchmarks and multi-process harnesses, kept out of the application
+package. Each module runs on its own from the repository root:
+
+    python -m benchmarks.content_repository [docs] [scratch_db]
+    python -m benchmarks.quran_service [requests] [concurrency]
+    python -m benchmarks.quran_search [queries]
+    python -m benchmarks.search <scratch_db> [docs]
+    python -m benchmarks.timezone_service [requests]
+    python -m benchmarks.ws_backplane [workers] [messages]
+    python -m benchmarks.ws_manager [sockets] [messages]
+"""
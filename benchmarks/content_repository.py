@@ -0,0 +1,125 @@
+"""
+Content listings: list validation, page fetching and listing totals.
+
+    python -m benchmarks.content_repository [docs] [scratch_db]
+
+always times list validation for each content type, per-document against
+batched. With `scratch_db` it also seeds `docs` hadiths into that database
+on the configured server (never the app's own MONGODB_DB_NAME) and times
+  - walking every page with skip/limit against keyset cursors, and reading
+    the last page each way
+  - listing totals: count_documents against count_cached, unfiltered
+    (estimated count) and filtered (memoized exact count)
+The seeded collection is dropped afterwards.
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from src.config import settings
+from src.utils import article, dua, hadith
+from src.utils.content_repository import category_filter, sanitize_category
+
+PAGE_SIZE = 20
+
+
+def bench_validation(docs: int):
+    samples = {
+        dua.repo: lambda i: {"title": f"Dua {i}", "arabic": "رَبَّنَا آتِنَا", "translation": "Our Lord, give us", "category_id": "undefined" if i % 7 == 0 else str(ObjectId())},
+        hadith.repo: lambda i: {"arabic": "إِنَّمَا الْأَعْمَالُ", "translation": "Actions are by intentions", "narrator": "Umar", "book": "Bukhari", "number": str(i)},
+        article.repo: lambda i: {"title": f"Article {i}", "content": "lorem ipsum " * 50, "author": "Editor", "category_id": str(ObjectId())},
+    }
+    now = datetime.utcnow()
+    print("list validation")
+    for repo, make in samples.items():
+        rows = [{"_id": ObjectId(), "view_count": i, "created_at": now, "updated_at": now, **make(i)} for i in range(docs)]
+
+        start = time.perf_counter()
+        per_doc = [repo.model(**sanitize_category(dict(row))) for row in rows]
+        before = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = repo.validate_many([dict(row) for row in rows])
+        after = time.perf_counter() - start
+
+        assert [m.model_dump() for m in per_doc] == [m.model_dump() for m in batched]
+        print(f"  {repo.collection:9s} {docs} docs  per-document: {before * 1000:7.1f} ms  batched: {after * 1000:7.1f} ms  ({before / after:.1f}x)")
+
+
+async def timed(run, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = await run()
+    return (time.perf_counter() - start) / repeat, result
+
+
+async def bench_listing(scratch_db: str, docs: int):
+    if scratch_db == settings.MONGODB_DB_NAME:
+        raise ValueError(f"{scratch_db} is the app's database; pass a scratch database name")
+    client = AsyncIOMotorClient(settings.DATABASE_URL)
+    db = client[scratch_db]
+    repo = hadith.repo
+    collection = db[repo.collection]
+    categories = [str(ObjectId()) for _ in range(10)]
+    try:
+        await collection.drop()
+        now = datetime.utcnow()
+        for start in range(0, docs, 10000):
+            await collection.insert_many([
+                {
+                    "arabic": "إِنَّمَا الْأَعْمَالُ",
+                    "translation": "Actions are by intentions",
+                    "narrator": "Umar",
+                    "book": "Bukhari",
+                    "number": str(i),
+                    "category_id": categories[i % len(categories)],
+                    "created_at": now - timedelta(seconds=i),
+                }
+                for i in range(start, min(start + 10000, docs))
+            ])
+        # The indexes database.init_db creates for listings
+        await collection.create_index([("created_at", 1), ("_id", 1)])
+        await collection.create_index([("category_id", 1), ("_id", 1)])
+        pages = -(-docs // PAGE_SIZE)
+        print(f"paging: {docs} hadiths, {pages} pages of {PAGE_SIZE}, newest first")
+
+        def page_at(page=1, cursor=None):
+            return repo.paginate(db, page, PAGE_SIZE, "created_at", "desc", None, None, None, cursor)
+
+        start = time.perf_counter()
+        for page in range(1, pages + 1):
+            await page_at(page)
+        offset_walk = time.perf_counter() - start
+
+        cursor, last_cursor = None, None
+        start = time.perf_counter()
+        for _ in range(pages):
+            last_cursor = cursor
+            _, _, cursor = await page_at(cursor=cursor)
+        cursor_walk = time.perf_counter() - start
+        print(f"  every page   skip/limit: {offset_walk * 1000:9.1f} ms  cursor: {cursor_walk * 1000:9.1f} ms")
+
+        offset_last, _ = await timed(lambda: page_at(pages), repeat=5)
+        cursor_last, _ = await timed(lambda: page_at(cursor=last_cursor), repeat=5)
+        print(f"  last page    skip/limit: {offset_last * 1000:9.2f} ms  cursor: {cursor_last * 1000:9.2f} ms")
+
+        print("listing totals (mean of 20 calls)")
+        filtered = {"category_id": category_filter(categories[0])}
+        exact_all, total = await timed(lambda: collection.count_documents({}), repeat=20)
+        cached_all, _ = await timed(lambda: repo.count_cached(db), repeat=20)
+        print(f"  unfiltered   count_documents: {exact_all * 1000:8.2f} ms  count_cached: {cached_all * 1000:8.2f} ms  ({total} docs)")
+        exact_one, total = await timed(lambda: collection.count_documents(filtered), repeat=20)
+        cached_one, _ = await timed(lambda: repo.count_cached(db, category_id=categories[0]), repeat=20)
+        print(f"  by category  count_documents: {exact_one * 1000:8.2f} ms  count_cached: {cached_one * 1000:8.2f} ms  ({total} docs)")
+    finally:
+        await collection.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    docs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    bench_validation(docs)
+    if len(sys.argv) > 2:
+        asyncio.run(bench_listing(sys.argv[2], docs))
@@ -0,0 +1,55 @@
+"""
+Quran search index: build time and query latency by query kind, over the
+imported corpus (or a synthetic one when none is imported).
+
+    python -m benchmarks.quran_search [queries]
+"""
+import random
+import sys
+import time
+from src.config import settings
+from src.services.quran_corpus import load_corpus
+from src.services.quran_search import QuranSearchIndex
+
+
+def synthetic_verses(count: int = 6236, vocabulary: int = 8000):
+    """Verses over a Zipf-distributed vocabulary, roughly the corpus' shape"""
+    rng = random.Random(0)
+    common = "in the name of allah most gracious merciful praise lord worlds day guide path mercy".split()
+    words = common + ["".join(rng.choice("abdefhiklmnorstuwy") for _ in range(rng.randint(3, 9))) for _ in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    arabic = "بسم الله الرحمن الرحيم الحمد لله رب العالمين مالك يوم الدين اياك نعبد واياك نستعين".split()
+    for i in range(count):
+        yield {
+            "verse_key": f"{i // 50 + 1}:{i % 50 + 1}",
+            "text_qpc_hafs": " ".join(rng.choice(arabic) for _ in range(rng.randint(5, 30))),
+            "translations": {"en": [{"text": " ".join(rng.choices(words, weights, k=rng.randint(10, 60)))}]},
+        }
+
+
+def bench(queries: int = 2000):
+    corpus = load_corpus(settings.QURAN_CORPUS_DIR)
+    start = time.perf_counter()
+    index = QuranSearchIndex.build(corpus.iter_verses() if corpus else synthetic_verses())
+    print(f"{len(index)} verses ({'corpus' if corpus else 'synthetic'}), {len(index.terms)} terms, built in {time.perf_counter() - start:.2f} s")
+
+    mix = {
+        "term": ["mercy", "lord", "الرحمن", "guide"],
+        "multi-term": ["most gracious merciful", "straight path", "الحمد لله رب"],
+        "prefix": ["mer*", "wor*", "ال*", "s*"],
+        "phrase": ['"lord of the worlds"', '"the straight path"', '"بسم الله"'],
+    }
+    for kind, samples in mix.items():
+        latencies = []
+        for i in range(queries):
+            start = time.perf_counter()
+            index.search(samples[i % len(samples)])
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+        print(f"  {kind:10s} p50 {p50 * 1000:7.2f} ms  p99 {p99 * 1000:7.2f} ms")
+
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
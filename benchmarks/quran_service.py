@@ -0,0 +1,84 @@
+"""
+Upstream HTTP client: a client per call against the shared pooled client.
+
+    python -m benchmarks.quran_service [requests] [concurrency]
+"""
+import asyncio
+import logging
+import sys
+import time
+from typing import List
+import httpx
+from src.services import quran_service
+
+
+async def stub_upstream(handshake: float, latency: float):
+    """Local HTTP/1.1 keep-alive server standing in for api.quran.com: each new
+    connection costs `handshake` seconds (TCP+TLS round trips), each request `latency`"""
+    body = b'{"data": []}'
+    response = (
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+        b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+    )
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        await asyncio.sleep(handshake)
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                await asyncio.sleep(latency)
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def bench(requests: int = 500, concurrency: int = 20, handshake: float = 0.03, latency: float = 0.005):
+    """Time upstream calls against a local stub, opening a client per call (as
+    every helper used to) against the shared pooled client"""
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    server = await stub_upstream(handshake, latency)
+    url = "http://127.0.0.1:%d/chapters" % server.sockets[0].getsockname()[1]
+    gate = asyncio.Semaphore(concurrency)
+
+    async def per_call():
+        async with httpx.AsyncClient() as client:
+            return await client.get(url)
+
+    async def pooled():
+        return await quran_service.get_http_client().get(url)
+
+    async def run(call) -> List[float]:
+        latencies = []
+
+        async def one():
+            async with gate:
+                start = time.perf_counter()
+                (await call()).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return sorted(latencies)
+
+    try:
+        print(f"{requests} requests, {concurrency} concurrent, stub handshake {handshake * 1000:.0f} ms, latency {latency * 1000:.0f} ms")
+        for label, call in (("client per call", per_call), ("pooled client", pooled)):
+            start = time.perf_counter()
+            latencies = await run(call)
+            elapsed = time.perf_counter() - start
+            p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+            print(f"  {label:16s} p50 {p50 * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms  {requests / elapsed:7.0f} req/s")
+    finally:
+        await quran_service.close_http_client()
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    ))
@@ -0,0 +1,95 @@
+"""
+Content search: the old unescaped regex `$or` against the text index, over
+a synthetic hadith collection.
+
+    python -m benchmarks.search <scratch_db> [docs]
+
+seeds `docs` items (default 100000) into a collection of `scratch_db` on
+the configured server, and drops that collection afterwards. The scratch
+database must be named explicitly and may not be the app's own
+MONGODB_DB_NAME.
+"""
+import asyncio
+import random
+import sys
+import time
+from typing import Sequence
+from motor.motor_asyncio import AsyncIOMotorClient
+from src.config import settings
+from src.utils.search import SCORE, TEXT_INDEXES, text_filter
+
+WORDS = (
+    "allah mercy forgiveness lord guidance patience prayer fasting charity parents "
+    "knowledge travel sleep morning evening protection rizq health family repentance "
+    "gratitude paradise light heart peace faith trust intention night journey"
+).split()
+ARABIC = "رَبَّنَا آتِنَا فِي الدُّنْيَا حَسَنَةً اللَّهُمَّ اغْفِرْ لِي إِنَّمَا الْأَعْمَالُ بِالنِّيَّاتِ سُبْحَانَ رَبِّيَ الْعَظِيمِ".split()
+NARRATORS = ["Umar", "Abu Hurairah", "Aisha", "Anas ibn Malik", "Ibn Abbas"]
+BOOKS = ["Bukhari", "Muslim", "Tirmidhi", "Abu Dawud", "Nasai"]
+QUERIES = ("mercy", "abu hurairah", "اللهم", "forgiveness parents", "forgiv")
+
+
+def bench_doc(rng: random.Random) -> dict:
+    words = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+    return {
+        "arabic": " ".join(rng.choice(ARABIC) for _ in range(12)),
+        "translation": words(40),
+        "narrator": rng.choice(NARRATORS),
+        "book": rng.choice(BOOKS),
+    }
+
+
+async def timed(label: str, run, repeat: int = 5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        found = await run()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:6s} {elapsed * 1000:8.1f} ms  ({found} hits)")
+
+
+async def bench(scratch_db: str, docs: int = 100000, queries: Sequence[str] = QUERIES):
+    if scratch_db == settings.MONGODB_DB_NAME:
+        raise ValueError(f"{scratch_db} is the app's database; pass a scratch database name")
+    client = AsyncIOMotorClient(settings.DATABASE_URL)
+    collection = client[scratch_db]["search_bench_hadiths"]
+    weights = TEXT_INDEXES["hadiths"]
+    try:
+        await collection.drop()
+        rng = random.Random(0)
+        for start in range(0, docs, 10000):
+            await collection.insert_many([bench_doc(rng) for _ in range(min(10000, docs - start))])
+        await collection.create_index(
+            [(field, "text") for field in weights],
+            weights=weights,
+            default_language="none",
+            language_override="text_language",
+        )
+        print(f"{docs} documents in {scratch_db}")
+        for q in queries:
+            # The query the endpoints used to build, unescaped as it was
+            regex = {"$or": [{field: {"$regex": q, "$options": "i"}} for field in weights]}
+
+            async def regex_count():
+                return await collection.count_documents(regex)
+
+            async def text_count():
+                return await collection.count_documents(text_filter(q))
+
+            async def top50():
+                cursor = collection.find(text_filter(q), {"_id": 1, **SCORE}).sort([("score", SCORE["score"])])
+                return len(await cursor.limit(50).to_list(None))
+
+            print(f"{q!r}")
+            await timed("regex", regex_count)
+            await timed("text", text_count)
+            await timed("top50", top50)
+    finally:
+        await collection.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python -m benchmarks.search <scratch_db> [docs]")
+        sys.exit(1)
+    asyncio.run(bench(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 100000))
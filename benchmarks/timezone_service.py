@@ -0,0 +1,52 @@
+"""
+/prayers/times throughput with a fresh TimezoneFinder per call against the
+per-cell timezone cache.
+
+    python -m benchmarks.timezone_service [requests]
+"""
+import asyncio
+import random
+import sys
+import time
+import pytz
+from timezonefinder import TimezoneFinder
+from src.config import settings
+from src.services import prayer_service
+from src.services.timezone_service import FALLBACK_TIMEZONE, cache_info, get_timezone
+
+
+def bench(requests: int = 2000, locations: int = 200):
+    rng = random.Random(42)
+    cities = [(c["lat"], c["lon"]) for c in settings.MAJOR_CITIES]
+    points = [
+        (lat + rng.uniform(-0.05, 0.05), lon + rng.uniform(-0.05, 0.05))
+        for lat, lon in (rng.choice(cities) for _ in range(locations))
+    ]
+
+    def uncached(lat, lon):
+        tz_str = TimezoneFinder().timezone_at(lat=lat, lng=lon) or FALLBACK_TIMEZONE
+        return pytz.timezone(tz_str)
+
+    async def run(resolver) -> float:
+        prayer_service.get_timezone = resolver
+        for lat, lon in points:  # fill the prayer caches so only timezone work differs
+            await prayer_service.get_prayer_times(lat, lon)
+        start = time.perf_counter()
+        for i in range(requests):
+            await prayer_service.get_prayer_times(*points[i % len(points)])
+        return requests / (time.perf_counter() - start)
+
+    original = prayer_service.get_timezone
+    try:
+        before = asyncio.run(run(uncached))
+        after = asyncio.run(run(get_timezone))
+    finally:
+        prayer_service.get_timezone = original
+    print(f"/prayers/times  fresh TimezoneFinder: {before:10.0f} req/s")
+    print(f"/prayers/times  cached cells:         {after:10.0f} req/s  ({after / before:.1f}x)")
+    print(f"timezone cache: {cache_info()}")
+
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
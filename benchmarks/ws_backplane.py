@@ -0,0 +1,72 @@
+"""
+Multi-process check of MongoBackplane: every worker publishes `messages`
+messages and must receive every other worker's, through a scratch capped
+collection next to the app's own.
+
+    python -m benchmarks.ws_backplane [workers] [messages]
+"""
+import asyncio
+import logging
+import multiprocessing
+import sys
+from src import database
+from src.config import settings
+from src.utils.ws_backplane import MongoBackplane
+
+HARNESS_COLLECTION = f"{settings.WS_BACKPLANE_COLLECTION}_harness"
+
+
+async def harness_worker(index: int, workers: int, messages: int, barrier, results):
+    await database.connect_to_mongo()
+    backplane = MongoBackplane(HARNESS_COLLECTION, settings.WS_BACKPLANE_SIZE_BYTES)
+    received = []
+
+    async def deliver(channel, message):
+        received.append((channel, message))
+
+    backplane.bind(deliver)
+    await backplane.start()
+    await asyncio.to_thread(barrier.wait)
+    for i in range(messages):
+        await backplane.publish(f"room:harness-{index}", {"from": index, "seq": i})
+    await asyncio.sleep(2)
+    await backplane.stop()
+    await database.disconnect_from_mongo()
+    remote = sum(1 for _, m in received if m["from"] != index)
+    results.put((index, len(received), remote))
+
+
+def run_harness_worker(*args):
+    asyncio.run(harness_worker(*args))
+
+
+def run_harness(workers: int = 3, messages: int = 100) -> bool:
+    """Spawn `workers` processes that publish to each other through MongoDB"""
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=run_harness_worker, args=(i, workers, messages, barrier, results))
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    ok = True
+    expected_remote = (workers - 1) * messages
+    for _ in procs:
+        index, total, remote = results.get(timeout=60)
+        passed = remote == expected_remote and total == workers * messages
+        ok = ok and passed
+        print(f"worker {index}: {total} delivered, {remote}/{expected_remote} from other workers {'ok' if passed else 'FAILED'}")
+    for p in procs:
+        p.join()
+    return ok
+
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    sys.exit(0 if run_harness(workers, messages) else 1)
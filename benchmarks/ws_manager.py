@@ -0,0 +1,81 @@
+"""
+WebSocket fan-out: p50/p99 delivery latency for one room, comparing
+sequential sends with per-socket outboxes. Broadcasts are scheduled every
+`interval` seconds and latency counts from the scheduled time, so a blocked
+sender shows up.
+
+    python -m benchmarks.ws_manager [sockets] [messages]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+from src.utils.ws_manager import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self, slow: bool, slow_delay: float):
+        self.slow = slow
+        self.slow_delay = slow_delay
+        self.latencies = []
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.slow_delay if self.slow else 0)
+        message = json.loads(text)
+        if "sent_at" in message.get("data", {}):
+            self.latencies.append(time.perf_counter() - message["data"]["sent_at"])
+
+    async def send_json(self, message):
+        # What Starlette does: encode for this one socket, then send text
+        await self.send_text(json.dumps(message, separators=(",", ":"), ensure_ascii=False))
+
+
+def report(label, conns):
+    fast = sorted(l for c in conns if not c.slow for l in c.latencies)
+    p99 = fast[int(len(fast) * 0.99) - 1] if fast else float("nan")
+    print(f"{label:<22} fast clients: p50 {statistics.median(fast) * 1000:9.1f} ms  p99 {p99 * 1000:9.1f} ms  ({len(fast)} deliveries)")
+
+
+async def bench(sockets: int = 1000, slow_ratio: float = 0.05, messages: int = 20, slow_delay: float = 0.02, interval: float = 0.05):
+    async def scheduled(i, start):
+        at = start + i * interval
+        await asyncio.sleep(max(at - time.perf_counter(), 0))
+        return {"event": "receive_message", "data": {"sent_at": at}}
+
+    slow_every = round(1 / slow_ratio)
+    conns = [FakeSocket(i % slow_every == 0, slow_delay) for i in range(sockets)]
+
+    # Before: each broadcast awaited every socket in turn
+    start = time.perf_counter()
+    for i in range(messages):
+        message = await scheduled(i, start)
+        for conn in conns:
+            await conn.send_json(message)
+    report("sequential send_json", conns)
+
+    conns = [FakeSocket(i % slow_every == 0, slow_delay) for i in range(sockets)]
+    manager = ConnectionManager()
+    for conn in conns:
+        await manager.connect("bench", conn)
+    start = time.perf_counter()
+    for i in range(messages):
+        await manager.broadcast_room("bench", await scheduled(i, start))
+    while any(o.queue for o in manager.outboxes.values() if not o.websocket.slow):
+        await asyncio.sleep(0.01)
+    report("per-socket outboxes", conns)
+    for conn in conns:
+        manager.disconnect("bench", conn)
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(
+        sockets=int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        messages=int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    ))
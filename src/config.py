@@ -52,5 +52,61 @@ class Settings(BaseSettings):
         {"name": "London", "lat": 51.5074, "lon": -0.1278},
         {"name": "New York", "lat": 40.7128, "lon": -74.0060},
     ]
+    # In-memory response cache (src/utils/cache.py)
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    # Shared upstream HTTP client for api.quran.com
+    QURAN_HTTP_MAX_CONNECTIONS: int = 100
+    QURAN_HTTP_MAX_KEEPALIVE: int = 20
+    QURAN_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    QURAN_HTTP_TIMEOUT: float = 15.0
+    QURAN_HTTP_CONNECT_TIMEOUT: float = 5.0
+    QURAN_HTTP2: bool = True
+    QURAN_TAFSIR_CONCURRENCY: int = 10
+    # Concurrent by_chapter page fetches when hydrating search hits
+    QURAN_CHUNK_CONCURRENCY: int = 10
+    # Persistent (Mongo) tier for tafsir, timestamps, chapters and translations
+    QURAN_PERSISTENT_CACHE_DAYS: int = 30
+    QURAN_CACHE_WARM_KINDS: List[str] = ["timestamps", "chapters", "translations"]
+    # Offline corpus built with `python -m src.services.quran_corpus import`
+    QURAN_CORPUS_DIR: str = str(BASE_DIR / "data" / "quran_corpus")
+    QURAN_TIMINGS_DIR: str = str(BASE_DIR / "data" / "recitation_timings")
+    QURAN_SEARCH_SNAPSHOT: str = str(BASE_DIR / "data" / "quran_corpus_search.pkl")
+    # Timezone lookups are memoized per grid cell of this size (~1 km)
+    TIMEZONE_CELL_DEGREES: float = 0.01
+    TIMEZONE_CACHE_SIZE: int = 65536
+    # Prayer times are cached per grid cell; 0.01 deg (~1 km) moves times by seconds
+    PRAYER_CELL_DEGREES: float = 0.01
+    PRAYER_CACHE_MAX_ENTRIES: int = 20000
+    PRAYER_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # WebSocket fan-out across workers: "memory" (single worker) or "mongo"
+    WS_BACKPLANE: str = "memory"
+    WS_BACKPLANE_COLLECTION: str = "ws_backplane"
+    WS_BACKPLANE_SIZE_BYTES: int = 16 * 1024 * 1024
+    # Per-connection outbound queue; overflowing it or a send slower than the
+    # timeout evicts the client
+    WS_OUTBOX_SIZE: int = 256
+    WS_SEND_TIMEOUT: float = 10.0
+    # Admin presence: offline is announced only after this quiet period
+    PRESENCE_DEBOUNCE: float = 5.0
+    PRESENCE_HEARTBEAT: float = 30.0
+    # Notification fan-out: insert_many batch size, and the recipient count
+    # above which the admin endpoint hands the work to a background job
+    NOTIFICATION_BATCH_SIZE: int = 1000
+    NOTIFICATION_JOB_THRESHOLD: int = 500
+    # A running job whose heartbeat is older than this is marked failed
+    NOTIFICATION_JOB_STALE_AFTER: float = 600.0
+    # Seconds between recounts of view/favorite counters from the event logs (0 disables)
+    COUNTER_RECONCILE_INTERVAL: float = 86400.0
+    # Write-behind view counting: flush every N seconds (0 writes each view
+    # through) or once N views are pending; these bound lag and crash loss
+    VIEW_FLUSH_INTERVAL: float = 5.0
+    VIEW_FLUSH_MAX_PENDING: int = 1000
+    # Fraction of views also recorded as raw events for analytics
+    VIEW_EVENT_SAMPLE_RATE: float = 1.0
+    # Seconds a filtered dua/hadith/article total is reused before recounting
+    CONTENT_COUNT_CACHE_TTL: float = 60.0
+    # Seconds a ranked text search result is reused (src/utils/search.py)
+    SEARCH_CACHE_TTL: float = 60.0
 
 settings = Settings()
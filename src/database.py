@@ -1,6 +1,7 @@
 import motor.motor_asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from src.config import settings
+from src.utils import search
 from typing import Optional
 import logging
 
@@ -61,6 +62,7 @@ async def init_db() -> None:
         'hadith_favorites': [('hadith_id', False), ('user_id', False)],
         'article_views': [('article_id', False), ('user_id', False)],
         'article_favorites': [('article_id', False), ('user_id', False)],
+        'conversations': [('updated_at', False), ('user_id', False)],
     }
     
     for collection_name, indexes in collections_to_create.items():
@@ -77,4 +79,35 @@ async def init_db() -> None:
         except Exception as e:
             logger.warning(f"Index creation warning for {collection_name}: {e}")
     
+    for collection_name in ("duas", "hadiths", "articles"):
+        try:
+            # Keyset pagination: each listing filter/sort continues on (field, _id)
+            for field in ("category_id", "featured", "created_at"):
+                await db[collection_name].create_index([(field, 1), ("_id", 1)])
+        except Exception as e:
+            logger.warning(f"Index creation warning for {collection_name}: {e}")
+    
+    # Content and name search (src/utils/search.py)
+    await search.create_text_indexes(db)
+    
+    try:
+        # Keyset pagination of a conversation's history walks this index
+        await db["messages"].create_index([("conversation_id", 1), ("_id", 1)])
+    except Exception as e:
+        logger.warning(f"Index creation warning for messages: {e}")
+    
+    try:
+        # Finished notification fan-out jobs are only kept for a week
+        await db["notification_jobs"].create_index("created_at", expireAfterSeconds=7 * 86400)
+    except Exception as e:
+        logger.warning(f"Index creation warning for notification_jobs: {e}")
+    
+    try:
+        # Persistent upstream cache tier: Mongo drops documents once expires_at passes
+        upstream_cache = db["upstream_cache"]
+        await upstream_cache.create_index("expires_at", expireAfterSeconds=0)
+        await upstream_cache.create_index("kind")
+    except Exception as e:
+        logger.warning(f"Index creation warning for upstream_cache: {e}")
+    
     logger.info("✅ Database initialization complete")
\ No newline at end of file
@@ -52,6 +52,12 @@ from src.routers import (
     donations,
 )
 from src.services.prayer_service import get_prayer_times, DEFAULT_LAT, DEFAULT_LON
+from src.services import quran_service, quran_corpus, quran_search, recitation_timings, timezone_service
+from src.utils.cache import clear_expired_cache
+from src.utils.notifications import fail_stale_jobs
+from src.utils import counters, upstream_cache
+from src.utils.ws_manager import manager as ws_manager
+from src.utils.ws_backplane import create_backplane
 from fastapi.responses import JSONResponse
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -69,6 +75,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors travel in headers on list endpoints
+    expose_headers=["X-Next-Cursor", "X-Has-More"],
 )
 @app.middleware("http")
 async def log_exceptions(request, call_next):
@@ -122,15 +130,44 @@ async def on_startup():
     try:
         await database.connect_to_mongo()
         await database.init_db()
+        stale = await fail_stale_jobs(database.db)
+        if stale:
+            logging.warning(f"Marked {stale} stale notification job(s) as failed")
+        if settings.COUNTER_RECONCILE_INTERVAL > 0:
+            asyncio.create_task(counters.run_reconciler(database.db))
+        if settings.VIEW_FLUSH_INTERVAL > 0:
+            counters.views.start(database.db)
+        if settings.WS_BACKPLANE != "memory":
+            await ws_manager.use_backplane(create_backplane(settings.WS_BACKPLANE))
+    except Exception as e:
+        logging.exception(f"Startup error: {e}")
+    # Local Quran data is optional: without it verses come from the upstream
+    # API and search falls back to the regex path
+    try:
+        corpus = quran_corpus.load_corpus(settings.QURAN_CORPUS_DIR)
+        recitation_timings.load_stores(settings.QURAN_TIMINGS_DIR, [quran_service.MISHARY_RECITER_ID])
+        await asyncio.to_thread(quran_search.load_or_build_index, corpus, settings.QURAN_SEARCH_SNAPSHOT)
+    except Exception as e:
+        logging.exception(f"Local Quran data unavailable, using the upstream API: {e}")
+    try:
+        await quran_service.init_http_client()
+        await quran_service.warm_caches()
+        await asyncio.to_thread(timezone_service.warm)
         data = await get_prayer_times(DEFAULT_LAT, DEFAULT_LON)
         logging.info(f"Preloaded next prayer: {data['next_prayer']['name']} at {data['next_prayer']['time']}")
     except Exception as e:
         logging.exception(f"Startup error: {e}")
+    asyncio.create_task(clear_expired_cache())
     logging.info("API Startup complete.")
 
 @app.on_event("shutdown")
 async def on_shutdown():
     logging.info("Shutting down Focus Flow API...")
+    await upstream_cache.flush()
+    await counters.views.stop()
+    await ws_manager.close()
+    await quran_service.close_http_client()
+    quran_corpus.close_corpus()
     await database.disconnect_from_mongo()
 
 def silence_asyncio_connection_reset(loop, context):
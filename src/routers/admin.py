@@ -6,6 +6,7 @@ from datetime import datetime
 from ..database import get_db
 from ..utils.users import get_password_hash, get_current_user
 from ..models.mongo_models import convert_objectid_to_str
+from ..utils.search import literal_regex
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -29,9 +30,11 @@ async def list_regular_users(
 ):
     filters = {}
     if search:
+        # Substring match as before, with the input escaped so it is
+        # matched literally rather than run as a regex
         filters["$or"] = [
-            {"username": {"$regex": search, "$options": "i"}},
-            {"email": {"$regex": search, "$options": "i"}}
+            {"username": literal_regex(search)},
+            {"email": literal_regex(search)}
         ]
     
     if role:
@@ -1,5 +1,5 @@
 """Articles API Router"""
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, Form, File, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, Form, File, status
 from typing import List, Optional, Dict, Any
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
@@ -30,8 +30,8 @@ async def list_articles(db: AsyncIOMotorDatabase = Depends(get_db)):
     articles = await crud_article.get_all_articles(db)
     article_ids = [article.id for article in articles]
     
-    views_map = await crud_article.get_views_bulk(db, article_ids)
-    favorites_map = await crud_article.get_favorites_bulk(db, article_ids)
+    # Counters live on the documents already loaded
+    views_map, favorites_map = crud_article.repo.counts_of(articles)
 
     articles_with_counts = []
     for article in articles:
@@ -45,6 +45,7 @@ async def list_articles(db: AsyncIOMotorDatabase = Depends(get_db)):
 
 @router.get("/articles/paginated", response_model=None)
 async def list_articles_paginated(
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     sort_by: str = Query("_id"),
@@ -52,16 +53,22 @@ async def list_articles_paginated(
     q: Optional[str] = None,
     category_id: Optional[str] = None,
     featured: Optional[bool] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces page"),
     current_user: Optional[dict] = Depends(get_optional_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Get paginated articles with filtering"""
-    articles, article_ids = await crud_article.get_paginated_articles(
-        db, page, limit, sort_by, sort_order, q, category_id, featured
-    )
+    """Get paginated articles with filtering; the next page's cursor is in X-Next-Cursor"""
+    try:
+        articles, article_ids, next_cursor = await crud_article.get_paginated_articles(
+            db, page, limit, sort_by, sort_order, q, category_id, featured, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    views_map = await crud_article.get_views_bulk(db, article_ids)
-    favorites_map = await crud_article.get_favorites_bulk(db, article_ids)
+    # Counters live on the documents already loaded
+    views_map, favorites_map = crud_article.repo.counts_of(articles)
 
     user_favorites_set = set()
     if current_user:
@@ -105,8 +112,8 @@ async def get_articles_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
     total_articles = len(all_articles)
     article_ids = [article.id for article in all_articles]
 
-    views_map = await crud_article.get_views_bulk(db, article_ids)
-    favorites_map = await crud_article.get_favorites_bulk(db, article_ids)
+    # Counters live on the documents already loaded
+    views_map, favorites_map = crud_article.repo.counts_of(all_articles)
 
     articles_with_counts = []
     for article in all_articles:
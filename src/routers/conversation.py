@@ -5,9 +5,15 @@ from datetime import datetime
 from ..database import get_db
 from ..schemas.conversation import ConversationCreate, ConversationOut
 from ..utils.users import get_current_user
+from ..utils.conversations import last_message_fields, user_summary
 
 router = APIRouter(prefix="/api/conversations", tags=["Conversations"])
 
+INBOX_PROJECTION = {
+    "user_id": 1, "user_email": 1, "user_name": 1, "status": 1, "created_at": 1, "updated_at": 1,
+    "last_message": 1, "last_message_at": 1, "last_sender_type": 1, "unread_count": 1,
+}
+
 
 @router.get("", response_model=None)
 async def list_conversations(
@@ -18,35 +24,31 @@ async def list_conversations(
     if current_user.get("role", "user") != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
 
+    # Everything the inbox shows is denormalized onto the conversation
+    # (see utils/conversations.py), so this is one query on updated_at
     conversations_collection = db["conversations"]
-    messages_collection = db["messages"]
-    users_collection = db["users"]
-
     cursor = (
-        conversations_collection.find({})
+        conversations_collection.find({}, INBOX_PROJECTION)
         .sort("updated_at", -1)
         .limit(limit)
     )
     convs = await cursor.to_list(length=limit)
-    result = []
-    for conv in convs:
-        user = await users_collection.find_one({"_id": conv.get("user_id")})
-        last_msg = await messages_collection.find_one(
-            {"conversation_id": conv["_id"]}, sort=[("created_at", -1)]
-        )
-        result.append(
-            {
-                "id": str(conv["_id"]),
-                "user_id": str(conv.get("user_id")),
-                "user_email": user.get("email") if user else None,
-                "user_name": user.get("username") or user.get("full_name") if user else None,
-                "status": conv.get("status"),
-                "created_at": conv.get("created_at"),
-                "updated_at": conv.get("updated_at"),
-                "last_message": last_msg.get("message_text") if last_msg else None,
-            }
-        )
-    return result
+    return [
+        {
+            "id": str(conv["_id"]),
+            "user_id": str(conv.get("user_id")),
+            "user_email": conv.get("user_email"),
+            "user_name": conv.get("user_name"),
+            "status": conv.get("status"),
+            "created_at": conv.get("created_at"),
+            "updated_at": conv.get("updated_at"),
+            "last_message": conv.get("last_message"),
+            "last_message_at": conv.get("last_message_at"),
+            "last_sender_type": conv.get("last_sender_type"),
+            "unread_count": conv.get("unread_count", 0),
+        }
+        for conv in convs
+    ]
 
 
 @router.post("", response_model=None)
@@ -63,6 +65,7 @@ async def create_conversation(
     user_name = body.get("userName") or "Guest"
     user_id_raw = body.get("userId")
 
+    user = None
     if user_id_raw:
         try:
             user_id = ObjectId(user_id_raw)
@@ -83,6 +86,7 @@ async def create_conversation(
             }
             result = await users_collection.insert_one(new_user)
             user_id = result.inserted_id
+            user = new_user
         else:
             user_id = user["_id"]
 
@@ -98,9 +102,15 @@ async def create_conversation(
                 "updated_at": existing_conv.get("updated_at")
             }
 
+    if user_id and user is None:
+        user = await users_collection.find_one({"_id": user_id}, {"email": 1, "username": 1, "full_name": 1})
+
     conv_data = {
         "user_id": user_id,
         "status": "active",
+        **user_summary(user),
+        **last_message_fields(None),
+        "unread_count": 0,
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat()
     }
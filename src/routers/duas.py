@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, Form, File, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, Form, File, status
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel, field_validator
 from typing import List, Optional
@@ -32,6 +32,7 @@ class ShareLinkResponse(BaseModel):
 
 SHARE_BASE_URL = "https://focus-flow-server-v1.onrender.com/api/s/" 
 FRONTEND_BASE_URL = "https://nibrasudeen.vercel.app"
+STATS_PROJECTION = {"title": 1, "featured": 1, "view_count": 1, "favorite_count": 1}
 
 
 @router.post("/duas/{dua_id}/share-link", response_model=None)
@@ -82,6 +83,7 @@ async def list_duas(db: AsyncIOMotorDatabase = Depends(get_db)):
 
 @router.get("/duas/paginated", response_model=None)
 async def list_duas_paginated(
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     sort_by: str = Query("_id"),
@@ -89,13 +91,19 @@ async def list_duas_paginated(
     q: Optional[str] = None,
     category_id: Optional[str] = None,
     featured: Optional[bool] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces page"),
     current_user: Optional[dict] = Depends(get_optional_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    duas, dua_ids = await crud_dua.get_paginated_duas(db, page, limit, sort_by, sort_order, q, category_id, featured)
+    try:
+        duas, dua_ids, next_cursor = await crud_dua.get_paginated_duas(db, page, limit, sort_by, sort_order, q, category_id, featured, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    views_map = await crud_dua.get_views_bulk(db, dua_ids)
-    favorites_map = await crud_dua.get_favorites_bulk(db, dua_ids)
+    # Counters live on the documents already loaded
+    views_map, favorites_map = crud_dua.repo.counts_of(duas)
 
     user_favorites_set = set()
     if current_user:
@@ -134,19 +142,13 @@ async def create_dua_route(dua_data: DuaCreate, db: AsyncIOMotorDatabase = Depen
 
 @router.get("/duas/stats", response_model=None)
 async def get_duas_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
-    all_duas = await crud_dua.get_all_duas(db)
+    # Only what the stats need; skips the segment arrays
+    dua_dicts = await crud_dua.repo.find_docs(db, projection=STATS_PROJECTION)
     
-    total_duas = len(all_duas)
-    # Convert Pydantic models to dicts if needed
-    dua_dicts = [dua.model_dump() if hasattr(dua, 'model_dump') else dua for dua in all_duas]
-    # Safely get IDs
-    dua_ids = [d.get("_id") or d.get("id") for d in dua_dicts if d.get("_id") or d.get("id")]
-
-    views_map = await crud_dua.get_views_bulk(db, dua_ids)
-    favorites_map = await crud_dua.get_favorites_bulk(db, dua_ids)
-
-    total_views = sum(views_map.get(str(dua_id), 0) for dua_id in dua_ids)
-    total_favorites = sum(favorites_map.get(str(dua_id), 0) for dua_id in dua_ids)
+    total_duas = len(dua_dicts)
+    views_map = {str(d["_id"]): d.get("view_count", 0) for d in dua_dicts}
+    total_views = sum(views_map.values())
+    total_favorites = sum(d.get("favorite_count", 0) for d in dua_dicts)
 
     featured_duas = [d for d in dua_dicts if d.get("featured")]
     
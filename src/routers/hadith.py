@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, Form, File, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, Form, File, status
 from typing import List, Optional, Dict, Any
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
@@ -61,8 +61,8 @@ async def list_hadiths(db: AsyncIOMotorDatabase = Depends(get_db)):
     hadiths = await crud_hadith.get_all_hadiths(db)
     hadith_ids = [h.id for h in hadiths]
     
-    views_map = await crud_hadith.get_views_bulk(db, hadith_ids)
-    favorites_map = await crud_hadith.get_favorites_bulk(db, hadith_ids)
+    # Counters live on the documents already loaded
+    views_map, favorites_map = crud_hadith.repo.counts_of(hadiths)
 
     hadiths_with_counts = []
     for h in hadiths:
@@ -75,6 +75,7 @@ async def list_hadiths(db: AsyncIOMotorDatabase = Depends(get_db)):
 
 @router.get("/hadiths/paginated", response_model=None)
 async def list_hadiths_paginated(
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     sort_by: str = Query("_id"),
@@ -82,13 +83,22 @@ async def list_hadiths_paginated(
     q: Optional[str] = None,
     category_id: Optional[str] = None,
     featured: Optional[bool] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    with_total: bool = Query(True, description="Include total_count (estimated or cached)"),
     current_user: Optional[dict] = Depends(get_optional_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    hadiths, hadith_ids = await crud_hadith.get_paginated_hadiths(db, page, limit, sort_by, sort_order, q, category_id, featured)
+    try:
+        hadiths, hadith_ids, next_cursor = await crud_hadith.get_paginated_hadiths(
+            db, page, limit, sort_by, sort_order, q, category_id, featured, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    views_map = await crud_hadith.get_views_bulk(db, hadith_ids)
-    favorites_map = await crud_hadith.get_favorites_bulk(db, hadith_ids)
+    # Counters live on the documents already loaded
+    views_map, favorites_map = crud_hadith.repo.counts_of(hadiths)
 
     user_favorites_set = set()
     if current_user:
@@ -103,11 +113,12 @@ async def list_hadiths_paginated(
         h_dict["is_favorite"] = str(h.id) in user_favorites_set
         hadiths_with_counts.append(h_dict)
 
-    total_count = await crud_hadith.count_hadiths(db, q, category_id, featured)
+    total_count = await crud_hadith.count_hadiths(db, q, category_id, featured) if with_total else None
 
     return {
         "items": hadiths_with_counts,
-        "total_count": total_count
+        "total_count": total_count,
+        "next_cursor": next_cursor
     }
 
 @router.post("/hadiths", response_model=None)
@@ -133,8 +144,8 @@ async def get_hadiths_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
     total_hadiths = len(all_hadiths)
     hadith_ids = [h.id for h in all_hadiths]
 
-    views_map = await crud_hadith.get_views_bulk(db, hadith_ids)
-    favorites_map = await crud_hadith.get_favorites_bulk(db, hadith_ids)
+    # Counters live on the documents already loaded
+    views_map, favorites_map = crud_hadith.repo.counts_of(all_hadiths)
 
     total_views = sum(views_map.get(str(hid), 0) for hid in hadith_ids)
     total_favorites = sum(favorites_map.get(str(hid), 0) for hid in hadith_ids)
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks, Body
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks, Body, Query, Response
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from typing import List, Optional
 from datetime import datetime
 from uuid import uuid4
+import json
 
 from ..database import get_db
 from ..schemas.message import MessageCreate, MessageOut
 from ..utils.ws_manager import manager
+from ..utils import conversations
 
 router = APIRouter(prefix="/api/messages", tags=["Messages"])
 MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 500
 
 @router.post("", response_model=None)
 async def send_message(
@@ -55,11 +61,8 @@ async def send_message(
     
     result = await messages_collection.insert_one(msg_data)
     
-    # Update conversation updated_at
-    await conversations_collection.update_one(
-        {"_id": conv_id},
-        {"$set": {"updated_at": datetime.utcnow().isoformat()}}
-    )
+    # Bump last activity, preview and unread count in one update
+    await conversations.record_message(db, msg_data)
 
     temp_id = body.get("tempId")
 
@@ -111,18 +114,8 @@ async def send_message(
         "created_at": msg_data["created_at"]
     }
 
-@router.get("/{conversation_id}/messages", response_model=None)
-async def get_messages(conversation_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
-    try:
-        conv_id = ObjectId(conversation_id)
-    except:
-        raise HTTPException(status_code=400, detail="Invalid conversation ID")
-    
-    messages_collection = db["messages"]
-    cursor = messages_collection.find({"conversation_id": conv_id}).sort("created_at", 1)
-    msgs = await cursor.to_list(length=None)
-    
-    return [{
+def _message_out(m: dict) -> dict:
+    return {
         "id": str(m["_id"]),
         "conversation_id": str(m.get("conversation_id")),
         "sender_type": m.get("sender_type"),
@@ -133,7 +126,86 @@ async def get_messages(conversation_id: str, db: AsyncIOMotorDatabase = Depends(
         "status": m.get("status"),
         "created_at": m.get("created_at"),
         "updated_at": m.get("updated_at")
-    } for m in msgs]
+    }
+
+def _cursor_id(value: Optional[str], name: str) -> Optional[ObjectId]:
+    if value is None:
+        return None
+    try:
+        return ObjectId(value)
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} cursor")
+
+@router.get("/{conversation_id}/messages", response_model=None)
+async def get_messages(
+    conversation_id: str,
+    response: Response,
+    before: Optional[str] = Query(None, description="Only messages older than this message id"),
+    after: Optional[str] = Query(None, description="Only messages newer than this message id"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description=f"Page size (default {DEFAULT_PAGE_SIZE}); no limit when exporting"),
+    format: str = Query("json", description="json | ndjson (stream the whole history, oldest first)"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """
+    Keyset-paginated history, oldest first within a page. Without cursors the
+    latest page is returned; pass the first message's id as `before` to page
+    back, or the last one's as `after` to catch up. X-Has-More says whether
+    another page exists in that direction. Served by the
+    (conversation_id, _id) index.
+    """
+    try:
+        conv_id = ObjectId(conversation_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid conversation ID")
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+
+    query = {"conversation_id": conv_id}
+    bounds = {}
+    before_id = _cursor_id(before, "before")
+    after_id = _cursor_id(after, "after")
+    if before_id is not None:
+        bounds["$lt"] = before_id
+    if after_id is not None:
+        bounds["$gt"] = after_id
+    if bounds:
+        query["_id"] = bounds
+
+    messages_collection = db["messages"]
+
+    if format == "ndjson":
+        if limit and before_id is not None and after_id is None:
+            # The `limit` messages just before the cursor: read them newest
+            # first and stream them oldest first (at most MAX_PAGE_SIZE)
+            page = await messages_collection.find(query).sort("_id", -1).limit(limit).to_list(length=limit)
+
+            async def ndjson_messages():
+                for m in reversed(page):
+                    yield json.dumps(_message_out(m), ensure_ascii=False) + "\n"
+        else:
+            cursor = messages_collection.find(query).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+            if limit:
+                cursor = cursor.limit(limit)
+
+            async def ndjson_messages():
+                async for m in cursor:
+                    yield json.dumps(_message_out(m), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(ndjson_messages(), media_type="application/x-ndjson")
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    # Paging forward from `after` reads upwards; everything else reads down
+    # from the newest end and flips the page back to oldest first.
+    forward = after_id is not None and before_id is None
+    cursor = messages_collection.find(query).sort("_id", 1 if forward else -1).limit(limit + 1)
+    msgs = await cursor.to_list(length=limit + 1)
+    has_more = len(msgs) > limit
+    msgs = msgs[:limit]
+    if not forward:
+        msgs.reverse()
+
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    return [_message_out(m) for m in msgs]
 
 @router.post("/{conversation_id}/read", response_model=None)
 async def mark_conversation_read(
@@ -148,23 +220,28 @@ async def mark_conversation_read(
     messages_collection = db["messages"]
     conversations_collection = db["conversations"]
 
-    # Update all unread messages to read
+    # Update all unread messages to read; the user's ones first so the
+    # conversation's unread_count drops by exactly what was marked
+    now = datetime.utcnow().isoformat()
+    user_result = await messages_collection.update_many(
+        {"conversation_id": conv_id, "sender_type": "user", "status": {"$ne": "read"}},
+        {"$set": {"status": "read", "updated_at": now}}
+    )
+    await conversations.record_read(db, conv_id, user_result.modified_count)
     result = await messages_collection.update_many(
         {"conversation_id": conv_id, "status": {"$ne": "read"}},
-        {"$set": {"status": "read", "updated_at": datetime.utcnow().isoformat()}}
+        {"$set": {"status": "read", "updated_at": now}}
     )
+    marked = user_result.modified_count + result.modified_count
     
-    # Also reset unread count on conversation if we track it there (optional, but good practice)
-    # For now just broadcast
-    
-    if result.modified_count > 0:
+    if marked > 0:
         if manager:
             await manager.broadcast_room(
                 str(conv_id),
                 {"event": "messages_read", "data": {"conversation_id": str(conv_id)}}
             )
             
-    return {"ok": True, "marked_count": result.modified_count}
+    return {"ok": True, "marked_count": marked}
 
 @router.put("/read", response_model=None)
 async def mark_as_read(
@@ -179,6 +256,11 @@ async def mark_as_read(
         raise HTTPException(status_code=400, detail="Invalid IDs")
     
     messages_collection = db["messages"]
+    user_result = await messages_collection.update_many(
+        {"conversation_id": conv_id, "_id": {"$in": msg_ids}, "sender_type": "user", "status": {"$ne": "read"}},
+        {"$set": {"status": "read"}}
+    )
+    await conversations.record_read(db, conv_id, user_result.modified_count)
     await messages_collection.update_many(
         {"conversation_id": conv_id, "_id": {"$in": msg_ids}},
         {"$set": {"status": "read"}}
@@ -213,6 +295,7 @@ async def update_message(
         )
         
         updated_msg = await messages_collection.find_one({"_id": msg_id})
+        await conversations.record_edit(db, updated_msg)
         
         if manager:
             await manager.broadcast_room(
@@ -246,6 +329,7 @@ async def delete_message(message_id: str, db: AsyncIOMotorDatabase = Depends(get
     conv_id = msg.get("conversation_id")
     
     await messages_collection.delete_one({"_id": msg_id})
+    await conversations.record_delete(db, msg)
     
     if manager:
         await manager.broadcast_room(
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
@@ -6,7 +7,14 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from ..database import get_db
 from ..schemas.notification import NotificationCreate, NotificationOut
 from ..utils.users import get_current_user, get_optional_user
-from ..utils.notifications import create_notifications, mark_all_read, mark_read
+from ..config import settings
+from ..utils.notifications import (
+    create_notifications,
+    get_notification_job,
+    mark_all_read,
+    mark_read,
+    start_notification_job,
+)
 
 
 router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
@@ -63,14 +71,42 @@ async def create_notification(
     if current_user.get("role", "user") != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
 
-    return await create_notifications(
-        db,
+    for uid in payload.user_ids or []:
+        if not ObjectId.is_valid(uid):
+            raise HTTPException(status_code=400, detail=f"Invalid user id: {uid}")
+
+    kwargs = dict(
         title=payload.title,
         message=payload.message,
         notif_type=payload.type,
         user_ids=payload.user_ids,
         link=payload.link,
     )
+    # Large fan-outs run in the background; poll /jobs/{job_id} for progress
+    if len(payload.user_ids or []) > settings.NOTIFICATION_JOB_THRESHOLD:
+        job = await start_notification_job(db, **kwargs)
+        return JSONResponse(status_code=202, content=job)
+
+    return await create_notifications(db, **kwargs)
+
+
+@router.get("/jobs/{job_id}", response_model=None)
+async def notification_job(
+    job_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    if current_user.get("role", "user") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    try:
+        oid = ObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+
+    job = await get_notification_job(db, oid)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @router.post("/mark-read-all", response_model=None)
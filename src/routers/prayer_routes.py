@@ -1,11 +1,16 @@
 import asyncio
+import csv
+import io
 import json
+import logging
 from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from fastapi.responses import Response
 from typing import Dict, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from ..services import prayer_service
 from ..database import get_db
 from ..schemas.users import UserResponse
+from ..utils.cache import cache
 from ..utils.users import get_current_user as get_current_user_util, get_optional_user as get_optional_user_util, oauth2_scheme, optional_oauth2_scheme
 import httpx
 
@@ -65,6 +70,57 @@ async def get_prayer_times_endpoint(
     data = await prayer_service.get_prayer_times(final_lat, final_lon, method)
     return data
 
+@cache(ttl=86400)
+async def _timetable(lat: float, lon: float, method: str, year: int, month: Optional[int]) -> dict:
+    return await asyncio.to_thread(prayer_service.get_timetable, lat, lon, method, year, month)
+
+def _timetable_csv(data: dict) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    names = prayer_service.prayer_timetable.TIME_NAMES
+    writer.writerow(["date", "weekday", "hijri_date"] + names)
+    for month in data["months"]:
+        for day in month["days"]:
+            times = day["prayer_times"]
+            writer.writerow(
+                [day["date"], day["weekday"], day["hijri_date"]]
+                + [times.get(name, {}).get("24h", "") for name in names]
+            )
+    return buffer.getvalue()
+
+@router.get("/timetable", response_model=None)
+async def get_timetable_endpoint(
+    year: int = Query(..., ge=1925, le=2076),
+    month: Optional[int] = Query(None, ge=1, le=12),
+    lat: Optional[float] = Query(None),
+    lon: Optional[float] = Query(None),
+    method: str = Query("ISNA"),
+    output: str = Query("json", alias="format"),
+    current_user: Optional[dict] = Depends(get_optional_current_user)
+):
+    if method not in prayer_service.CALC_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(prayer_service.CALC_METHODS)}")
+    if output not in ("json", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'csv'")
+
+    if current_user:
+        if lat is None and current_user.get("latitude") is not None:
+            lat = current_user.get("latitude")
+        if lon is None and current_user.get("longitude") is not None:
+            lon = current_user.get("longitude")
+    if lat is None or lon is None:
+        lat, lon = DEFAULT_LAT, DEFAULT_LON
+
+    data = await _timetable(lat, lon, method, year, month)
+    if output == "csv":
+        filename = f"prayer-times-{year}" + (f"-{month:02d}" if month else "") + ".csv"
+        return Response(
+            content=_timetable_csv(data),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    return data
+
 @router.get("/reverse-geocode", response_model=None)
 async def reverse_geocode_proxy(
     lat: float = Query(..., description="Latitude"),
@@ -149,15 +205,17 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+async def push_event(user_ids, payload: dict):
+    # send_json stamps the per-user mute flag, so each user gets a copy
+    await asyncio.gather(*(manager.send_json(uid, dict(payload)) for uid in user_ids))
+
 async def broadcaster():
     while True:
         try:
-            results = await scheduler.run()
-            for uid, payload in results.items():
-                await manager.send_json(uid, payload)
-        except Exception:
-            pass
-        await asyncio.sleep(30)
+            await scheduler.run(push_event)
+        except Exception as e:
+            logging.exception(f"Prayer scheduler stopped: {e}")
+            await asyncio.sleep(30)
 
 @router.on_event("startup")
 async def start_broadcaster():
@@ -221,9 +279,11 @@ async def prayer_ws(ws: WebSocket, db: AsyncIOMotorDatabase = Depends(get_db)):
     except WebSocketDisconnect:
         if user_id:
             manager.disconnect(user_id)
+            scheduler.remove_user(user_id)
     except Exception:
         try:
             if user_id:
                 manager.disconnect(user_id)
+                scheduler.remove_user(user_id)
         except:
             pass
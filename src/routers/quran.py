@@ -1,4 +1,6 @@
+import json
 from fastapi import APIRouter, HTTPException, Query, Depends, Body
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
@@ -9,7 +11,9 @@ from ..services.quran_service import (
     get_translation,
     list_reciters,
     search_quran,
+    iter_search_quran,
     get_page_detail,
+    SEARCH_MODES,
 )
 from ..utils.cache import cache
 from ..database import get_db
@@ -33,15 +37,32 @@ async def mark_bookmarks(verses, current_user, db: AsyncIOMotorDatabase):
     return verses
 
 @router.get("/surahs", response_model=None)
-@cache(ttl=3600)
+@cache(ttl=3600, stale_while_revalidate=3600, stale_if_error=86400)
 async def list_surahs_route():
     data = await get_surah_list()
     if not data:
         raise HTTPException(status_code=500, detail="Failed to fetch surah list")
     return data
 
+@cache(ttl=3600, stale_while_revalidate=3600, stale_if_error=86400)
+async def _surah_detail(surah_number: int, translation: str, tafsir_sources: Optional[List[str]], reciter: Optional[str]):
+    data = await get_surah_detail(surah_number, translation, tafsir_sources, reciter)
+    if not data:
+        raise HTTPException(status_code=404, detail="Surah not found")
+    return data
+
+@cache(ttl=3600, stale_while_revalidate=3600, stale_if_error=86400)
+async def _page_detail(page_number: int, translation: str, tafsir_sources: Optional[List[str]], reciter: Optional[str]):
+    data = await get_page_detail(page_number, translation, tafsir_sources, reciter)
+    if not data or not data.get("verses"):
+        raise HTTPException(status_code=404, detail=f"No verses found for Page {page_number}")
+    return data
+
+def _with_own_verses(data: dict) -> dict:
+    # Cached payloads are shared between requests; per-user flags go on copies
+    return {**data, "verses": [dict(v) for v in data["verses"]]}
+
 @router.get("/surah/{surah_number}", response_model=None)
-@cache(ttl=3600)
 async def read_surah_route(
     surah_number: int,
     translation: str = Query("en.sahih"),
@@ -50,15 +71,13 @@ async def read_surah_route(
     current_user: Optional[dict] = Depends(get_optional_user),
     db: AsyncIOMotorDatabase = Depends(get_db),
 ):
-    data = await get_surah_detail(surah_number, translation, tafsir_sources, reciter)
-    if not data:
-        raise HTTPException(status_code=404, detail="Surah not found")
+    data = await _surah_detail(surah_number, translation, tafsir_sources, reciter)
     if current_user:
+        data = _with_own_verses(data)
         data["verses"] = await mark_bookmarks(data["verses"], current_user, db)
     return data
 
 @router.get("/page/{page_number}", response_model=None)
-@cache(ttl=3600)
 async def read_quran_page_route(
     page_number: int,
     translation: str = Query("en.sahih"),
@@ -70,12 +89,10 @@ async def read_quran_page_route(
     if not 1 <= page_number <= 604:
         raise HTTPException(status_code=400, detail="Page number must be between 1 and 604.")
         
-    data = await get_page_detail(page_number, translation, tafsir_sources, reciter)
-    
-    if not data or not data.get("verses"):
-        raise HTTPException(status_code=404, detail=f"No verses found for Page {page_number}")
+    data = await _page_detail(page_number, translation, tafsir_sources, reciter)
         
     if current_user:
+        data = _with_own_verses(data)
         data["verses"] = await mark_bookmarks(data["verses"], current_user, db)
         
     return data
@@ -103,7 +120,7 @@ async def read_ayah_route(
     return data
 
 @router.get("/translation/{lang}", response_model=None)
-@cache(ttl=86400)
+@cache(ttl=86400, stale_while_revalidate=86400, stale_if_error=7 * 86400)
 async def translation_route(lang: str):
     data = await get_translation(lang)
     if not data:
@@ -118,10 +135,24 @@ async def reciters_route():
 async def search_route(
     q: str,
     tafsir_source: Optional[str] = Query(None),
+    stream: bool = Query(False, description="Stream hits as NDJSON while they are hydrated"),
+    mode: str = Query("auto", description="auto | local | remote"),
     current_user: Optional[dict] = Depends(get_optional_user),
     db: AsyncIOMotorDatabase = Depends(get_db),
 ):
-    results = await search_quran(q, tafsir_source)
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(SEARCH_MODES)}")
+    if stream:
+        async def ndjson_hits():
+            async for batch in iter_search_quran(q, tafsir_source, mode):
+                if current_user:
+                    await mark_bookmarks(batch, current_user, db)
+                for verse in batch:
+                    yield json.dumps(verse, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(ndjson_hits(), media_type="application/x-ndjson")
+
+    results = await search_quran(q, tafsir_source, mode)
     if current_user:
         await mark_bookmarks(results, current_user, db)
     return results
@@ -1,25 +1,24 @@
+import logging
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from src.utils.ws_manager import manager
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/ws/chat", tags=["WebSocket"])
 
 @router.websocket("/admin")
 async def admin_websocket_endpoint(websocket: WebSocket):
-    print("WS DEBUG: Admin WebSocket endpoint called!")
     try:
-        print("WS DEBUG: About to connect admin...")
         await manager.connect_admin(websocket)
-        print("WS DEBUG: Admin connected successfully!")
         try:
             while True:
                 # Keep connection alive, ignore incoming messages from admin for now
                 data = await websocket.receive_text()
-                print(f"WS DEBUG: Admin sent data: {data}")
+                logger.debug("Admin WebSocket message received", extra={"bytes": len(data)})
         except WebSocketDisconnect:
-            print("WS DEBUG: Admin disconnecting...")
             await manager.disconnect_admin_async(websocket)
     except Exception as e:
-        print(f"WS DEBUG: Admin connection error: {e}")
+        logger.warning(f"Admin WebSocket connection error: {e}")
         try:
             await manager.disconnect_admin_async(websocket)
         except:
@@ -41,12 +40,14 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
                     await manager.broadcast_room(conversation_id, {"event": "typing", "data": payload})
                 elif action == "message_read":
                     await manager.broadcast_room(conversation_id, {"event": "messages_read", "data": payload})
+                elif action == "admin_status":
+                    await manager.send_personal(websocket, manager.presence.status_message())
                 else:
                     await manager.send_personal(websocket, {"event": "unknown", "action": action})
             except WebSocketDisconnect:
                 raise # Re-raise to be caught by outer block
             except Exception as e:
-                print(f"WS ERROR: Error handling message: {e}")
+                logger.warning(f"Error handling WebSocket message in {conversation_id}: {e}")
                 try:
                     await manager.send_personal(websocket, {"event": "error", "message": "Invalid message format"})
                 except:
@@ -1,9 +1,15 @@
 import asyncio
-from datetime import datetime, timedelta
+import calendar
+import heapq
+import itertools
+import logging
+import time
+from datetime import date, datetime, timedelta
 from hijri_converter import Gregorian
-from timezonefinder import TimezoneFinder
-import pytz, os, time
-from praytimes import PrayTimes
+import pytz, os
+from ..config import settings
+from ..utils.cache import CacheEngine
+from . import prayer_timetable, timezone_service
 
 try:
     import pygame
@@ -11,22 +17,23 @@ try:
 except ImportError:
     PYGAME_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
 BASE_DIR = os.path.dirname(__file__)
 ADHAN_AUDIO_PATH = os.path.join(BASE_DIR, "static", "audio", "azan1.mp3")
-CACHE = {}
 DEFAULT_METHOD = "ISNA"
 DEFAULT_LAT = 7.3775
 DEFAULT_LON = 3.9470
 CALC_METHODS = ["MWL", "ISNA", "Egypt", "Makkah", "Karachi", "Tehran", "Jafari"]
 PRAYER_ORDER = ["imsak", "fajr", "dhuhr", "asr", "maghrib", "isha"]
+ADHAN_PRAYERS = ["fajr", "dhuhr", "asr", "maghrib", "isha"]
 REMINDER_MINUTES = 10
-PRAYER_CACHE = {}
-PRAYER_CACHE_TTL = 30
+ISHA_DELAY_MINUTES = 15
+# Daily and weekly times, shared by every request in the same grid cell
+PRAYER_CACHE = CacheEngine(settings.PRAYER_CACHE_MAX_ENTRIES, settings.PRAYER_CACHE_MAX_BYTES)
 
 def get_timezone(lat, lon):
-    tf = TimezoneFinder()
-    tz_str = tf.timezone_at(lat=lat, lng=lon) or "Africa/Lagos"
-    return pytz.timezone(tz_str)
+    return timezone_service.get_timezone(lat, lon)
 
 def get_timezone_offset(lat, lon):
     tz = get_timezone(lat, lon)
@@ -35,6 +42,40 @@ def get_timezone_offset(lat, lon):
     offset = local_time.utcoffset()
     return offset.total_seconds() / 3600 if offset else 1.0
 
+def snap_to_cell(lat, lon):
+    """Snap coordinates to the PRAYER_CELL_DEGREES grid: ((cell_lat, cell_lon), lat, lon) of the cell centre"""
+    step = settings.PRAYER_CELL_DEGREES
+    cell = (round(lat / step), round(lon / step))
+    return cell, cell[0] * step, cell[1] * step
+
+def _seconds_until_day_end(tz, day):
+    """Lifetime for an entry about `day`: it rolls over at the following local midnight"""
+    end = tz.localize(datetime(day.year, day.month, day.day) + timedelta(days=1))
+    return max((end - datetime.now(tz)).total_seconds(), 1)
+
+def _cache_get(key):
+    value = PRAYER_CACHE.get(key)
+    PRAYER_CACHE.stats["hits" if value is not None else "misses"] += 1
+    return value
+
+def prayer_cache_stats():
+    return PRAYER_CACHE.snapshot()
+
+def get_day_offsets(tz, days):
+    """UTC offset in hours for each date (taken at local noon, so DST changes are honoured)"""
+    return [tz.utcoffset(datetime(d.year, d.month, d.day, 12)).total_seconds() / 3600 for d in days]
+
+def _delay_isha(times):
+    if times.get("isha", prayer_timetable.INVALID_TIME) != prayer_timetable.INVALID_TIME:
+        h, m = map(int, times["isha"].split(":"))
+        times["isha"] = prayer_timetable.format_minutes((h * 60 + m + ISHA_DELAY_MINUTES) % 1440)
+    return times
+
+def _compute_days(lat, lon, method, tz, days):
+    """Prayer times for several days in one engine pass, with the isha delay applied"""
+    results = prayer_timetable.day_times(method, lat, lon, days, get_day_offsets(tz, days))
+    return [_delay_isha(times) for times in results]
+
 def format_time_12h(time_str):
     try:
         hour, minute = map(int, time_str.split(":"))
@@ -45,23 +86,16 @@ def format_time_12h(time_str):
     return f"{hour}:{minute:02d} {suffix}"
 
 def precompute_weekly_cache(lat, lon, method=DEFAULT_METHOD):
-    key = f"{lat}:{lon}:{method}"
-    if key in CACHE:
-        return CACHE[key]
-    pt = PrayTimes(method)
+    (cell_lat, cell_lon), lat, lon = snap_to_cell(lat, lon)
     tz = get_timezone(lat, lon)
+    today = datetime.now(tz).date()
+    key = f"week:{method}:{cell_lat}:{cell_lon}:{today}"
+    week = _cache_get(key)
+    if week is not None:
+        return week
+    days = [today + timedelta(days=i) for i in range(7)]
     week = {}
-    for i in range(7):
-        day = datetime.now(tz) + timedelta(days=i)
-        times = pt.getTimes(
-            date=(day.year, day.month, day.day),
-            coords=(lat, lon),
-            timezone=get_timezone_offset(lat, lon)
-        )
-        if "isha" in times:
-            h, m = map(int, times["isha"].split(":"))
-            isha_dt = datetime(day.year, day.month, day.day, h, m) + timedelta(minutes=15)
-            times["isha"] = isha_dt.strftime("%H:%M")
+    for day, times in zip(days, _compute_days(lat, lon, method, tz, days)):
         hijri = Gregorian(day.year, day.month, day.day).to_hijri()
         formatted = {
             k: {"24h": v, "12h": format_time_12h(v)}
@@ -72,7 +106,7 @@ def precompute_weekly_cache(lat, lon, method=DEFAULT_METHOD):
             "hijri_date": f"{hijri.day}-{hijri.month}-{hijri.year}",
             "prayer_times": formatted
         }
-    CACHE[key] = week
+    PRAYER_CACHE.set(key, week, _seconds_until_day_end(tz, today))
     return week
 
 def play_audio_file(path):
@@ -91,23 +125,16 @@ async def play_adhan():
     await asyncio.to_thread(play_audio_file, ADHAN_AUDIO_PATH)
 
 def _get_prayer_times_cached(lat, lon, method, day):
-    key = f"{lat}:{lon}:{method}:{day.year}-{day.month}-{day.day}"
-    entry = PRAYER_CACHE.get(key)
-    now_ts = time.time()
-    if entry and now_ts - entry["ts"] < PRAYER_CACHE_TTL:
-        return entry["data"]
-    pt = PrayTimes(method)
+    """Times for `day` at the cell containing (lat, lon); treat the result as read-only"""
+    (cell_lat, cell_lon), lat, lon = snap_to_cell(lat, lon)
+    day = date(day.year, day.month, day.day)
+    key = f"day:{method}:{cell_lat}:{cell_lon}:{day}"
+    times = _cache_get(key)
+    if times is not None:
+        return times
     tz = get_timezone(lat, lon)
-    times = pt.getTimes(
-        date=(day.year, day.month, day.day),
-        coords=(lat, lon),
-        timezone=get_timezone_offset(lat, lon)
-    )
-    if "isha" in times:
-        h, m = map(int, times["isha"].split(":"))
-        isha_dt = datetime(day.year, day.month, day.day, h, m) + timedelta(minutes=15)
-        times["isha"] = isha_dt.strftime("%H:%M")
-    PRAYER_CACHE[key] = {"ts": now_ts, "data": times}
+    times = _compute_days(lat, lon, method, tz, [day])[0]
+    PRAYER_CACHE.set(key, times, _seconds_until_day_end(tz, day))
     return times
 
 async def get_prayer_times(lat=None, lon=None, method=DEFAULT_METHOD):
@@ -116,7 +143,6 @@ async def get_prayer_times(lat=None, lon=None, method=DEFAULT_METHOD):
     if lat is None or lon is None:
         lat, lon = DEFAULT_LAT, DEFAULT_LON
     tz = get_timezone(lat, lon)
-    pt = PrayTimes(method)
     now = datetime.now(tz)
     today_times = _get_prayer_times_cached(lat, lon, method, now)
     prayers = {}
@@ -141,10 +167,6 @@ async def get_prayer_times(lat=None, lon=None, method=DEFAULT_METHOD):
     if not next_name:
         tomorrow = now + timedelta(days=1)
         tom_times = _get_prayer_times_cached(lat, lon, method, tomorrow)
-        if "isha" in tom_times:
-            h, m = map(int, tom_times["isha"].split(":"))
-            isha_dt = datetime(tomorrow.year, tomorrow.month, tomorrow.day, h, m) + timedelta(minutes=15)
-            tom_times["isha"] = isha_dt.strftime("%H:%M")
         h, m = map(int, tom_times.get("fajr", "05:00").split(":"))
         next_name = "fajr"
         next_dt = tz.localize(datetime(tomorrow.year, tomorrow.month, tomorrow.day, h, m))
@@ -165,37 +187,170 @@ async def get_prayer_times(lat=None, lon=None, method=DEFAULT_METHOD):
         "weekly_prayer_times": weekly
     }
 
+def get_timetable(lat, lon, method=DEFAULT_METHOD, year=None, month=None):
+    """Printable calendar for a whole year, or one month of it"""
+    if method not in CALC_METHODS:
+        method = DEFAULT_METHOD
+    tz = get_timezone(lat, lon)
+    year = year or datetime.now(tz).year
+    months = [month] if month else range(1, 13)
+    days = [
+        date(year, m, d)
+        for m in months
+        for d in range(1, calendar.monthrange(year, m)[1] + 1)
+    ]
+    calendars = {m: [] for m in months}
+    for day, times in zip(days, _compute_days(lat, lon, method, tz, days)):
+        hijri = Gregorian(day.year, day.month, day.day).to_hijri()
+        calendars[day.month].append({
+            "date": day.isoformat(),
+            "weekday": calendar.day_name[day.weekday()],
+            "hijri_date": f"{hijri.day}-{hijri.month}-{hijri.year}",
+            "prayer_times": {
+                k: {"24h": v, "12h": format_time_12h(v)}
+                for k, v in times.items()
+            }
+        })
+    return {
+        "year": year,
+        "month": month,
+        "method": method,
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": tz.zone,
+        "months": [
+            {"month": m, "name": calendar.month_name[m], "days": calendars[m]}
+            for m in months
+        ]
+    }
+
 class Scheduler:
+    """
+    Event-driven adhan/reminder scheduler.
+
+    Users are grouped by (method, grid cell), so a group's next event is
+    computed once however many users share it. Each group keeps exactly one
+    pending entry in a heap ordered by UTC timestamp; `run` sleeps until the
+    earliest entry is due, fires it to every member through `notify`, and
+    schedules that group's following event. Entries left behind by regrouping
+    are skipped via the group's generation counter.
+    """
+
+    MAX_SLEEP = 300  # re-check the heap at least this often (wall clock changes)
+
     def __init__(self):
         self.users = {}
+        self.groups = {}
+        self._heap = []
+        self._generation = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._deliveries = set()
 
-    def add_user(self, user_id, lat, lon, method="ISNA"):
-        if user_id not in self.users:
-            self.users[user_id] = {
+    def _group_key(self, lat, lon, method):
+        (cell_lat, cell_lon), _, _ = snap_to_cell(lat, lon)
+        return (method, cell_lat, cell_lon)
+
+    def add_user(self, user_id, lat, lon, method=DEFAULT_METHOD):
+        """Register a user, or move them when their location or method changed"""
+        if method not in CALC_METHODS:
+            method = DEFAULT_METHOD
+        key = self._group_key(lat, lon, method)
+        if self.users.get(user_id) == key:
+            return
+        self.remove_user(user_id)
+        self.users[user_id] = key
+        group = self.groups.get(key)
+        if group is None:
+            _, lat, lon = snap_to_cell(lat, lon)
+            group = self.groups[key] = {
                 "lat": lat,
                 "lon": lon,
                 "method": method,
-                "last_played": {}
+                "tz": get_timezone(lat, lon),
+                "members": set(),
+                "generation": next(self._generation),
             }
+            self._schedule(key, group, datetime.now(pytz.utc))
+        group["members"].add(user_id)
+
+    def remove_user(self, user_id):
+        key = self.users.pop(user_id, None)
+        group = self.groups.get(key)
+        if group is None:
+            return
+        group["members"].discard(user_id)
+        if not group["members"]:
+            # Its pending heap entry is dropped lazily when it comes due
+            del self.groups[key]
+
+    def _next_event(self, group, after):
+        """Earliest (utc datetime, type, prayer) strictly after `after`"""
+        tz = group["tz"]
+        today = after.astimezone(tz).date()
+        for day in (today, today + timedelta(days=1)):
+            times = _get_prayer_times_cached(group["lat"], group["lon"], group["method"], day)
+            events = []
+            for name in ADHAN_PRAYERS:
+                value = times.get(name)
+                if not value or value == prayer_timetable.INVALID_TIME:
+                    continue
+                h, m = map(int, value.split(":"))
+                at = tz.localize(datetime(day.year, day.month, day.day, h, m))
+                events.append((at - timedelta(minutes=REMINDER_MINUTES), "reminder", name))
+                events.append((at, "adhan", name))
+            upcoming = sorted(e for e in events if e[0] > after)
+            if upcoming:
+                return upcoming[0]
+        return None
+
+    def _schedule(self, key, group, after):
+        event = self._next_event(group, after)
+        if event is None:
+            # No computable times (polar day/night): look again in an hour
+            event = (after + timedelta(hours=1), "refresh", None)
+        at, kind, prayer = event
+        heapq.heappush(self._heap, (at.timestamp(), group["generation"], key, kind, prayer))
+        self._wakeup.set()
+
+    async def _fire(self, group, kind, prayer, at, notify):
+        if kind == "refresh":
+            return
+        if kind == "adhan":
+            asyncio.create_task(play_adhan())
+        payload = await get_prayer_times(group["lat"], group["lon"], group["method"])
+        payload["event"] = {
+            "type": kind,
+            "prayer": prayer,
+            "time": at.astimezone(group["tz"]).strftime("%H:%M:%S"),
+            "minutes_until": REMINDER_MINUTES if kind == "reminder" else 0,
+        }
+        await notify(list(group["members"]), payload)
+
+    async def _deliver(self, key, group, kind, prayer, at, notify):
+        try:
+            await self._fire(group, kind, prayer, at, notify)
+        except Exception as e:
+            logger.error(f"Failed to deliver {kind} for {prayer} to group {key}: {e}")
 
-    async def run(self):
-        now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
-        for user_id, info in list(self.users.items()):
-            tz = get_timezone(info["lat"], info["lon"])
-            now = now_utc.astimezone(tz)
-            today_times = _get_prayer_times_cached(info["lat"], info["lon"], info["method"], now)
-            prayers = {}
-            for k, v in today_times.items():
-                if v and k.lower() != "sunrise":
-                    h, m = map(int, v.split(":"))
-                    dt = tz.localize(datetime(now.year, now.month, now.day, h, m))
-                    prayers[k] = {"time": dt.strftime("%H:%M:%S")}
-            for pname, pinfo in prayers.items():
-                ph, pm, ps = map(int, pinfo["time"].split(":"))
-                pdt = tz.localize(datetime(now.year, now.month, now.day, ph, pm, ps))
-                reminder_window_start = pdt - timedelta(minutes=1)
-                reminder_window_end = pdt + timedelta(seconds=30)
-                last_played = info["last_played"].get(pname)
-                if reminder_window_start <= now <= reminder_window_end and last_played != pdt.date():
-                    info["last_played"][pname] = pdt.date()
-                    asyncio.create_task(play_adhan())
+    async def run(self, notify):
+        """Fire due events forever; `notify(user_ids, payload)` delivers one group's event"""
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                ts, generation, key, kind, prayer = heapq.heappop(self._heap)
+                group = self.groups.get(key)
+                if group is None or group["generation"] != generation:
+                    continue
+                at = datetime.fromtimestamp(ts, pytz.utc)
+                # Deliver off the loop: a stalled client socket must not hold
+                # back the events due after this one
+                task = asyncio.create_task(self._deliver(key, group, kind, prayer, at, notify))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+                self._schedule(key, group, at)
+            timeout = min(self._heap[0][0] - time.time(), self.MAX_SLEEP) if self._heap else self.MAX_SLEEP
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,256 @@
+# prayer_timetable.py
+"""
+Vectorized prayer-time engine.
+
+A NumPy port of the `praytimes` calculation (sun position, angle times, asr,
+high-latitude adjustment, minute rounding) that evaluates a whole grid of
+N locations x M days in one pass instead of one `PrayTimes.getTimes` call per
+day. Every step keeps praytimes' operation order so formatted results are
+identical; `python -m src.services.prayer_timetable validate` checks that for
+every method in CALC_METHODS, against praytimes with its method selection
+and minute-based isha corrected (see `reference_times`).
+
+NumPy is optional: without it `day_times` falls back to looping praytimes.
+"""
+
+import logging
+import re
+import sys
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+from praytimes import PrayTimes
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TIME_NAMES = ["imsak", "fajr", "sunrise", "dhuhr", "asr", "sunset", "maghrib", "isha", "midnight"]
+INVALID_TIME = PrayTimes.invalidTime
+RISE_SET_ANGLE = 0.833  # praytimes.riseSetAngle() at sea level
+DEFAULT_SETTINGS = {"imsak": "10 min", "dhuhr": "0 min", "asr": "Standard", "highLats": "NightMiddle"}
+
+
+@lru_cache(maxsize=None)
+def method_settings(method: str) -> Dict[str, object]:
+    # Built from the method table rather than PrayTimes(method).getSettings():
+    # the installed praytimes shadows its `method` argument in __init__ and
+    # always ends up on the last method (Jafari).
+    params = PrayTimes.methods.get(method, PrayTimes.methods["MWL"])["params"]
+    return {**DEFAULT_SETTINGS, **PrayTimes.defaultParams, **params}
+
+
+def _value(param) -> float:
+    val = re.split("[^0-9.+-]", str(param), 1)[0]
+    return float(val) if val else 0
+
+
+def _is_minutes(param) -> bool:
+    return isinstance(param, str) and "min" in param
+
+
+def julian(year: int, month: int, day: int) -> float:
+    return PrayTimes.julian(None, year, month, day)
+
+
+if NUMPY_AVAILABLE:
+
+    def _sin(d): return np.sin(np.radians(d))
+    def _cos(d): return np.cos(np.radians(d))
+    def _tan(d): return np.tan(np.radians(d))
+    def _arccos(x): return np.degrees(np.arccos(x))
+    def _arcsin(x): return np.degrees(np.arcsin(x))
+    def _arccot(x): return np.degrees(np.arctan(1.0 / x))
+    def _arctan2(y, x): return np.degrees(np.arctan2(y, x))
+
+    def _fix(a, mode):
+        a = a - mode * np.floor(a / mode)
+        return np.where(a < 0, a + mode, a)
+
+    def _sun_position(jd):
+        D = jd - 2451545.0
+        g = _fix(357.529 + 0.98560028 * D, 360.0)
+        q = _fix(280.459 + 0.98564736 * D, 360.0)
+        L = _fix(q + 1.915 * _sin(g) + 0.020 * _sin(2 * g), 360.0)
+        e = 23.439 - 0.00000036 * D
+        RA = _arctan2(_cos(e) * _sin(L), _cos(L)) / 15.0
+        eqt = q / 15.0 - _fix(RA, 24.0)
+        decl = _arcsin(_sin(e) * _sin(L))
+        return decl, eqt
+
+    class _Grid:
+        """Per-call state: julian dates and latitudes broadcast to (locations, days)"""
+
+        def __init__(self, jdate, lat):
+            self.jdate = jdate
+            self.lat = lat
+
+        def mid_day(self, time):
+            eqt = _sun_position(self.jdate + time)[1]
+            return _fix(12 - eqt, 24.0)
+
+        def sun_angle_time(self, angle, time, ccw=False):
+            decl = _sun_position(self.jdate + time)[0]
+            noon = self.mid_day(time)
+            t = 1 / 15.0 * _arccos((-_sin(angle) - _sin(decl) * _sin(self.lat)) / (_cos(decl) * _cos(self.lat)))
+            return noon + (-t if ccw else t)
+
+        def asr_time(self, factor, time):
+            decl = _sun_position(self.jdate + time)[0]
+            angle = -_arccot(factor + _tan(np.abs(self.lat - decl)))
+            return self.sun_angle_time(angle, time)
+
+    def _adjust_high_lat(settings, time, base, angle, night, ccw=False):
+        method = settings["highLats"]
+        portion = 1 / 2.0
+        if method == "AngleBased":
+            portion = 1 / 60.0 * angle
+        if method == "OneSeventh":
+            portion = 1 / 7.0
+        portion = portion * night
+        diff = _fix(base - time, 24.0) if ccw else _fix(time - base, 24.0)
+        replace = np.isnan(time) | (diff > portion)
+        return np.where(replace, base + (-portion if ccw else portion), time)
+
+    def compute_hours(
+        method: str,
+        lats: Sequence[float],
+        lngs: Sequence[float],
+        days: Sequence[date],
+        offsets,
+    ) -> Dict[str, "np.ndarray"]:
+        """
+        Prayer times as local float hours, shape (len(lats), len(days)).
+        `offsets` holds UTC offsets in hours, broadcastable to that shape
+        (one per day, or per location and day, so DST is handled).
+        """
+        settings = method_settings(method)
+        lat = np.asarray(lats, dtype=float).reshape(-1, 1)
+        lng = np.asarray(lngs, dtype=float).reshape(-1, 1)
+        jd = np.array([julian(d.year, d.month, d.day) for d in days], dtype=float)
+        grid = _Grid(jd - lng / (15 * 24.0), lat)
+        shape = np.broadcast_shapes(lat.shape, jd.shape)
+
+        with np.errstate(invalid="ignore"):
+            times = {
+                "imsak": grid.sun_angle_time(_value(settings["imsak"]), 5 / 24.0, ccw=True),
+                "fajr": grid.sun_angle_time(_value(settings["fajr"]), 5 / 24.0, ccw=True),
+                "sunrise": grid.sun_angle_time(RISE_SET_ANGLE, 6 / 24.0, ccw=True),
+                "dhuhr": grid.mid_day(12 / 24.0),
+                "asr": grid.asr_time({"Standard": 1, "Hanafi": 2}.get(settings["asr"]) or _value(settings["asr"]), 13 / 24.0),
+                "sunset": grid.sun_angle_time(RISE_SET_ANGLE, 18 / 24.0),
+                "maghrib": grid.sun_angle_time(_value(settings["maghrib"]), 18 / 24.0),
+                "isha": grid.sun_angle_time(_value(settings["isha"]), 18 / 24.0),
+            }
+
+            tz_adjust = np.asarray(offsets, dtype=float) - lng / 15.0
+            times = {name: np.broadcast_to(value + tz_adjust, shape) for name, value in times.items()}
+
+            if settings["highLats"] != "None":
+                night = _fix(times["sunrise"] - times["sunset"], 24.0)
+                for name, base, ccw in (
+                    ("imsak", "sunrise", True),
+                    ("fajr", "sunrise", True),
+                    ("isha", "sunset", False),
+                    ("maghrib", "sunset", False),
+                ):
+                    times[name] = _adjust_high_lat(settings, times[name], times[base], _value(settings[name]), night, ccw)
+
+            if _is_minutes(settings["imsak"]):
+                times["imsak"] = times["fajr"] - _value(settings["imsak"]) / 60.0
+            if _is_minutes(settings["maghrib"]):
+                times["maghrib"] = times["sunset"] - _value(settings["maghrib"]) / 60.0
+            if _is_minutes(settings["isha"]):
+                times["isha"] = times["maghrib"] + _value(settings["isha"]) / 60.0
+            times["dhuhr"] = times["dhuhr"] + _value(settings["dhuhr"]) / 60.0
+
+            until = "fajr" if settings["midnight"] == "Jafari" else "sunrise"
+            times["midnight"] = times["sunset"] + _fix(times[until] - times["sunset"], 24.0) / 2
+
+        return {name: times[name] for name in TIME_NAMES}
+
+    def to_minutes(hours: "np.ndarray") -> "np.ndarray":
+        """Round float hours to minute-of-day like praytimes' formatter; -1 where invalid"""
+        with np.errstate(invalid="ignore"):
+            time = _fix(hours + 0.5 / 60, 24.0)
+            h = np.floor(time)
+            m = np.floor((time - h) * 60)
+            minutes = h * 60 + m
+        return np.where(np.isnan(minutes), -1, minutes).astype(np.int32)
+
+
+def format_minutes(minutes: int) -> str:
+    if minutes < 0:
+        return INVALID_TIME
+    return "%02d:%02d" % divmod(int(minutes), 60)
+
+
+def reference_times(method: str, day: date, lat: float, lng: float, offset: float) -> Dict[str, str]:
+    """
+    One day from praytimes itself, with the two upstream bugs corrected: the
+    method is applied explicitly, and minute-based isha (Makkah) is placed
+    after maghrib rather than before it.
+    """
+    settings = method_settings(method)
+    pt = PrayTimes(method)
+    pt.adjust(settings)
+    times = pt.getTimes(date=(day.year, day.month, day.day), coords=(lat, lng), timezone=offset)
+    if _is_minutes(settings["isha"]) and times["maghrib"] != INVALID_TIME:
+        h, m = map(int, times["maghrib"].split(":"))
+        times["isha"] = format_minutes((h * 60 + m + int(_value(settings["isha"]))) % 1440)
+    return times
+
+
+def day_times(method: str, lat: float, lng: float, days: Sequence[date], offsets: Sequence[float]) -> List[Dict[str, str]]:
+    """praytimes-formatted ("HH:MM") times for one location over `days`"""
+    if NUMPY_AVAILABLE:
+        hours = compute_hours(method, [lat], [lng], days, np.asarray(offsets, dtype=float))
+        minutes = {name: to_minutes(values)[0] for name, values in hours.items()}
+        return [
+            {name: format_minutes(minutes[name][i]) for name in TIME_NAMES}
+            for i in range(len(days))
+        ]
+    return [reference_times(method, d, lat, lng, offset) for d, offset in zip(days, offsets)]
+
+
+def validate(methods: Sequence[str], year: int = 2025) -> int:
+    """Compare the engine with praytimes over a global grid for a full year; returns mismatches"""
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy is required to validate the vectorized engine")
+    days = [date.fromordinal(date(year, 1, 1).toordinal() + i) for i in range(365)]
+    lats = [lat for lat in range(-60, 70, 10) for _ in range(4)]
+    lngs = [lng for _ in range(-60, 70, 10) for lng in (-122.4, -3.7, 39.8, 151.2)]
+    offsets = np.array([[round(lng / 15)] for lng in lngs], dtype=float)
+
+    mismatches = 0
+    for method in methods:
+        minutes = {name: to_minutes(values) for name, values in compute_hours(method, lats, lngs, days, offsets).items()}
+        for i, (lat, lng) in enumerate(zip(lats, lngs)):
+            for j, d in enumerate(days):
+                expected = reference_times(method, d, lat, lng, offsets[i, 0])
+                for name in TIME_NAMES:
+                    got = format_minutes(minutes[name][i, j])
+                    if got != expected[name]:
+                        mismatches += 1
+                        if mismatches <= 20:
+                            logger.warning(f"{method} {d} ({lat}, {lng}) {name}: {got} != {expected[name]}")
+        logger.info(f"Validated {method} over {len(lats)} locations x {len(days)} days")
+    return mismatches
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if len(sys.argv) < 2 or sys.argv[1] != "validate":
+        print("usage: python -m src.services.prayer_timetable validate [method ...]")
+        sys.exit(1)
+
+    from .prayer_service import CALC_METHODS
+
+    failures = validate(sys.argv[2:] or CALC_METHODS)
+    print(f"{failures} mismatching times")
+    sys.exit(1 if failures else 0)
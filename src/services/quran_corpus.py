@@ -0,0 +1,262 @@
+# quran_corpus.py
+"""
+Offline Quran corpus store.
+
+The importer turns a quran.com dump into three files:
+
+    meta.json    chapters, verse keys and the surah/page -> verse range index
+    verses.idx   uint64 byte offsets into verses.bin (one per verse, plus the end)
+    verses.bin   JSON-encoded verse records, back to back, in mushaf order
+
+verses.bin is memory-mapped, so serving a verse is an offset lookup plus one
+json.loads of that record; nothing is read from disk until a verse is touched.
+
+A dump is a JSON file shaped like {"chapters": [...], "verses": [...]} where
+each verse is a quran.com v4 verse object (words, text_qpc_hafs, page_number)
+and "translations" maps a translation key (e.g. "en.sahih") to that verse's
+translation list. `python -m src.services.quran_corpus fetch` builds one from
+the live API, `python -m src.services.quran_corpus import` packs it.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sys
+from array import array
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CORPUS_VERSION = 1
+META_FILE = "meta.json"
+INDEX_FILE = "verses.idx"
+DATA_FILE = "verses.bin"
+_OFFSET_TYPECODE = "Q"
+
+
+class QuranCorpus:
+    """Read-only view over an imported corpus directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != CORPUS_VERSION:
+            raise ValueError(f"Unsupported corpus version {meta.get('version')} in {path}")
+
+        self.verse_keys: List[str] = meta["verse_keys"]
+        self.translations = set(meta.get("translations", []))
+        self.chapters: Dict[int, dict] = {int(k): v for k, v in meta["chapters"].items()}
+        self.surah_ranges: Dict[int, tuple] = {int(k): tuple(v) for k, v in meta["surah_ranges"].items()}
+        self.page_ranges: Dict[int, tuple] = {int(k): tuple(v) for k, v in meta["page_ranges"].items()}
+        self.key_index: Dict[str, int] = {key: i for i, key in enumerate(self.verse_keys)}
+
+        self.offsets = array(_OFFSET_TYPECODE)
+        with open(os.path.join(path, INDEX_FILE), "rb") as f:
+            self.offsets.frombytes(f.read())
+        if len(self.offsets) != len(self.verse_keys) + 1:
+            raise ValueError(f"Corpus index in {path} does not match its verse list")
+
+        self._data_file = open(os.path.join(path, DATA_FILE), "rb")
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._fingerprint: Optional[str] = None
+
+    def fingerprint(self) -> str:
+        """Content hash of the imported verses; changes whenever the corpus is re-imported with different text"""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(self.offsets.tobytes(), digest_size=16)
+            digest.update(self._data)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def close(self):
+        self._data.close()
+        self._data_file.close()
+
+    def __len__(self):
+        return len(self.verse_keys)
+
+    def _record(self, index: int) -> dict:
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return json.loads(self._data[start:end])
+
+    def has_translation(self, translation: str) -> bool:
+        return translation in self.translations
+
+    def get_chapter(self, surah_number: int) -> Optional[dict]:
+        chapter = self.chapters.get(surah_number)
+        return dict(chapter) if chapter else None
+
+    def list_chapters(self) -> List[dict]:
+        return [dict(self.chapters[n]) for n in sorted(self.chapters)]
+
+    def get_verse(self, verse_key: str) -> Optional[dict]:
+        index = self.key_index.get(verse_key)
+        return self._record(index) if index is not None else None
+
+    def get_surah_verses(self, surah_number: int) -> Optional[List[dict]]:
+        span = self.surah_ranges.get(surah_number)
+        return [self._record(i) for i in range(*span)] if span else None
+
+    def get_page_verses(self, page_number: int) -> Optional[List[dict]]:
+        span = self.page_ranges.get(page_number)
+        return [self._record(i) for i in range(*span)] if span else None
+
+    def iter_verses(self):
+        for i in range(len(self.verse_keys)):
+            yield self._record(i)
+
+
+_corpus: Optional[QuranCorpus] = None
+
+
+def load_corpus(path: Optional[str]) -> Optional[QuranCorpus]:
+    """Open the corpus at `path`; leaves the store empty if nothing was imported there"""
+    global _corpus
+    if not path or not os.path.exists(os.path.join(path, META_FILE)):
+        logger.info(f"No Quran corpus at {path}; serving Quran text from api.quran.com")
+        return None
+    try:
+        corpus = QuranCorpus(path)
+    except Exception as e:
+        logger.error(f"Failed to load Quran corpus from {path}: {e}")
+        return None
+    if _corpus is not None:
+        _corpus.close()
+    _corpus = corpus
+    logger.info(f"Loaded Quran corpus: {len(corpus)} verses, translations={sorted(corpus.translations)}")
+    return corpus
+
+
+def close_corpus():
+    global _corpus
+    if _corpus is not None:
+        _corpus.close()
+        _corpus = None
+
+
+def get_corpus() -> Optional[QuranCorpus]:
+    return _corpus
+
+
+def _verse_sort_key(verse: dict):
+    surah, ayah = verse["verse_key"].split(":")
+    return int(surah), int(ayah)
+
+
+def import_dump(dump_path: str, out_dir: str) -> int:
+    """Pack a quran.com dump into the on-disk corpus format; returns the verse count"""
+    with open(dump_path, "r", encoding="utf-8") as f:
+        dump = json.load(f)
+
+    verses = sorted(dump["verses"], key=_verse_sort_key)
+    chapters = {int(c["id"]): c for c in dump["chapters"]}
+    translations = set()
+
+    tmp_dir = out_dir.rstrip(os.sep) + ".tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    offsets = array(_OFFSET_TYPECODE, [0])
+    verse_keys = []
+    surah_ranges: Dict[int, list] = {}
+    page_ranges: Dict[int, list] = {}
+
+    with open(os.path.join(tmp_dir, DATA_FILE), "wb") as data:
+        for i, verse in enumerate(verses):
+            verse_translations = verse.get("translations") or {}
+            if isinstance(verse_translations, list):
+                # Raw API shape: a single, unnamed translation list
+                verse_translations = {dump.get("default_translation", "en.sahih"): verse_translations}
+            verse["translations"] = verse_translations
+            translations.update(verse_translations)
+
+            encoded = json.dumps(verse, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            data.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+            verse_keys.append(verse["verse_key"])
+
+            surah_number = _verse_sort_key(verse)[0]
+            surah_ranges.setdefault(surah_number, [i, i])[1] = i + 1
+            page = verse.get("page_number")
+            if page:
+                page_ranges.setdefault(int(page), [i, i])[1] = i + 1
+
+    with open(os.path.join(tmp_dir, INDEX_FILE), "wb") as f:
+        f.write(offsets.tobytes())
+
+    meta = {
+        "version": CORPUS_VERSION,
+        "verse_keys": verse_keys,
+        "translations": sorted(translations),
+        "chapters": {str(k): v for k, v in chapters.items()},
+        "surah_ranges": {str(k): v for k, v in surah_ranges.items()},
+        "page_ranges": {str(k): v for k, v in page_ranges.items()},
+    }
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Swap the finished directory in so a running reader never sees a half-written corpus
+    if os.path.exists(out_dir):
+        old_dir = out_dir.rstrip(os.sep) + ".old"
+        os.replace(out_dir, old_dir)
+        os.replace(tmp_dir, out_dir)
+        for name in os.listdir(old_dir):
+            os.remove(os.path.join(old_dir, name))
+        os.rmdir(old_dir)
+    else:
+        os.replace(tmp_dir, out_dir)
+
+    logger.info(f"Imported {len(verse_keys)} verses into {out_dir}")
+    return len(verse_keys)
+
+
+def fetch_dump(dump_path: str, translations: List[str], base_url: str = "https://api.quran.com/api/v4"):
+    """Download chapters and verses from api.quran.com into a dump file"""
+    import httpx
+
+    verses_by_key: Dict[str, dict] = {}
+    with httpx.Client(timeout=60) as client:
+        chapters = client.get(f"{base_url}/chapters", params={"language": "en"}).json()["chapters"]
+        for chapter in chapters:
+            for translation in translations:
+                page = 1
+                while page:
+                    res = client.get(
+                        f"{base_url}/verses/by_chapter/{chapter['id']}",
+                        params={
+                            "language": "en",
+                            "translations": translation,
+                            "per_page": 50,
+                            "page": page,
+                            "words": True,
+                            "fields": "text_qpc_hafs",
+                        },
+                    )
+                    res.raise_for_status()
+                    body = res.json()
+                    for verse in body.get("verses", []):
+                        stored = verses_by_key.setdefault(verse["verse_key"], {**verse, "translations": {}})
+                        stored["translations"][translation] = verse.get("translations") or []
+                    page = (body.get("pagination") or {}).get("next_page")
+            logger.info(f"Fetched Surah {chapter['id']}")
+
+    with open(dump_path, "w", encoding="utf-8") as f:
+        json.dump({"chapters": chapters, "verses": list(verses_by_key.values())}, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    usage = (
+        "usage: python -m src.services.quran_corpus fetch <dump.json> [translation ...]\n"
+        "       python -m src.services.quran_corpus import <dump.json> <corpus_dir>"
+    )
+    if len(sys.argv) >= 3 and sys.argv[1] == "fetch":
+        fetch_dump(sys.argv[2], sys.argv[3:] or ["en.sahih"])
+    elif len(sys.argv) == 4 and sys.argv[1] == "import":
+        import_dump(sys.argv[2], sys.argv[3])
+    else:
+        print(usage)
+        sys.exit(1)
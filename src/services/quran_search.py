@@ -0,0 +1,246 @@
+# quran_search.py
+"""
+In-process full-text search over the local Quran corpus.
+
+Every verse is indexed as one document made of its normalized Arabic text
+(text_qpc_hafs) followed by each stored translation. Postings keep token
+positions so quoted phrases can be matched; plain terms are ranked with
+BM25 and a trailing `*` expands a term to the MAX_PREFIX_EXPANSIONS indexed
+terms with that prefix that occur in the most verses.
+
+A snapshot records the corpus fingerprint and NORMALIZER_VERSION it was
+built from and is rebuilt when either differs.
+
+Query syntax:  mercy         ranked term
+               rah*          prefix
+               "lord of the" phrase (required)
+"""
+
+import bisect
+import logging
+import math
+import os
+import pickle
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+# Bump whenever normalize/tokenize change, so old snapshots are rebuilt
+NORMALIZER_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSIONS = 50
+FIELD_GAP = 100  # position gap between Arabic text and each translation
+
+_ARABIC_MARKS = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u08D3-\u08FF\u0640]")
+_ARABIC_FOLD = str.maketrans({
+    "\u0622": "\u0627",  # alef with madda -> alef
+    "\u0623": "\u0627",  # alef with hamza above -> alef
+    "\u0625": "\u0627",  # alef with hamza below -> alef
+    "\u0671": "\u0627",  # alef wasla -> alef
+    "\u0649": "\u064A",  # alef maksura -> ya
+    "\u0629": "\u0647",  # ta marbuta -> ha
+    "\u0624": "\u0648",  # waw with hamza -> waw
+    "\u0626": "\u064A",  # ya with hamza -> ya
+})
+_HTML_TAG = re.compile(r"<sup[^>]*>.*?</sup>|<[^>]+>")
+_TOKEN = re.compile(r"[^\W\d_]+", re.UNICODE)
+_QUERY_PART = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def normalize(text: str) -> str:
+    """Strip diacritics/tatweel, unify alef, ya and ta-marbuta forms, lowercase Latin"""
+    text = _ARABIC_MARKS.sub("", text)
+    return text.translate(_ARABIC_FOLD).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(normalize(_HTML_TAG.sub(" ", text or "")))
+
+
+def _translation_texts(verse: dict) -> List[str]:
+    translations = verse.get("translations") or {}
+    if isinstance(translations, dict):
+        lists = translations.values()
+    else:
+        lists = [translations]
+    return [t.get("text", "") for items in lists for t in items]
+
+
+class QuranSearchIndex:
+    def __init__(self):
+        self.verse_keys: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, List[int]]] = {}
+        self.terms: List[str] = []
+        self.avg_doc_length = 0.0
+        self.normalizer_version = NORMALIZER_VERSION
+        self.corpus_fingerprint: Optional[str] = None
+
+    @classmethod
+    def build(cls, verses, corpus_fingerprint: Optional[str] = None) -> "QuranSearchIndex":
+        index = cls()
+        index.corpus_fingerprint = corpus_fingerprint
+        postings = defaultdict(dict)
+        for doc_id, verse in enumerate(verses):
+            index.verse_keys.append(verse["verse_key"])
+            position = 0
+            for field_text in [verse.get("text_qpc_hafs") or ""] + _translation_texts(verse):
+                for token in tokenize(field_text):
+                    postings[token].setdefault(doc_id, []).append(position)
+                    position += 1
+                position += FIELD_GAP
+            index.doc_lengths.append(max(position - FIELD_GAP, 0))
+        index.postings = dict(postings)
+        index._finalize()
+        return index
+
+    def _finalize(self):
+        self.terms = sorted(self.postings)
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def __len__(self):
+        return len(self.verse_keys)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.verse_keys)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _score_term(self, term: str, scores: Dict[int, float], only: Optional[set] = None):
+        docs = self.postings.get(term)
+        if not docs:
+            return
+        idf = self._idf(term)
+        for doc_id, positions in docs.items():
+            if only is not None and doc_id not in only:
+                continue
+            tf = len(positions)
+            norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / (self.avg_doc_length or 1)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\U0010ffff", start)
+        matches = self.terms[start:end]
+        if len(matches) > MAX_PREFIX_EXPANSIONS:
+            logger.info(f"Prefix {prefix!r}* matches {len(matches)} terms; searching the {MAX_PREFIX_EXPANSIONS} most frequent")
+            matches = sorted(matches, key=lambda term: -len(self.postings[term]))[:MAX_PREFIX_EXPANSIONS]
+        return matches
+
+    def _phrase_docs(self, tokens: List[str]) -> set:
+        if not tokens or any(t not in self.postings for t in tokens):
+            return set()
+        candidates = set(self.postings[tokens[0]])
+        for token in tokens[1:]:
+            candidates &= self.postings[token].keys()
+        matched = set()
+        for doc_id in candidates:
+            following = [set(self.postings[t][doc_id]) for t in tokens[1:]]
+            for start in self.postings[tokens[0]][doc_id]:
+                if all(start + i + 1 in positions for i, positions in enumerate(following)):
+                    matched.add(doc_id)
+                    break
+        return matched
+
+    def search(self, query: str, limit: int = 100) -> List[Tuple[str, float]]:
+        terms: List[str] = []
+        phrases: List[List[str]] = []
+        for phrase, word in _QUERY_PART.findall(query):
+            if phrase:
+                tokens = tokenize(phrase)
+                if len(tokens) > 1:
+                    phrases.append(tokens)
+                else:
+                    terms.extend(tokens)
+            elif word.endswith("*"):
+                for prefix in tokenize(word[:-1]):
+                    terms.extend(self.expand_prefix(prefix))
+            else:
+                terms.extend(tokenize(word))
+
+        allowed = None
+        for tokens in phrases:
+            docs = self._phrase_docs(tokens)
+            allowed = docs if allowed is None else allowed & docs
+            terms.extend(tokens)
+        if allowed is not None and not allowed:
+            return []
+
+        scores: Dict[int, float] = {}
+        for term in dict.fromkeys(terms):
+            self._score_term(term, scores, allowed)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(self.verse_keys[doc_id], score) for doc_id, score in ranked]
+
+    def save(self, path: str):
+        tmp_path = path + ".tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {
+                    "version": SNAPSHOT_VERSION,
+                    "normalizer": NORMALIZER_VERSION,
+                    "corpus": self.corpus_fingerprint,
+                    "verse_keys": self.verse_keys,
+                    "doc_lengths": self.doc_lengths,
+                    "postings": self.postings,
+                },
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "QuranSearchIndex":
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported search snapshot version {data.get('version')}")
+        index = cls()
+        index.normalizer_version = data["normalizer"]
+        index.corpus_fingerprint = data["corpus"]
+        index.verse_keys = data["verse_keys"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = data["postings"]
+        index._finalize()
+        return index
+
+
+_index: Optional[QuranSearchIndex] = None
+
+
+def get_search_index() -> Optional[QuranSearchIndex]:
+    return _index
+
+
+def load_or_build_index(corpus, snapshot_path: Optional[str] = None) -> Optional[QuranSearchIndex]:
+    """Load the snapshot if it matches the corpus, otherwise rebuild (and re-save) it"""
+    global _index
+    if corpus is None:
+        return None
+    index = None
+    if snapshot_path and os.path.exists(snapshot_path):
+        try:
+            index = QuranSearchIndex.load(snapshot_path)
+            if index.corpus_fingerprint != corpus.fingerprint() or index.normalizer_version != NORMALIZER_VERSION:
+                logger.info("Quran search snapshot is stale; rebuilding")
+                index = None
+        except Exception as e:
+            logger.warning(f"Could not load Quran search snapshot {snapshot_path}: {e}")
+            index = None
+    if index is None:
+        index = QuranSearchIndex.build(corpus.iter_verses(), corpus.fingerprint())
+        if snapshot_path:
+            try:
+                index.save(snapshot_path)
+            except OSError as e:
+                logger.warning(f"Could not write Quran search snapshot {snapshot_path}: {e}")
+    _index = index
+    logger.info(f"Quran search index ready: {len(index)} verses, {len(index.terms)} terms")
+    return index
+
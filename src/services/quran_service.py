@@ -1,10 +1,22 @@
 # quran_service.py
 
+import asyncio
 import httpx
 import os
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from ..config import settings
+from .quran_corpus import get_corpus
+from .quran_search import get_search_index
+from ..utils import upstream_cache
+from . import recitation_timings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
@@ -13,51 +25,227 @@ AUDIO_DIR = None
 TAFSIR_CACHE = {}
 AUDIO_CACHE = {}
 TIMESTAMP_CACHE = {}
+CHAPTER_CACHE = {}
+TRANSLATION_CACHE = {}
 BASE_URL = "https://api.quran.com/api/v4"
 MISHARY_RECITER_ID = 7
+TAFSIR_IDS = {"ibn_kathir": 1, "asadd": 20}
 
+# Memory tier per upstream data kind: (store, memory TTL). Every entry is also
+# written to the persistent tier in upstream_cache, which outlives restarts
+# and is shared by all replicas.
+MEMORY_TIERS = {
+    "tafsir": (TAFSIR_CACHE, timedelta(hours=1)),
+    "timestamps": (TIMESTAMP_CACHE, timedelta(hours=24)),
+    "chapters": (CHAPTER_CACHE, timedelta(hours=24)),
+    "translations": (TRANSLATION_CACHE, timedelta(hours=24)),
+}
 
-async def get_timestamps(reciter_id: int, surah_number: int):
-    key = f"{reciter_id}:{surah_number}"
-    if key in TIMESTAMP_CACHE:
-        cached, expiry = TIMESTAMP_CACHE[key]
+_http_client: Optional[httpx.AsyncClient] = None
+_tafsir_limit: Optional[asyncio.Semaphore] = None
+_chunk_limit: Optional[asyncio.Semaphore] = None
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.QURAN_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.QURAN_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.QURAN_HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.QURAN_HTTP_TIMEOUT,
+        connect=settings.QURAN_HTTP_CONNECT_TIMEOUT,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=settings.QURAN_HTTP2 and HTTP2_AVAILABLE,
+    )
+
+
+async def init_http_client():
+    """Create the shared upstream client (called from the app startup hook)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _build_http_client()
+        logging.info(f"Quran HTTP client ready (http2={settings.QURAN_HTTP2 and HTTP2_AVAILABLE})")
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared upstream client (called from the app shutdown hook)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled client, creating it lazily outside the app lifecycle"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _build_http_client()
+    return _http_client
+
+
+def _memory_get(kind: str, key: str):
+    store, _ = MEMORY_TIERS[kind]
+    if key in store:
+        cached, expiry = store[key]
         if datetime.utcnow() < expiry:
             return cached
-    async with httpx.AsyncClient() as client:
-        res = await client.get(
-            f"{BASE_URL}/chapter_recitations/{reciter_id}/{surah_number}",
-            params={"segments": True},
+    return None
+
+def _remember_in_memory(kind: str, key: str, value, persisted_until: Optional[datetime] = None):
+    store, ttl = MEMORY_TIERS[kind]
+    expiry = datetime.utcnow() + ttl
+    if persisted_until is not None:
+        expiry = min(expiry, persisted_until)
+    store[key] = (value, expiry)
+
+def _remember(kind: str, key: str, value):
+    _remember_in_memory(kind, key, value)
+    upstream_cache.store(kind, key, value, timedelta(days=settings.QURAN_PERSISTENT_CACHE_DAYS))
+
+async def _tiered_get(kind: str, key: str):
+    """Memory tier first, then the persistent tier (promoting hits into memory)"""
+    cached = _memory_get(kind, key)
+    if cached is not None:
+        return cached
+    persisted = await upstream_cache.load(kind, key)
+    if persisted is None:
+        return None
+    value, expires_at = persisted
+    _remember_in_memory(kind, key, value, expires_at)
+    return value
+
+async def warm_caches():
+    """Fill the memory tier from the persistent tier at startup"""
+    for kind in settings.QURAN_CACHE_WARM_KINDS:
+        if kind not in MEMORY_TIERS:
+            continue
+        count = await upstream_cache.warm(
+            kind,
+            lambda key, value, expires_at, kind=kind: _remember_in_memory(kind, key, value, expires_at),
         )
-        if res.status_code != 200:
-            logging.error(f"API Error: Failed to fetch timestamps for Surah {surah_number}, Reciter {reciter_id}. Status code: {res.status_code}")
-            return {}
-        
-        data = res.json().get("timestamps", [])
-        
-        timestamps_map = {}
-        for verse_data in data:
-            verse_key = verse_data.get("verse_key")
-            if verse_key and verse_data.get("segments"):
-                timestamps_map[verse_key] = verse_data["segments"]
-        
-        TIMESTAMP_CACHE[key] = (timestamps_map, datetime.utcnow() + timedelta(hours=24))
-        return timestamps_map
+        logging.info(f"Warmed {count} cached {kind} entries")
+
+async def get_timestamps(reciter_id: int, surah_number: int):
+    key = f"{reciter_id}:{surah_number}"
+    cached = await _tiered_get("timestamps", key)
+    if cached is not None:
+        return cached
+    client = get_http_client()
+    res = await client.get(
+        f"{BASE_URL}/chapter_recitations/{reciter_id}/{surah_number}",
+        params={"segments": True},
+    )
+    if res.status_code != 200:
+        logging.error(f"API Error: Failed to fetch timestamps for Surah {surah_number}, Reciter {reciter_id}. Status code: {res.status_code}")
+        return {}
+
+    data = res.json().get("timestamps", [])
+
+    timestamps_map = {}
+    for verse_data in data:
+        verse_key = verse_data.get("verse_key")
+        if verse_key and verse_data.get("segments"):
+            timestamps_map[verse_key] = verse_data["segments"]
+
+    _remember("timestamps", key, timestamps_map)
+    return timestamps_map
+
+async def attach_word_timings(verses: List[dict], reciter_id: int = MISHARY_RECITER_ID):
+    """Attach word timings from the precomputed store, aligning unseen surahs on demand"""
+    store = recitation_timings.get_store(reciter_id)
+    for surah_number in dict.fromkeys(int(v["verse_key"].split(":")[0]) for v in verses):
+        if surah_number in store.surahs_loaded:
+            continue
+        timestamps_map = await get_timestamps(reciter_id, surah_number)
+        # An empty map is an upstream failure; don't record it as "no timings"
+        if timestamps_map and surah_number not in store.surahs_loaded:
+            store.ingest_surah(surah_number, timestamps_map)
+    for verse in verses:
+        store.attach(verse)
+
+def _cached_tafsir(ayah_key: str, tafsir_source: str):
+    return _memory_get("tafsir", f"{ayah_key}:{tafsir_source}")
 
 async def get_tafsir(ayah_key: str, tafsir_source: str):
     key = f"{ayah_key}:{tafsir_source}"
-    if key in TAFSIR_CACHE:
-        cached, expiry = TAFSIR_CACHE[key]
-        if datetime.utcnow() < expiry:
-            return cached
-    async with httpx.AsyncClient() as client:
-        tafsir_map = {"ibn_kathir": 1, "asadd": 20}
-        tafsir_id = tafsir_map.get(tafsir_source, 1)
-        res = await client.get(f"{BASE_URL}/tafsirs/by_ayah/{ayah_key}", params={"tafsir_id": tafsir_id})
+    cached = await _tiered_get("tafsir", key)
+    if cached is not None:
+        return cached
+    client = get_http_client()
+    tafsir_id = TAFSIR_IDS.get(tafsir_source, 1)
+    res = await client.get(f"{BASE_URL}/tafsirs/by_ayah/{ayah_key}", params={"tafsir_id": tafsir_id})
+    if res.status_code != 200:
+        return None
+    data = res.json().get("tafsir")
+    _remember("tafsir", key, data)
+    return data
+
+async def get_chapter_tafsir(surah_number: int, tafsir_source: str) -> bool:
+    """Fill TAFSIR_CACHE for a whole surah from the by-chapter endpoint"""
+    client = get_http_client()
+    tafsir_id = TAFSIR_IDS.get(tafsir_source, 1)
+    fetched = []
+    page = 1
+    while True:
+        res = await client.get(
+            f"{BASE_URL}/tafsirs/{tafsir_id}/by_chapter/{surah_number}",
+            params={"per_page": 50, "page": page},
+        )
         if res.status_code != 200:
-            return None
-        data = res.json().get("tafsir")
-        TAFSIR_CACHE[key] = (data, datetime.utcnow() + timedelta(hours=1))
-        return data
+            logging.error(f"API Error: Failed to fetch tafsir {tafsir_source} for Surah {surah_number}. Status code: {res.status_code}")
+            return False
+        body = res.json()
+        for item in body.get("tafsirs", []):
+            verse_key = item.get("verse_key")
+            if verse_key:
+                key = f"{verse_key}:{tafsir_source}"
+                _remember_in_memory("tafsir", key, item)
+                fetched.append((key, item))
+        next_page = (body.get("pagination") or {}).get("next_page")
+        if not next_page:
+            break
+        page = next_page
+    upstream_cache.store_many(
+        "tafsir", fetched, datetime.utcnow() + timedelta(days=settings.QURAN_PERSISTENT_CACHE_DAYS)
+    )
+    return True
+
+def _tafsir_semaphore() -> asyncio.Semaphore:
+    """One limit shared by every request, created on first use inside the running loop"""
+    global _tafsir_limit
+    if _tafsir_limit is None:
+        _tafsir_limit = asyncio.Semaphore(settings.QURAN_TAFSIR_CONCURRENCY)
+    return _tafsir_limit
+
+async def get_tafsirs_for_verses(ayah_keys: List[str], tafsir_sources: List[str]) -> Dict[str, list]:
+    """Resolve tafsir for many verses concurrently; upstream fetches across all
+    requests are bounded by QURAN_TAFSIR_CONCURRENCY"""
+    semaphore = _tafsir_semaphore()
+
+    async def fetch(ayah_key: str, source: str):
+        cached = _cached_tafsir(ayah_key, source)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            try:
+                return await get_tafsir(ayah_key, source)
+            except httpx.HTTPError as e:
+                logging.warning(f"Tafsir fetch failed for {ayah_key} ({source}): {e}")
+                return None
+
+    pairs = [(ayah_key, source) for ayah_key in ayah_keys for source in tafsir_sources]
+    results = await asyncio.gather(*(fetch(ayah_key, source) for ayah_key, source in pairs))
+
+    tafsir_by_verse = {ayah_key: [] for ayah_key in ayah_keys}
+    for (ayah_key, source), data in zip(pairs, results):
+        if data:
+            tafsir_by_verse[ayah_key].append({"source": source.replace('_', ' ').title(), "text": data.get("text")})
+    return tafsir_by_verse
 
 def list_reciters():
     return []
@@ -84,11 +272,97 @@ def extract_translation(verse: dict) -> str:
     return verse_translation
 
 async def get_surah_list():
-    async with httpx.AsyncClient() as client:
-        res = await client.get(f"{BASE_URL}/chapters")
-        if res.status_code != 200:
-            return None
-        return res.json().get("chapters")
+    corpus = get_corpus()
+    if corpus is not None and corpus.chapters:
+        return corpus.list_chapters()
+    cached = await _tiered_get("chapters", "all")
+    if cached is not None:
+        return cached
+    client = get_http_client()
+    res = await client.get(f"{BASE_URL}/chapters")
+    if res.status_code != 200:
+        return None
+    chapters = res.json().get("chapters")
+    if chapters:
+        _remember("chapters", "all", chapters)
+    return chapters
+
+async def _get_chapter(surah_number: int) -> Optional[dict]:
+    corpus = get_corpus()
+    if corpus is not None:
+        chapter = corpus.get_chapter(surah_number)
+        if chapter:
+            return chapter
+    cached = await _tiered_get("chapters", str(surah_number))
+    if cached is not None:
+        return dict(cached)
+    client = get_http_client()
+    res = await client.get(f"{BASE_URL}/chapters/{surah_number}", params={"language": "en"})
+    if res.status_code != 200:
+        return None
+    chapter = res.json().get("chapter")
+    if chapter:
+        _remember("chapters", str(surah_number), chapter)
+    return chapter
+
+async def _fetch_remote_translations(path: str, translation: str) -> Dict[str, list]:
+    """Translation-only upstream read used when the local corpus lacks `translation`"""
+    translations = {}
+    try:
+        client = get_http_client()
+        page = 1
+        while page:
+            res = await client.get(
+                f"{BASE_URL}/verses/{path}",
+                params={"translations": translation, "per_page": 50, "page": page},
+            )
+            if res.status_code != 200:
+                logging.error(f"API Error: Failed to fetch translation {translation} for {path}. Status code: {res.status_code}")
+                break
+            body = res.json()
+            if "verse" in body:
+                verse = body["verse"]
+                translations[verse["verse_key"]] = verse.get("translations") or []
+                break
+            for verse in body.get("verses", []):
+                translations[verse["verse_key"]] = verse.get("translations") or []
+            page = (body.get("pagination") or {}).get("next_page")
+    except httpx.HTTPError as e:
+        logging.warning(f"Translation fallback failed for {path} ({translation}): {e}")
+    return translations
+
+async def _apply_corpus_translation(verses: List[dict], translation: str, path: str) -> List[dict]:
+    corpus = get_corpus()
+    if corpus.has_translation(translation):
+        for verse in verses:
+            verse["translations"] = verse.get("translations", {}).get(translation, [])
+        return verses
+    # Words without a stored translation still fall back to the word-by-word
+    # gloss in extract_translation when the upstream is unreachable.
+    remote = await _fetch_remote_translations(path, translation)
+    for verse in verses:
+        verse["translations"] = remote.get(verse["verse_key"], [])
+    return verses
+
+async def _get_verses(path: str, translation: str, reciter_base: str, local_verses: Optional[List[dict]]):
+    if local_verses is not None:
+        return await _apply_corpus_translation(local_verses, translation, path)
+    client = get_http_client()
+    verses_res = await client.get(
+        f"{BASE_URL}/verses/{path}",
+        params={
+            "language": "en",
+            "translations": translation,
+            "limit": 300,
+            "words": True,
+            "fields": "text_qpc_hafs",
+            "reciter": reciter_base
+        },
+    )
+    if verses_res.status_code != 200:
+        logging.error(f"API Error: Failed to fetch verses for {path}. Status code: {verses_res.status_code}")
+        return None
+    return verses_res.json().get("verses")
 
 async def get_surah_detail(
     surah_number: int,
@@ -97,87 +371,61 @@ async def get_surah_detail(
     reciter: Optional[str] = None,
 ):
     
-    async with httpx.AsyncClient() as client:
-        surah_res = await client.get(f"{BASE_URL}/chapters/{surah_number}", params={"language": "en"})
-        if surah_res.status_code != 200:
-            return None
-        surah = surah_res.json().get("chapter")
-        
-        reciter_base = reciter.replace('.mp3', '') if reciter else 'mishary_rashid'
-        
-        verses_res = await client.get(
-            f"{BASE_URL}/verses/by_chapter/{surah_number}",
-            params={
-                "language": "en",
-                "translations": translation,
-                "limit": 300, 
-                "words": True,
-                "fields": "text_qpc_hafs", 
-                "reciter": reciter_base
-            },
+    surah = await _get_chapter(surah_number)
+    if not surah:
+        return None
+
+    reciter_base = reciter.replace('.mp3', '') if reciter else 'mishary_rashid'
+
+    corpus = get_corpus()
+    local_verses = corpus.get_surah_verses(surah_number) if corpus is not None else None
+    verses = await _get_verses(f"by_chapter/{surah_number}", translation, reciter_base, local_verses)
+    if verses is None:
+        return None
+
+    surah_audio_url = get_audio(surah_number, reciter_base)
+
+    tafsir_by_verse = {}
+    if tafsir_sources:
+        # Whole surah requested: one paged by-chapter call per source warms the
+        # cache, and the per-verse fan-out only picks up whatever it missed.
+        verse_keys = [v["verse_key"] for v in verses]
+        missing_sources = [
+            source for source in tafsir_sources
+            if any(_cached_tafsir(verse_key, source) is None for verse_key in verse_keys)
+        ]
+        await asyncio.gather(
+            *(get_chapter_tafsir(surah_number, source) for source in missing_sources),
+            return_exceptions=True,
         )
-        
-        if verses_res.status_code != 200:
-            logging.error(f"API Error: Failed to fetch verses for Surah {surah_number}. Status code: {verses_res.status_code}")
-            return None
-        
-        verses_json = verses_res.json()
-        verses = verses_json.get("verses")
-        
-        surah_audio_url = get_audio(surah_number, reciter_base)
-        
-        timestamps_map = {}
-        if reciter and surah_number != 1:
-            timestamps_map = await get_timestamps(MISHARY_RECITER_ID, surah_number)
-            
-        for verse in verses:
-            verse["translation"] = extract_translation(verse)
-            
-            verse["text_qpc_hafs"] = verse.get("text_qpc_hafs")
+        tafsir_by_verse = await get_tafsirs_for_verses([v["verse_key"] for v in verses], tafsir_sources)
 
-            ayah_key = verse["verse_key"]
-            
-            tafsir_data = []
-            if tafsir_sources:
-                for source in tafsir_sources:
-                    data = await get_tafsir(ayah_key, source)
-                    if data:
-                        tafsir_data.append({"source": source.replace('_', ' ').title(), "text": data.get("text")})
-            verse["tafsir"] = tafsir_data
-            
-            if reciter and surah_number != 1:
-                if ayah_key in timestamps_map:
-                    timestamps = timestamps_map[ayah_key]
-                    words = verse.get("words", [])
-                    
-                    if len(timestamps) == len(words):
-                        for i, word in enumerate(words):
-                            segment = timestamps[i]
-                            word["timing"] = {"start": segment[1], "end": segment[2]}
-                        verse["words"] = words
-                    else:
-                        logging.warning(
-                            f"Timestamp Mismatch for {ayah_key}: Words ({len(words)}) != Segments ({len(timestamps)}). Timing data will be missing for this verse."
-                        )
-                else:
-                    logging.warning(
-                        f"Missing Timestamp Entry for {ayah_key} in Surah {surah_number}. Timing data could not be applied."
-                    )
-                
-        formatted_surah = {
-            "id": surah.get("id"),
-            "name_arabic": surah.get("name_arabic"),
-            "name_simple": surah.get("name_simple"),
-            "name_complex": surah.get("name_complex"),
-            "name_translated": surah.get("translated_name", {}).get("name"),
-            "revelation_place": surah.get("revelation_place"),
-            "verses_count": surah.get("verses_count"),
-            "bismillah": None, 
-            "audio_url": surah_audio_url,
-            "verses": verses,
-        }
-        
-        return formatted_surah
+    for verse in verses:
+        verse["translation"] = extract_translation(verse)
+
+        verse["text_qpc_hafs"] = verse.get("text_qpc_hafs")
+
+        ayah_key = verse["verse_key"]
+
+        verse["tafsir"] = tafsir_by_verse.get(ayah_key, [])
+
+    if reciter and surah_number != 1:
+        await attach_word_timings(verses)
+
+    formatted_surah = {
+        "id": surah.get("id"),
+        "name_arabic": surah.get("name_arabic"),
+        "name_simple": surah.get("name_simple"),
+        "name_complex": surah.get("name_complex"),
+        "name_translated": surah.get("translated_name", {}).get("name"),
+        "revelation_place": surah.get("revelation_place"),
+        "verses_count": surah.get("verses_count"),
+        "bismillah": None, 
+        "audio_url": surah_audio_url,
+        "verses": verses,
+    }
+
+    return formatted_surah
 
 async def get_page_detail(
     page_number: int,
@@ -188,81 +436,50 @@ async def get_page_detail(
     
     reciter_base = reciter.replace('.mp3', '') if reciter else 'mishary_rashid'
     
-    async with httpx.AsyncClient() as client:
-        verses_res = await client.get(
-            f"{BASE_URL}/verses/by_page/{page_number}",
-            params={
-                "language": "en",
-                "translations": translation,
-                "words": True,
-                "fields": "text_qpc_hafs",
-                "reciter": reciter_base
-            }
-        )
-        
-        if verses_res.status_code != 200:
-            logging.error(f"API Error: Failed to fetch verses for Page {page_number}. Status code: {verses_res.status_code}")
-            return None
-            
-        verses_json = verses_res.json()
-        verses = verses_json.get("verses")
-        
-        if not verses:
-            return {"verses": []}
-            
-        first_verse_key = verses[0]["verse_key"]
-        surah_number = int(first_verse_key.split(":")[0])
-        
-        surah_res = await client.get(f"{BASE_URL}/chapters/{surah_number}", params={"language": "en"})
-        surah = surah_res.json().get("chapter", {})
+    corpus = get_corpus()
+    local_verses = corpus.get_page_verses(page_number) if corpus is not None else None
+    verses = await _get_verses(f"by_page/{page_number}", translation, reciter_base, local_verses)
+    if verses is None:
+        return None
 
-        surah_start_page = surah.get("pages", [page_number, page_number])[0]
-        surah_end_page = surah.get("pages", [page_number, page_number])[1]
+    if not verses:
+        return {"verses": []}
 
-        surah_audio_url = get_audio(surah_number, reciter_base)
-        
-        timestamps_map = {}
-        if reciter and surah_number != 1:
-            timestamps_map = await get_timestamps(MISHARY_RECITER_ID, surah_number)
-            
-        for verse in verses:
-            verse["translation"] = extract_translation(verse)
-            verse["text_qpc_hafs"] = verse.get("text_qpc_hafs")
+    first_verse_key = verses[0]["verse_key"]
+    surah_number = int(first_verse_key.split(":")[0])
 
-            ayah_key = verse["verse_key"]
-            
-            tafsir_data = []
-            if tafsir_sources:
-                for source in tafsir_sources:
-                    data = await get_tafsir(ayah_key, source)
-                    if data:
-                        tafsir_data.append({"source": source.replace('_', ' ').title(), "text": data.get("text")})
-            verse["tafsir"] = tafsir_data
-            
-            if reciter and surah_number != 1:
-                if ayah_key in timestamps_map:
-                    timestamps = timestamps_map[ayah_key]
-                    words = verse.get("words", [])
-                    
-                    if len(timestamps) == len(words):
-                        for i, word in enumerate(words):
-                            segment = timestamps[i]
-                            word["timing"] = {"start": segment[1], "end": segment[2]}
-                        verse["words"] = words
-                    else:
-                        logging.warning(
-                            f"Timestamp Mismatch for {ayah_key}: Words ({len(words)}) != Segments ({len(timestamps)}). Timing data will be missing for this verse."
-                        )
-                
-        return {
-            "surah_number": surah_number,
-            "surah_name_arabic": surah.get("name_arabic"),
-            "surah_name_simple": surah.get("name_simple"),
-            "audio_url": surah_audio_url, 
-            "verses": verses,
-            "surah_start_page": surah_start_page,
-            "surah_end_page": surah_end_page,
-        }
+    surah = await _get_chapter(surah_number) or {}
+
+    surah_start_page = surah.get("pages", [page_number, page_number])[0]
+    surah_end_page = surah.get("pages", [page_number, page_number])[1]
+
+    surah_audio_url = get_audio(surah_number, reciter_base)
+
+    tafsir_by_verse = {}
+    if tafsir_sources:
+        tafsir_by_verse = await get_tafsirs_for_verses([v["verse_key"] for v in verses], tafsir_sources)
+
+    for verse in verses:
+        verse["translation"] = extract_translation(verse)
+        verse["text_qpc_hafs"] = verse.get("text_qpc_hafs")
+
+        ayah_key = verse["verse_key"]
+
+        verse["tafsir"] = tafsir_by_verse.get(ayah_key, [])
+
+    if reciter:
+        # A page can run into the next surah; Al-Fatiha keeps its old exclusion
+        await attach_word_timings([v for v in verses if not v["verse_key"].startswith("1:")])
+
+    return {
+        "surah_number": surah_number,
+        "surah_name_arabic": surah.get("name_arabic"),
+        "surah_name_simple": surah.get("name_simple"),
+        "audio_url": surah_audio_url, 
+        "verses": verses,
+        "surah_start_page": surah_start_page,
+        "surah_end_page": surah_end_page,
+    }
 
 async def get_ayah(
     ayah_key: str,
@@ -270,9 +487,14 @@ async def get_ayah(
     reciter: Optional[str] = None,
 ):
     
-    async with httpx.AsyncClient() as client:
+    corpus = get_corpus()
+    local_verse = corpus.get_verse(ayah_key) if corpus is not None else None
+    if local_verse is not None:
+        verse = (await _apply_corpus_translation([local_verse], "en.sahih", f"by_key/{ayah_key}"))[0]
+    else:
+        client = get_http_client()
         res = await client.get(
-            f"{BASE_URL}/verses/{ayah_key}", 
+            f"{BASE_URL}/verses/{ayah_key}",
             params={
                 "fields": "text_qpc_hafs",
                 "translations": "en.sahih",
@@ -281,53 +503,170 @@ async def get_ayah(
         )
         if res.status_code != 200:
             return None
-        
         verse = res.json().get("verse")
-        surah_number = verse["chapter_id"]
-        
-        verse["translation"] = extract_translation(verse)
-        verse["text_qpc_hafs"] = verse.get("text_qpc_hafs")
-        
-        tafsir_data = []
-        if tafsir_sources:
-            for source in tafsir_sources:
-                data = await get_tafsir(ayah_key, source)
-                if data:
-                    tafsir_data.append({"source": source.replace('_', ' ').title(), "text": data.get("text")})
-        verse["tafsir"] = tafsir_data
-
-        if reciter:
-            reciter_base = reciter.replace('.mp3', '')
-            
-            timestamps_map = await get_timestamps(MISHARY_RECITER_ID, surah_number)
-            if ayah_key in timestamps_map:
-                timestamps = timestamps_map[ayah_key]
-                words = verse.get("words", [])
-                
-                if len(timestamps) == len(words):
-                    for i, word in enumerate(words):
-                        segment = timestamps[i]
-                        word["timing"] = {"start": segment[1], "end": segment[2]}
-                    verse["words"] = words
-                    
-        return verse
+
+    verse["translation"] = extract_translation(verse)
+    verse["text_qpc_hafs"] = verse.get("text_qpc_hafs")
+
+    tafsir_data = []
+    if tafsir_sources:
+        tafsir_data = (await get_tafsirs_for_verses([ayah_key], tafsir_sources))[ayah_key]
+    verse["tafsir"] = tafsir_data
+
+    if reciter:
+        await attach_word_timings([verse])
+
+    return verse
 
 async def get_translation(lang: str):
-    async with httpx.AsyncClient() as client:
-        res = await client.get(f"{BASE_URL}/resources/translations", params={"language": lang})
-        if res.status_code != 200:
-            return None
-        return res.json().get("translations")
+    cached = await _tiered_get("translations", lang)
+    if cached is not None:
+        return cached
+    client = get_http_client()
+    res = await client.get(f"{BASE_URL}/resources/translations", params={"language": lang})
+    if res.status_code != 200:
+        return None
+    translations = res.json().get("translations")
+    if translations:
+        _remember("translations", lang, translations)
+    return translations
+
+SEARCH_CHUNK_SIZE = 50
+SEARCH_STREAM_BATCH = 10
+
+async def _fetch_verse_chunk(surah_number: int, chunk: int) -> Dict[str, dict]:
+    """One by_chapter page of SEARCH_CHUNK_SIZE verses, keyed by verse_key"""
+    client = get_http_client()
+    res = await client.get(
+        f"{BASE_URL}/verses/by_chapter/{surah_number}",
+        params={
+            "fields": "text_qpc_hafs",
+            "translations": "en.sahih",
+            "words": True,
+            "per_page": SEARCH_CHUNK_SIZE,
+            "page": chunk,
+        },
+    )
+    if res.status_code != 200:
+        logging.error(f"API Error: Failed to fetch verses for Surah {surah_number}, chunk {chunk}. Status code: {res.status_code}")
+        return {}
+    return {v["verse_key"]: v for v in res.json().get("verses", [])}
+
+def _chunk_semaphore() -> asyncio.Semaphore:
+    """Shared limit on by_chapter page fetches, like _tafsir_semaphore"""
+    global _chunk_limit
+    if _chunk_limit is None:
+        _chunk_limit = asyncio.Semaphore(settings.QURAN_CHUNK_CONCURRENCY)
+    return _chunk_limit
+
+async def _limited_verse_chunk(surah_number: int, chunk: int) -> Dict[str, dict]:
+    async with _chunk_semaphore():
+        return await _fetch_verse_chunk(surah_number, chunk)
+
+async def _corpus_verse_group(surah_number: int, verses: List[dict]) -> Dict[str, dict]:
+    await _apply_corpus_translation(verses, "en.sahih", f"by_chapter/{surah_number}")
+    return {v["verse_key"]: v for v in verses}
+
+def _start_verse_loads(ayah_keys: List[str]) -> Dict[str, asyncio.Task]:
+    """
+    Start loading every verse in `ayah_keys`, grouped once: one task per
+    surah served from the corpus, and one per by_chapter page of
+    SEARCH_CHUNK_SIZE verses otherwise, so N hits in one passage cost one
+    upstream request instead of N. Returns the task holding each key.
+    """
+    corpus = get_corpus()
+    local: Dict[int, List[dict]] = {}
+    remote: Dict[Tuple[int, int], List[str]] = {}
+    for ayah_key in dict.fromkeys(ayah_keys):
+        surah, ayah = (int(part) for part in ayah_key.split(":"))
+        verse = corpus.get_verse(ayah_key) if corpus is not None else None
+        if verse is not None:
+            local.setdefault(surah, []).append(verse)
+        else:
+            remote.setdefault((surah, (ayah - 1) // SEARCH_CHUNK_SIZE + 1), []).append(ayah_key)
+
+    loads: Dict[str, asyncio.Task] = {}
+    for surah, verses in local.items():
+        task = asyncio.create_task(_corpus_verse_group(surah, verses))
+        loads.update((v["verse_key"], task) for v in verses)
+    for (surah, chunk), keys in remote.items():
+        task = asyncio.create_task(_limited_verse_chunk(surah, chunk))
+        loads.update((k, task) for k in keys)
+    return loads
+
+async def _finish_verses(ayah_keys: List[str], loads: Dict[str, asyncio.Task], tafsir_source: Optional[str]) -> List[dict]:
+    """The verses for `ayah_keys`, in order, once their loads are done"""
+    verses_by_key: Dict[str, dict] = {}
+    for task in dict.fromkeys(loads[k] for k in ayah_keys if k in loads):
+        try:
+            group = await task
+        except Exception as e:
+            logging.warning(f"Verse fetch for search hits failed: {e}")
+            continue
+        verses_by_key.update((k, group[k]) for k in ayah_keys if k in group)
+
+    unique_keys = [k for k in dict.fromkeys(ayah_keys) if k in verses_by_key]
+    tafsir_by_verse = {}
+    if tafsir_source:
+        tafsir_by_verse = await get_tafsirs_for_verses(unique_keys, [tafsir_source])
 
-async def search_quran(query: str, tafsir_source: Optional[str] = None):
     results = []
-    async with httpx.AsyncClient() as client:
-        res = await client.get(f"{BASE_URL}/search", params={"q": query, "size": 100}) 
-        if res.status_code != 200:
-            return results
-        hits = res.json().get("data", [])
-        for hit in hits:
-            ayah_key = hit["verse_key"]
-            verse = await get_ayah(ayah_key, tafsir_sources=[tafsir_source] if tafsir_source else None)
-            results.append(verse)
-    return results
\ No newline at end of file
+    for ayah_key in ayah_keys:
+        verse = verses_by_key.get(ayah_key)
+        if verse is None:
+            continue
+        verse["translation"] = extract_translation(verse)
+        verse["text_qpc_hafs"] = verse.get("text_qpc_hafs")
+        verse["tafsir"] = tafsir_by_verse.get(ayah_key, [])
+        results.append(verse)
+    return results
+
+async def hydrate_verses(ayah_keys: List[str], tafsir_source: Optional[str] = None) -> List[dict]:
+    """Load full verse objects for many keys at once, preserving order"""
+    loads = _start_verse_loads(ayah_keys)
+    try:
+        return await _finish_verses(ayah_keys, loads, tafsir_source)
+    finally:
+        for task in loads.values():
+            task.cancel()
+
+SEARCH_MODES = ("auto", "local", "remote")
+
+async def _search_hit_keys(query: str, mode: str = "auto") -> List[str]:
+    """
+    mode="local" ranks hits with the in-process BM25 index, "remote" asks
+    quran.com, and "auto" uses the local index whenever it has been built.
+    """
+    index = get_search_index()
+    if mode == "local" or (mode == "auto" and index is not None):
+        if index is None:
+            return []
+        return [verse_key for verse_key, _ in index.search(query, limit=100)]
+    client = get_http_client()
+    res = await client.get(f"{BASE_URL}/search", params={"q": query, "size": 100})
+    if res.status_code != 200:
+        return []
+    hits = res.json().get("data", [])
+    return [hit["verse_key"] for hit in hits]
+
+async def search_quran(query: str, tafsir_source: Optional[str] = None, mode: str = "auto"):
+    ayah_keys = await _search_hit_keys(query, mode)
+    return await hydrate_verses(ayah_keys, tafsir_source)
+
+async def iter_search_quran(query: str, tafsir_source: Optional[str] = None, mode: str = "auto"):
+    """
+    Yield hydrated hits batch by batch, in rank order. The verse pages for
+    all hits are fetched once, concurrently, and every batch is finished as
+    soon as its pages are in, so the first one can be sent while the rest load.
+    """
+    ayah_keys = await _search_hit_keys(query, mode)
+    loads = _start_verse_loads(ayah_keys)
+    batches = [ayah_keys[i:i + SEARCH_STREAM_BATCH] for i in range(0, len(ayah_keys), SEARCH_STREAM_BATCH)]
+    tasks = [asyncio.create_task(_finish_verses(batch, loads, tafsir_source)) for batch in batches]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in [*tasks, *loads.values()]:
+            task.cancel()
+
@@ -0,0 +1,221 @@
+# recitation_timings.py
+"""
+Precomputed word-timing alignment for recitation sync.
+
+Per reciter, word timings live in two flat int32 arrays (start/end in ms).
+Each verse, addressed by its global index 0..6235, owns a slice of them
+described by `offsets` and `counts`, and a `status` byte records whether its
+segments lined up with the verse's words. Attaching timings to a verse is
+then an index lookup and a slice read, with no upstream call and no
+per-request zipping; mismatches are recorded (and logged) once, in the store.
+
+Stores are filled by the offline build (`python -m src.services.recitation_timings
+build <reciter_id>`) and loaded at startup, or lazily surah by surah from the
+chapter_recitations endpoint when no prebuilt store exists.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+# Ayah count of every surah, in order; defines the global verse index
+VERSE_COUNTS = [
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109, 123, 111, 43, 52, 99, 128, 111, 110, 98, 135,
+    112, 78, 118, 64, 77, 227, 93, 88, 69, 60, 34, 30, 73, 54, 45, 83, 182, 88, 75, 85,
+    54, 53, 89, 59, 37, 35, 38, 29, 18, 45, 60, 49, 62, 55, 78, 96, 29, 22, 24, 13,
+    14, 11, 11, 18, 12, 12, 30, 52, 52, 44, 28, 28, 20, 56, 40, 31, 50, 40, 46, 42,
+    29, 19, 36, 25, 22, 17, 19, 26, 30, 20, 15, 21, 11, 8, 8, 19, 5, 8, 8, 11,
+    11, 8, 3, 9, 5, 4, 7, 3, 6, 3, 5, 4, 5, 6,
+]
+SURAH_OFFSETS = [0] + list(accumulate(VERSE_COUNTS))
+TOTAL_VERSES = SURAH_OFFSETS[-1]
+
+STATUS_UNKNOWN = 0
+STATUS_ALIGNED = 1
+STATUS_MISMATCH = 2
+STATUS_MISSING = 3
+
+
+def verse_index(verse_key: str) -> Optional[int]:
+    try:
+        surah, ayah = (int(part) for part in verse_key.split(":"))
+    except ValueError:
+        return None
+    if not 1 <= surah <= 114 or not 1 <= ayah <= VERSE_COUNTS[surah - 1]:
+        return None
+    return SURAH_OFFSETS[surah - 1] + ayah - 1
+
+
+class TimingStore:
+    def __init__(self, reciter_id: int):
+        self.reciter_id = reciter_id
+        self.starts = array("i")
+        self.ends = array("i")
+        self.offsets = array("i", [-1]) * TOTAL_VERSES
+        self.counts = array("i", [0]) * TOTAL_VERSES
+        self.status = array("b", [STATUS_UNKNOWN]) * TOTAL_VERSES
+        self.surahs_loaded = set()
+
+    def ingest_surah(self, surah_number: int, timestamps_map: Dict[str, list], word_counts: Optional[Dict[str, int]] = None):
+        """Append one surah's segments ([word, start, end] triples) to the arrays"""
+        missing = []
+        for ayah in range(1, VERSE_COUNTS[surah_number - 1] + 1):
+            verse_key = f"{surah_number}:{ayah}"
+            index = SURAH_OFFSETS[surah_number - 1] + ayah - 1
+            segments = timestamps_map.get(verse_key)
+            if not segments:
+                self.status[index] = STATUS_MISSING
+                missing.append(verse_key)
+                continue
+            self.offsets[index] = len(self.starts)
+            self.counts[index] = len(segments)
+            for segment in segments:
+                self.starts.append(int(segment[1]))
+                self.ends.append(int(segment[2]))
+            if word_counts and verse_key in word_counts:
+                self._check(index, verse_key, word_counts[verse_key])
+        if missing:
+            logger.warning(
+                f"Missing Timestamp Entries for {len(missing)} verses in Surah {surah_number} (reciter {self.reciter_id}): {', '.join(missing[:10])}"
+            )
+        self.surahs_loaded.add(surah_number)
+
+    def _check(self, index: int, verse_key: str, word_count: int) -> bool:
+        if self.counts[index] == word_count:
+            self.status[index] = STATUS_ALIGNED
+            return True
+        self.status[index] = STATUS_MISMATCH
+        logger.warning(
+            f"Timestamp Mismatch for {verse_key} (reciter {self.reciter_id}): Words ({word_count}) != Segments ({self.counts[index]}). Timing data will be missing for this verse."
+        )
+        return False
+
+    def attach(self, verse: dict) -> bool:
+        """Set word["timing"] on a verse's words; False when no aligned timing exists"""
+        verse_key = verse.get("verse_key", "")
+        index = verse_index(verse_key)
+        if index is None:
+            return False
+        state = self.status[index]
+        if state in (STATUS_MISMATCH, STATUS_MISSING):
+            return False
+        words = verse.get("words", [])
+        if state == STATUS_UNKNOWN:
+            if self.offsets[index] < 0:
+                if int(verse_key.split(":")[0]) not in self.surahs_loaded:
+                    # Surah not aligned yet; don't record a gap it may fill
+                    return False
+                self.status[index] = STATUS_MISSING
+                logger.warning(f"Missing Timestamp Entry for {verse_key} (reciter {self.reciter_id}). Timing data could not be applied.")
+                return False
+            if not self._check(index, verse_key, len(words)):
+                return False
+        start = self.offsets[index]
+        for i, word in enumerate(words):
+            word["timing"] = {"start": self.starts[start + i], "end": self.ends[start + i]}
+        return True
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        base = os.path.join(path, str(self.reciter_id))
+        with open(base + ".bin", "wb") as f:
+            for arr in (self.offsets, self.counts, self.status, self.starts, self.ends):
+                f.write(arr.tobytes())
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({
+                "version": STORE_VERSION,
+                "reciter_id": self.reciter_id,
+                "segments": len(self.starts),
+                "surahs": sorted(self.surahs_loaded),
+            }, f)
+
+    @classmethod
+    def load(cls, path: str, reciter_id: int) -> "TimingStore":
+        base = os.path.join(path, str(reciter_id))
+        with open(base + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported timing store version {meta.get('version')}")
+        store = cls(reciter_id)
+        segments = meta["segments"]
+        with open(base + ".bin", "rb") as f:
+            for arr, count in (
+                (store.offsets, TOTAL_VERSES),
+                (store.counts, TOTAL_VERSES),
+                (store.status, TOTAL_VERSES),
+                (store.starts, segments),
+                (store.ends, segments),
+            ):
+                del arr[:]
+                arr.frombytes(f.read(count * arr.itemsize))
+        store.surahs_loaded = set(meta["surahs"])
+        return store
+
+
+_stores: Dict[int, TimingStore] = {}
+
+
+def get_store(reciter_id: int) -> TimingStore:
+    store = _stores.get(reciter_id)
+    if store is None:
+        store = _stores[reciter_id] = TimingStore(reciter_id)
+    return store
+
+
+def load_stores(path: Optional[str], reciter_ids: List[int]):
+    for reciter_id in reciter_ids:
+        if not path or not os.path.exists(os.path.join(path, f"{reciter_id}.json")):
+            continue
+        try:
+            _stores[reciter_id] = TimingStore.load(path, reciter_id)
+            logger.info(f"Loaded word timings for reciter {reciter_id}")
+        except Exception as e:
+            logger.error(f"Failed to load word timings for reciter {reciter_id}: {e}")
+
+
+async def build_store(reciter_id: int, path: str):
+    """Offline pipeline: align every surah for a reciter and write the store"""
+    from . import quran_service
+    from .quran_corpus import get_corpus
+
+    corpus = get_corpus()
+    store = TimingStore(reciter_id)
+    for surah_number in range(1, 115):
+        timestamps_map = await quran_service.get_timestamps(reciter_id, surah_number)
+        if not timestamps_map:
+            # An empty map is an upstream failure; leave the surah unloaded so
+            # it is aligned on demand (or by the next build) instead of being
+            # stored as MISSING for good
+            logger.warning(f"No timestamps for Surah {surah_number} (reciter {reciter_id}); skipped")
+            continue
+        word_counts = None
+        if corpus is not None:
+            verses = corpus.get_surah_verses(surah_number) or []
+            word_counts = {v["verse_key"]: len(v.get("words", [])) for v in verses}
+        store.ingest_surah(surah_number, timestamps_map, word_counts)
+        logger.info(f"Aligned Surah {surah_number} for reciter {reciter_id}")
+    store.save(path)
+    _stores[reciter_id] = store
+    return store
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if len(sys.argv) != 3 or sys.argv[1] != "build":
+        print("usage: python -m src.services.recitation_timings build <reciter_id>")
+        sys.exit(1)
+
+    from ..config import settings
+    from .quran_corpus import load_corpus
+
+    load_corpus(settings.QURAN_CORPUS_DIR)
+    asyncio.run(build_store(int(sys.argv[2]), settings.QURAN_TIMINGS_DIR))
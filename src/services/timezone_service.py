@@ -0,0 +1,68 @@
+# timezone_service.py
+"""
+Timezone resolution for coordinates.
+
+One TimezoneFinder is shared by the whole process (building one loads its
+polygon index), and answers are memoized per grid cell: coordinates are
+snapped to TIMEZONE_CELL_DEGREES (0.01 deg, about 1 km) and the cell centre
+is resolved once. Repeat lookups are a single lru_cache hit, with no lock
+taken; only a miss serializes on the finder, which reads its data files and
+is not safe to share across threads (timetables are built in to_thread).
+"""
+
+import threading
+from functools import lru_cache
+from typing import Tuple
+
+import pytz
+from timezonefinder import TimezoneFinder
+
+from ..config import settings
+
+FALLBACK_TIMEZONE = "Africa/Lagos"
+
+_finder = None
+_finder_lock = threading.Lock()
+
+
+def _get_finder() -> TimezoneFinder:
+    # Callers hold _finder_lock
+    global _finder
+    if _finder is None:
+        _finder = TimezoneFinder()
+    return _finder
+
+
+def cell_of(lat: float, lon: float) -> Tuple[int, int]:
+    step = settings.TIMEZONE_CELL_DEGREES
+    return round(lat / step), round(lon / step)
+
+
+@lru_cache(maxsize=settings.TIMEZONE_CACHE_SIZE)
+def _cell_timezone(cell_lat: int, cell_lon: int) -> str:
+    step = settings.TIMEZONE_CELL_DEGREES
+    lat = max(-90.0, min(90.0, cell_lat * step))
+    lon = (cell_lon * step + 180.0) % 360.0 - 180.0
+    with _finder_lock:
+        return _get_finder().timezone_at(lat=lat, lng=lon) or FALLBACK_TIMEZONE
+
+
+def timezone_name(lat: float, lon: float) -> str:
+    return _cell_timezone(*cell_of(lat, lon))
+
+
+def get_timezone(lat: float, lon: float):
+    # pytz memoizes timezone objects by name
+    return pytz.timezone(timezone_name(lat, lon))
+
+
+def warm():
+    """Load the finder up front so the first request doesn't pay for it"""
+    with _finder_lock:
+        _get_finder()
+
+
+def cache_info() -> dict:
+    info = _cell_timezone.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "cells": info.currsize, "max_cells": info.maxsize}
+
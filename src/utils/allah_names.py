@@ -4,6 +4,7 @@ from bson import ObjectId
 from typing import List, Optional
 from datetime import datetime
 import random
+from . import search
 
 
 async def get_all_names(db: AsyncIOMotorDatabase) -> List[dict]:
@@ -27,17 +28,8 @@ async def get_random_name(db: AsyncIOMotorDatabase) -> Optional[dict]:
 
 
 async def search_names(db: AsyncIOMotorDatabase, query: str) -> List[dict]:
-    """Search Allah names by text"""
-    search_query = {
-        "$or": [
-            {"arabic": {"$regex": query, "$options": "i"}},
-            {"transliteration": {"$regex": query, "$options": "i"}},
-            {"meaning": {"$regex": query, "$options": "i"}}
-        ]
-    }
-    
-    names = await db["allah_names"].find(search_query).to_list(None)
-    return names
+    """Search Allah names by text, best matches first"""
+    return await search.ranked_docs(db, "allah_names", query, limit=0)
 
 
 async def create_name(db: AsyncIOMotorDatabase, name_data: dict) -> dict:
@@ -46,6 +38,7 @@ async def create_name(db: AsyncIOMotorDatabase, name_data: dict) -> dict:
     name_data["created_at"] = datetime.utcnow()
     
     result = await db["allah_names"].insert_one(name_data)
+    search.invalidate("allah_names")
     name_data["_id"] = result.inserted_id
     return name_data
 
@@ -59,6 +52,7 @@ async def update_name(db: AsyncIOMotorDatabase, name_id, name_data: dict) -> Opt
         {"_id": name_id},
         {"$set": name_data}
     )
+    search.invalidate("allah_names")
     
     if result.matched_count == 0:
         return None
@@ -72,6 +66,7 @@ async def delete_name(db: AsyncIOMotorDatabase, name_id) -> bool:
         name_id = ObjectId(name_id)
     
     result = await db["allah_names"].delete_one({"_id": name_id})
+    search.invalidate("allah_names")
     return result.deleted_count > 0
 
 
@@ -85,4 +80,5 @@ async def bulk_create_names(db: AsyncIOMotorDatabase, names_data: List[dict]) ->
         name["created_at"] = datetime.utcnow()
     
     result = await db["allah_names"].insert_many(names_data)
+    search.invalidate("allah_names")
     return [str(id) for id in result.inserted_ids]
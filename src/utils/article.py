@@ -2,208 +2,88 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from typing import List, Optional, Set, Tuple
-from datetime import datetime
-from ..models.mongo_models import ArticleInDB, ArticleCategoryInDB, ArticleViewInDB, ArticleFavoriteInDB
+from ..models.mongo_models import ArticleInDB, ArticleCategoryInDB
+from .content_repository import ContentRepository, as_object_id
 import logging
 
 logger = logging.getLogger(__name__)
 
+repo: ContentRepository[ArticleInDB, ArticleCategoryInDB] = ContentRepository(
+    "article",
+    ArticleInDB,
+    ArticleCategoryInDB,
+)
+
 
 async def get_article(db: AsyncIOMotorDatabase, article_id) -> Optional[ArticleInDB]:
     """Get a single article by ID"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    
-    article = await db["articles"].find_one({"_id": article_id})
-    return ArticleInDB(**article) if article else None
+    return await repo.get(db, article_id)
 
 
 async def create_article(db: AsyncIOMotorDatabase, article_data: dict) -> ArticleInDB:
     """Create a new article"""
-    article_data["created_at"] = datetime.utcnow()
-    article_data["updated_at"] = datetime.utcnow()
-    
-    result = await db["articles"].insert_one(article_data)
-    article_data["_id"] = result.inserted_id
-    
-    return ArticleInDB(**article_data)
+    return await repo.create(db, article_data)
 
 
 async def update_article(db: AsyncIOMotorDatabase, article_id, article_data: dict) -> Optional[ArticleInDB]:
     """Update an article"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    
-    article_data["updated_at"] = datetime.utcnow()
-    
-    result = await db["articles"].update_one(
-        {"_id": article_id},
-        {"$set": article_data}
-    )
-    
-    if result.matched_count == 0:
-        return None
-    
-    updated_article = await db["articles"].find_one({"_id": article_id})
-    return ArticleInDB(**updated_article)
+    return await repo.update(db, article_id, article_data)
 
 
 async def delete_article(db: AsyncIOMotorDatabase, article_id) -> bool:
     """Delete an article"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    
-    # Delete views and favorites
-    await db["article_views"].delete_many({"article_id": article_id})
-    await db["article_favorites"].delete_many({"article_id": article_id})
-    
-    result = await db["articles"].delete_one({"_id": article_id})
-    return result.deleted_count > 0
+    return await repo.delete(db, article_id)
 
 
 async def delete_articles_bulk(db: AsyncIOMotorDatabase, article_ids: List) -> int:
     """Delete multiple articles"""
-    if not article_ids:
-        return 0
-    
-    object_ids = [ObjectId(id) if isinstance(id, str) else id for id in article_ids]
-    
-    # Delete views and favorites
-    await db["article_views"].delete_many({"article_id": {"$in": object_ids}})
-    await db["article_favorites"].delete_many({"article_id": {"$in": object_ids}})
-    
-    result = await db["articles"].delete_many({"_id": {"$in": object_ids}})
-    return result.deleted_count
+    return await repo.delete_many(db, article_ids)
 
 
 async def bulk_create_articles(db: AsyncIOMotorDatabase, articles_data: List[dict]) -> List[str]:
     """Create multiple articles at once"""
-    if not articles_data:
-        return []
-    
-    for article in articles_data:
-        article["created_at"] = datetime.utcnow()
-        article["updated_at"] = datetime.utcnow()
-    
-    result = await db["articles"].insert_many(articles_data)
-    return [str(id) for id in result.inserted_ids]
+    return await repo.bulk_create(db, articles_data)
 
 
 async def search_articles(db: AsyncIOMotorDatabase, q: str, skip: int = 0, limit: int = 50) -> List[ArticleInDB]:
     """Search articles by text"""
-    query = {
-        "$or": [
-            {"title": {"$regex": q, "$options": "i"}},
-            {"content": {"$regex": q, "$options": "i"}},
-            {"excerpt": {"$regex": q, "$options": "i"}},
-            {"author": {"$regex": q, "$options": "i"}},
-        ]
-    }
-    
-    articles = await db["articles"].find(query).skip(skip).limit(limit).to_list(None)
-    return [ArticleInDB(**article) for article in articles]
+    return await repo.search(db, q, skip, limit)
 
 
 async def toggle_featured(db: AsyncIOMotorDatabase, article_id) -> Optional[ArticleInDB]:
     """Toggle featured status of an article"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    
-    article = await db["articles"].find_one({"_id": article_id})
-    if not article:
-        return None
-    
-    new_featured_status = not article.get("featured", False)
-    
-    await db["articles"].update_one(
-        {"_id": article_id},
-        {"$set": {"featured": new_featured_status, "updated_at": datetime.utcnow()}}
-    )
-    
-    updated_article = await db["articles"].find_one({"_id": article_id})
-    if "category_id" in updated_article and updated_article["category_id"]:
-        if isinstance(updated_article["category_id"], str) and not ObjectId.is_valid(updated_article["category_id"]):
-            updated_article["category_id"] = None
-    return ArticleInDB(**updated_article)
+    return await repo.toggle_featured(db, article_id)
 
 
 async def increment_view(db: AsyncIOMotorDatabase, article_id) -> bool:
     """Increment view count for an article"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    
-    # Add view record
-    await db["article_views"].insert_one({
-        "article_id": article_id,
-        "user_id": None,
-        "created_at": datetime.utcnow()
-    })
-    
-    return True
+    return await repo.increment_view(db, article_id)
 
 
 async def get_views_count(db: AsyncIOMotorDatabase, article_id) -> int:
     """Get total views for an article"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    
-    count = await db["article_views"].count_documents({"article_id": article_id})
-    return count
+    return await repo.views_count(db, article_id)
 
 
 async def get_views_bulk(db: AsyncIOMotorDatabase, article_ids: List) -> dict:
     """Get view counts for multiple articles"""
-    if not article_ids:
-        return {}
-    
-    object_ids = [ObjectId(id) if isinstance(id, str) else id for id in article_ids]
-    
-    pipeline = [
-        {"$match": {"article_id": {"$in": object_ids}}},
-        {"$group": {"_id": "$article_id", "count": {"$sum": 1}}}
-    ]
-    
-    results = await db["article_views"].aggregate(pipeline).to_list(None)
-    return {str(r["_id"]): r["count"] for r in results}
+    return await repo.views_bulk(db, article_ids)
 
 
 async def toggle_favorite(db: AsyncIOMotorDatabase, article_id, user_id) -> bool:
     """Toggle favorite status for a user"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    if isinstance(user_id, str):
-        user_id = ObjectId(user_id)
-    
-    fav = await db["article_favorites"].find_one({"article_id": article_id, "user_id": user_id})
-    
-    if fav:
-        await db["article_favorites"].delete_one({"article_id": article_id, "user_id": user_id})
-    else:
-        await db["article_favorites"].insert_one({
-            "article_id": article_id,
-            "user_id": user_id,
-            "created_at": datetime.utcnow()
-        })
-    
-    return True
+    return await repo.toggle_favorite(db, article_id, user_id)
 
 
 async def get_favorites_count(db: AsyncIOMotorDatabase, article_id) -> int:
     """Get total favorites for an article"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    
-    count = await db["article_favorites"].count_documents({"article_id": article_id})
-    return count
+    return await repo.favorites_count(db, article_id)
 
 
 async def increment_share(db: AsyncIOMotorDatabase, article_id) -> bool:
     """Increment share count for an article"""
-    if isinstance(article_id, str):
-        article_id = ObjectId(article_id)
-    
     result = await db["articles"].update_one(
-        {"_id": article_id},
+        {"_id": as_object_id(article_id)},
         {"$inc": {"share_count": 1}}
     )
     
@@ -212,66 +92,22 @@ async def increment_share(db: AsyncIOMotorDatabase, article_id) -> bool:
 
 async def get_favorites_bulk(db: AsyncIOMotorDatabase, article_ids: List) -> dict:
     """Get favorite counts for multiple articles"""
-    if not article_ids:
-        return {}
-    
-    object_ids = [ObjectId(id) if isinstance(id, str) else id for id in article_ids]
-    
-    pipeline = [
-        {"$match": {"article_id": {"$in": object_ids}}},
-        {"$group": {"_id": "$article_id", "count": {"$sum": 1}}}
-    ]
-    
-    results = await db["article_favorites"].aggregate(pipeline).to_list(None)
-    return {str(r["_id"]): r["count"] for r in results}
+    return await repo.favorites_bulk(db, article_ids)
 
 
 async def get_user_favorites_set(db: AsyncIOMotorDatabase, user_id, article_ids: List) -> Set[str]:
     """Get set of favorite article IDs for a user"""
-    if not article_ids:
-        return set()
-    
-    if isinstance(user_id, str):
-        user_id = ObjectId(user_id)
-    
-    object_ids = [ObjectId(id) if isinstance(id, str) else id for id in article_ids]
-    
-    favorites = await db["article_favorites"].find({
-        "user_id": user_id,
-        "article_id": {"$in": object_ids}
-    }).to_list(None)
-    
-    return {str(fav["article_id"]) for fav in favorites}
+    return await repo.user_favorites(db, user_id, article_ids)
 
 
 async def get_all_articles(db: AsyncIOMotorDatabase) -> List[ArticleInDB]:
     """Get all articles"""
-    articles = await db["articles"].find().to_list(None)
-    articles_list = []
-    for article in articles:
-        if "category_id" in article and article["category_id"]:
-            if isinstance(article["category_id"], str) and not ObjectId.is_valid(article["category_id"]):
-                article["category_id"] = None
-        articles_list.append(ArticleInDB(**article))
-    return articles_list
+    return await repo.find(db)
 
 
 async def get_articles_by_category_id(db: AsyncIOMotorDatabase, category_id) -> List[ArticleInDB]:
     """Get all articles in a specific category"""
-    query = {}
-    if isinstance(category_id, str) and ObjectId.is_valid(category_id):
-        query["category_id"] = ObjectId(category_id)
-    else:
-        query["category_id"] = category_id
-    
-    articles = await db["articles"].find(query).sort("_id", -1).to_list(None)
-    articles_list = []
-    for article in articles:
-        if "category_id" in article and article["category_id"]:
-            if isinstance(article["category_id"], str) and not ObjectId.is_valid(article["category_id"]):
-                article["category_id"] = None
-        articles_list.append(ArticleInDB(**article))
-    return articles_list
+    return await repo.by_category(db, category_id, direction=-1)
 
 
 async def get_paginated_articles(
@@ -282,90 +118,31 @@ async def get_paginated_articles(
     sort_order: str,
     q: Optional[str],
     category_id: Optional[str],
-    featured: Optional[bool]
-) -> Tuple[List[ArticleInDB], List[ObjectId]]:
-    """Get paginated articles with filtering"""
-    query = {}
-    
-    if q:
-        query["$or"] = [
-            {"title": {"$regex": q, "$options": "i"}},
-            {"content": {"$regex": q, "$options": "i"}},
-            {"excerpt": {"$regex": q, "$options": "i"}},
-            {"author": {"$regex": q, "$options": "i"}},
-        ]
-    
-    if category_id:
-        if isinstance(category_id, str) and ObjectId.is_valid(category_id):
-            query["category_id"] = ObjectId(category_id)
-        else:
-            query["category_id"] = category_id
-    
-    if featured is not None:
-        query["featured"] = featured
-    
-    # Determine sort order
-    sort_direction = -1 if sort_order.lower() == "desc" else 1
-    sort_key = sort_by if sort_by != "id" else "_id"
-    
-    # Get paginated results
-    skip = (page - 1) * limit
-    articles = await db["articles"].find(query).sort(sort_key, sort_direction).skip(skip).limit(limit).to_list(None)
-    
-    # Clean up invalid category_id values before validation
-    articles_list = []
-    for article in articles:
-        if "category_id" in article and article["category_id"]:
-            if isinstance(article["category_id"], str) and not ObjectId.is_valid(article["category_id"]):
-                article["category_id"] = None
-        articles_list.append(ArticleInDB(**article))
-    
-    article_ids = [article.id for article in articles_list]
-    
-    return articles_list, article_ids
+    featured: Optional[bool],
+    cursor: Optional[str] = None
+) -> Tuple[List[ArticleInDB], List[ObjectId], Optional[str]]:
+    """Get paginated articles with filtering; also returns the next page's cursor"""
+    return await repo.paginate(db, page, limit, sort_by, sort_order, q, category_id, featured, cursor)
 
 
 async def get_all_categories(db: AsyncIOMotorDatabase) -> List[ArticleCategoryInDB]:
     """Get all article categories"""
-    categories = await db["article_categories"].find().sort("_id", 1).to_list(None)
-    return [ArticleCategoryInDB(**cat) for cat in categories]
+    return await repo.all_categories(db)
 
 
 async def get_category(db: AsyncIOMotorDatabase, category_id) -> Optional[ArticleCategoryInDB]:
     """Get a single article category"""
-    if isinstance(category_id, str):
-        category_id = ObjectId(category_id)
-    
-    category = await db["article_categories"].find_one({"_id": category_id})
-    return ArticleCategoryInDB(**category) if category else None
+    return await repo.get_category(db, category_id)
 
 
 async def create_category(db: AsyncIOMotorDatabase, category_data: dict) -> ArticleCategoryInDB:
     """Create a new article category"""
-    category_data["created_at"] = datetime.utcnow()
-    
-    result = await db["article_categories"].insert_one(category_data)
-    category_data["_id"] = result.inserted_id
-    
-    return ArticleCategoryInDB(**category_data)
+    return await repo.create_category(db, category_data)
 
 
 async def update_category(db: AsyncIOMotorDatabase, category_id, category_data: dict) -> Optional[ArticleCategoryInDB]:
     """Update an article category"""
-    if isinstance(category_id, str):
-        category_id = ObjectId(category_id)
-    
-    result = await db["article_categories"].update_one(
-        {"_id": category_id},
-        {"$set": category_data}
-    )
-    
-    if result.matched_count == 0:
-        return None
-    
-    updated_category = await db["article_categories"].find_one({"_id": category_id})
-    return ArticleCategoryInDB(**updated_category)
-
+    return await repo.update_category(db, category_id, category_data)
 
 async def update_category_image_url(
     db: AsyncIOMotorDatabase,
@@ -373,31 +150,9 @@ async def update_category_image_url(
     image_url: str
 ) -> Optional[ArticleCategoryInDB]:
     """Update category image URL"""
-    if isinstance(category_id, str):
-        category_id = ObjectId(category_id)
-    
-    result = await db["article_categories"].update_one(
-        {"_id": category_id},
-        {"$set": {"image_url": image_url}}
-    )
-    
-    if result.matched_count == 0:
-        return None
-    
-    updated_category = await db["article_categories"].find_one({"_id": category_id})
-    return ArticleCategoryInDB(**updated_category)
+    return await repo.update_category(db, category_id, {"image_url": image_url})
 
 
 async def delete_category(db: AsyncIOMotorDatabase, category_id) -> bool:
     """Delete an article category and update associated articles"""
-    if isinstance(category_id, str):
-        category_id = ObjectId(category_id)
-    
-    # Update articles to remove category reference
-    await db["articles"].update_many(
-        {"category_id": category_id},
-        {"$set": {"category_id": None}}
-    )
-    
-    result = await db["article_categories"].delete_one({"_id": category_id})
-    return result.deleted_count > 0
+    return await repo.delete_category(db, category_id)
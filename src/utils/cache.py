@@ -1,34 +1,277 @@
 import asyncio
+import hashlib
+import inspect
+import itertools
+import logging
+import pickle
+import sys
+import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Callable, Any, Dict
-from datetime import datetime, timedelta
+from typing import Callable, Any, Dict, Iterable, Optional
+from fastapi.params import Depends
+from ..config import settings
 
-_cache_store: Dict[str, dict] = {}
+logger = logging.getLogger(__name__)
 
-def cache(ttl: int = 300):
+# Size estimates look at this many items per container, this many levels deep
+SIZE_SAMPLE = 16
+SIZE_SAMPLE_DEPTH = 3
+
+
+class CacheEngine:
+    """
+    In-memory LRU cache with per-entry TTL, bounded by entry count and an
+    approximate byte budget (none when max_bytes is 0, which also skips
+    measuring values). Concurrent misses on the same key share one in-flight
+    load (single-flight) instead of all hitting the backend.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: set = set()
+        self._bytes = 0
+        self.stats = {
+            "hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0,
+            "stale_hits": 0, "stale_errors": 0, "refreshes": 0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _estimate_size(value: Any, depth: int = 0) -> int:
+        """Approximate size without serializing large values on the event loop:
+        big containers are sized from an evenly spaced sample of their items"""
+        if isinstance(value, (str, bytes, bytearray)):
+            return len(value)
+        if value is None or isinstance(value, (bool, int, float)):
+            return 8
+        if depth < SIZE_SAMPLE_DEPTH and isinstance(value, (list, tuple, dict)):
+            n = len(value)
+            if not n:
+                return 8
+            if isinstance(value, dict):
+                # Dicts can't be sliced; the first items stand in for the rest
+                sample = list(itertools.islice(value.items(), SIZE_SAMPLE))
+            else:
+                sample = value[::max(n // SIZE_SAMPLE, 1)][:SIZE_SAMPLE]
+            sampled = sum(CacheEngine._estimate_size(item, depth + 1) for item in sample)
+            return 8 * n + sampled * n // len(sample)
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(value)
+
+    def _drop(self, key: str) -> Optional[dict]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
+        return entry
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        """Return the entry while it is fresh or still within its stale window"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["stale_until"] <= time.monotonic():
+            self._drop(key)
+            self.stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._lookup(key)
+        if entry is None or entry["expires_at"] <= time.monotonic():
+            return default
+        return entry["value"]
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0):
+        size = self._estimate_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        self._drop(key)
+        now = time.monotonic()
+        self._entries[key] = {
+            "value": value,
+            "expires_at": now + ttl,
+            "stale_until": now + ttl + stale_ttl,
+            "size": size,
+        }
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes)):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Drop every key starting with `prefix` (everything when empty)"""
+        keys = [k for k in self._entries if k.startswith(prefix)]
+        for k in keys:
+            self._drop(k)
+        return len(keys)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [k for k, v in self._entries.items() if v["stale_until"] <= now]
+        for k in expired:
+            self._drop(k)
+        self.stats["expirations"] += len(expired)
+        return len(expired)
+
+    async def _load(self, key: str, loader: Callable, ttl: float, stale_ttl: float) -> Any:
+        """Run `loader` as the single in-flight load for `key` and store its result.
+
+        The load runs in a task of its own, so a caller that gets cancelled
+        (client disconnect) only stops waiting; the load carries on for the
+        requests coalesced onto it and still fills the cache.
+        """
+        task = asyncio.ensure_future(self._run_load(key, loader, ttl, stale_ttl))
+        self._inflight[key] = task
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return await asyncio.shield(task)
+
+    async def _run_load(self, key: str, loader: Callable, ttl: float, stale_ttl: float) -> Any:
+        try:
+            value = await loader()
+            self.set(key, value, ttl, stale_ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _refresh(self, key: str, loader: Callable, ttl: float, stale_ttl: float):
+        try:
+            await self._load(key, loader, ttl, stale_ttl)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {e}")
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable,
+        ttl: float,
+        stale_while_revalidate: float = 0,
+        stale_if_error: float = 0,
+    ) -> Any:
+        stale_ttl = max(stale_while_revalidate, stale_if_error)
+        entry = self._lookup(key)
+        now = time.monotonic()
+        if entry is not None and entry["expires_at"] > now:
+            self.stats["hits"] += 1
+            return entry["value"]
+
+        inflight = self._inflight.get(key)
+        if entry is not None and entry["expires_at"] + stale_while_revalidate > now:
+            # Serve the stale copy now and refresh it off the request path
+            self.stats["stale_hits"] += 1
+            if inflight is None:
+                self.stats["refreshes"] += 1
+                task = asyncio.create_task(self._refresh(key, loader, ttl, stale_ttl))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            return entry["value"]
+
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except Exception:
+                if entry is not None:
+                    self.stats["stale_errors"] += 1
+                    return entry["value"]
+                raise
+
+        self.stats["misses"] += 1
+        try:
+            return await self._load(key, loader, ttl, stale_ttl)
+        except Exception as e:
+            if entry is not None and entry["expires_at"] + stale_if_error > now:
+                # Upstream failed inside the grace window; keep serving the last good value
+                logger.warning(f"Serving stale value for {key} after error: {e}")
+                self.stats["stale_errors"] += 1
+                return entry["value"]
+            raise
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "entries": len(self._entries), "bytes": self._bytes}
+
+
+_engine = CacheEngine(settings.CACHE_MAX_ENTRIES, settings.CACHE_MAX_BYTES)
+
+
+def _key_params(func: Callable, ignore: Iterable[str]) -> Callable:
+    """Build a key function over the arguments that actually shape the result"""
+    signature = inspect.signature(func)
+    ignored = set(ignore)
+    for name, param in signature.parameters.items():
+        # FastAPI-injected dependencies (db handles, current user, ...) are
+        # per-request objects and must never become part of the key.
+        if isinstance(param.default, Depends):
+            ignored.add(name)
+
+    def build(args, kwargs) -> str:
+        bound = signature.bind_partial(*args, **kwargs)
+        bound.apply_defaults()
+        parts = [
+            f"{name}={value!r}"
+            for name, value in bound.arguments.items()
+            if name not in ignored
+        ]
+        return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    return build
+
+
+def cache(
+    ttl: int = 300,
+    namespace: Optional[str] = None,
+    ignore: Iterable[str] = (),
+    stale_while_revalidate: int = 0,
+    stale_if_error: int = 0,
+):
+    """
+    Cache an async function's result for `ttl` seconds.
+
+    stale_while_revalidate: for this many seconds after expiry, return the
+        stale value immediately and refresh it in the background.
+    stale_if_error: for this many seconds after expiry, fall back to the
+        stale value when the refresh raises.
+    """
     def decorator(func: Callable):
+        prefix = namespace or func.__name__
+        build_key = _key_params(func, ignore)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            key = f"{func.__name__}:{args}:{kwargs}"
-            now = datetime.utcnow()
-            if key in _cache_store:
-                entry = _cache_store[key]
-                if entry["expires_at"] > now:
-                    return entry["value"]
+            key = f"{prefix}:{build_key(args, kwargs)}"
+            return await _engine.get_or_load(
+                key,
+                lambda: func(*args, **kwargs),
+                ttl,
+                stale_while_revalidate=stale_while_revalidate,
+                stale_if_error=stale_if_error,
+            )
 
-            value = await func(*args, **kwargs)
-            _cache_store[key] = {
-                "value": value,
-                "expires_at": now + timedelta(seconds=ttl)
-            }
-            return value
+        wrapper.cache_namespace = prefix
         return wrapper
     return decorator
 
+
+def invalidate_cache(prefix: str = "") -> int:
+    """Invalidate cached entries by key prefix, e.g. a decorated function's name"""
+    return _engine.invalidate(prefix)
+
+
+def cache_stats() -> dict:
+    return _engine.snapshot()
+
+
 async def clear_expired_cache():
     while True:
-        now = datetime.utcnow()
-        expired_keys = [k for k, v in _cache_store.items() if v["expires_at"] < now]
-        for k in expired_keys:
-            _cache_store.pop(k, None)
-        await asyncio.sleep(60)  
\ No newline at end of file
+        _engine.purge_expired()
+        await asyncio.sleep(60)
@@ -0,0 +1,402 @@
+"""
+Generic repository for the dua, hadith and article collections.
+
+The three content types share one storage layout: an item collection with
+materialized view/favorite counters (see counters.py), `<kind>_views` and
+`<kind>_favorites` event collections keyed by `<kind>_id`, and a
+`<kind>_categories` collection. ContentRepository implements the CRUD,
+listing, counter and category logic once; utils/dua.py, hadith.py and
+article.py keep their module-level functions as thin wrappers, so callers
+keep their imports and every optimization here applies to all three.
+
+Lists are validated in one TypeAdapter call per page instead of one model
+construction per document, and `find_docs` takes a projection for callers
+that only need a few fields (stats, counters).
+
+Searching (`q`) uses the collection's text index, with a substring
+fallback for partial words; see search.py.
+
+`paginate` is keyset-based: every page ends with an opaque cursor encoding
+the sort key value and `_id` of its last item, and the next page resumes
+with a range query on the (sort key, `_id`) compound index instead of
+skipping over everything before it. `page` still works for old clients.
+Totals come from `count_cached`: an estimated count when nothing is
+filtered, otherwise count_documents memoized for CONTENT_COUNT_CACHE_TTL.
+"""
+import base64
+import re
+from datetime import datetime
+from typing import Any, Dict, Generic, List, Optional, Sequence, Set, Tuple, Type, TypeVar
+from bson import Binary, Decimal128, Int64, ObjectId, Regex, Timestamp, json_util
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel, TypeAdapter
+from ..config import settings
+from . import counters, search
+from .cache import CacheEngine
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+CategoryT = TypeVar("CategoryT", bound=BaseModel)
+
+
+def as_object_id(value):
+    return ObjectId(value) if isinstance(value, str) else value
+
+
+def as_object_ids(values: Sequence) -> List:
+    return [as_object_id(v) for v in values]
+
+
+def sanitize_category(doc: dict) -> dict:
+    """Null out category ids left behind by old clients ("undefined", junk strings)"""
+    category_id = doc.get("category_id")
+    if category_id and isinstance(category_id, str) and not ObjectId.is_valid(category_id):
+        doc["category_id"] = None
+    return doc
+
+
+def category_filter(category_id):
+    """Match a category stored either as an ObjectId or as its string form"""
+    if isinstance(category_id, ObjectId):
+        return {"$in": [category_id, str(category_id)]}
+    if isinstance(category_id, str) and ObjectId.is_valid(category_id):
+        return {"$in": [ObjectId(category_id), category_id]}
+    return category_id
+
+
+def encode_cursor(sort_key: str, direction: int, doc: dict) -> str:
+    payload = json_util.dumps([sort_key, direction, doc.get(sort_key), doc["_id"]])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str, direction: int) -> Tuple[Any, ObjectId]:
+    """(sort value, _id) of the item a page ended on; ValueError when it is
+    malformed or was issued for a different sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, dir_, value, last_id = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if key != sort_key or dir_ != direction or not isinstance(last_id, ObjectId):
+        raise ValueError("Cursor does not match the requested sort")
+    return value, last_id
+
+
+# BSON comparison order of the non-null types a sort field can hold, as
+# $type aliases (arrays, which sort by an element, are not handled)
+_TYPE_ORDER = ["number", "string", "object", "binData", "objectId", "bool", "date", "timestamp", "regex"]
+
+
+def _type_rank(value) -> int:
+    if isinstance(value, bool):
+        return _TYPE_ORDER.index("bool")
+    for types, alias in (
+        ((int, float, Decimal128, Int64), "number"),
+        (str, "string"),
+        (dict, "object"),
+        ((bytes, Binary), "binData"),
+        (ObjectId, "objectId"),
+        (datetime, "date"),
+        (Timestamp, "timestamp"),
+        ((Regex, re.Pattern), "regex"),
+    ):
+        if isinstance(value, types):
+            return _TYPE_ORDER.index(alias)
+    raise ValueError(f"Cannot paginate on a {type(value).__name__} sort value")
+
+
+def after_clause(sort_key: str, direction: int, value, last_id: ObjectId) -> dict:
+    """Match everything after (value, last_id) in (sort_key, _id) order.
+
+    Range operators only compare within a BSON type, so a field holding mixed
+    types (dates in some documents, strings or nothing in others) also needs
+    a branch per type that sorts after the cursor's: by $type for the other
+    types, and missing/null, which sort before everything.
+    """
+    op = "$gt" if direction == 1 else "$lt"
+    if sort_key == "_id":
+        return {"_id": {op: last_id}}
+    tie = {sort_key: value, "_id": {op: last_id}}
+    if value is None:
+        if direction == 1:
+            return {"$or": [tie, {sort_key: {"$ne": None}}]}
+        return tie
+    rank = _type_rank(value)
+    later = _TYPE_ORDER[rank + 1:] if direction == 1 else _TYPE_ORDER[:rank]
+    branches = [{sort_key: {op: value}}, tie]
+    if later:
+        branches.append({sort_key: {"$type": later}})
+    if direction == -1:
+        branches.append({sort_key: None})
+    return {"$or": branches}
+
+
+# Totals for paginated lists, shared by all content types
+_counts = CacheEngine(max_entries=1024, max_bytes=1024 * 1024)
+
+
+class ContentRepository(Generic[ModelT, CategoryT]):
+    def __init__(
+        self,
+        kind: str,
+        model: Type[ModelT],
+        category_model: Type[CategoryT],
+        related: Sequence[str] = (),
+    ):
+        spec = counters.COUNTERS[kind]
+        self.kind = kind
+        self.model = model
+        self.category_model = category_model
+        self.collection = spec.collection
+        self.views = spec.views
+        self.favorites = spec.favorites
+        self.key = spec.key
+        self.categories = f"{kind}_categories"
+        # Other collections keyed by `<kind>_id` that go when an item does
+        self.related = (spec.views, spec.favorites, *related)
+        self._list_adapter = TypeAdapter(List[model])
+
+    # -- validation ---------------------------------------------------------
+
+    def validate_many(self, docs: List[dict]) -> List[ModelT]:
+        """Sanitize and validate a whole page in one pydantic-core call"""
+        for doc in docs:
+            sanitize_category(doc)
+        return self._list_adapter.validate_python(docs)
+
+    def validate(self, doc: Optional[dict]) -> Optional[ModelT]:
+        return self.model(**sanitize_category(doc)) if doc else None
+
+    # -- reads ----------------------------------------------------------------
+
+    async def build_query(self, db: AsyncIOMotorDatabase, q: Optional[str] = None, category_id=None, featured: Optional[bool] = None) -> dict:
+        query = await search.search_filter(db, self.collection, q)
+        if category_id:
+            query["category_id"] = category_filter(category_id)
+        if featured is not None:
+            query["featured"] = featured
+        return query
+
+    async def get(self, db: AsyncIOMotorDatabase, item_id) -> Optional[ModelT]:
+        return self.validate(await db[self.collection].find_one({"_id": as_object_id(item_id)}))
+
+    async def find(
+        self,
+        db: AsyncIOMotorDatabase,
+        query: Optional[dict] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[ModelT]:
+        cursor = db[self.collection].find(query or {})
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return self.validate_many(await cursor.to_list(None))
+
+    async def find_docs(self, db: AsyncIOMotorDatabase, query: Optional[dict] = None, projection: Optional[dict] = None) -> List[dict]:
+        """Raw documents, optionally projected; for callers that don't need full models"""
+        return await db[self.collection].find(query or {}, projection).to_list(None)
+
+    async def by_category(self, db: AsyncIOMotorDatabase, category_id, direction: int = 1) -> List[ModelT]:
+        return await self.find(db, {"category_id": category_filter(category_id)}, sort=[("_id", direction)])
+
+    async def paginate(
+        self,
+        db: AsyncIOMotorDatabase,
+        page: int,
+        limit: int,
+        sort_by: str,
+        sort_order: str,
+        q: Optional[str],
+        category_id: Optional[str],
+        featured: Optional[bool],
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[ModelT], List[str], Optional[str]]:
+        """One page plus the cursor for the next (None on the last page).
+
+        With `cursor` the page starts right after the item it encodes and
+        `page` is ignored; without it `page` falls back to skip/limit.
+        """
+        sort_direction = -1 if sort_order.lower() == "desc" else 1
+        sort_key = sort_by if sort_by != "id" else "_id"
+        query = await self.build_query(db, q, category_id, featured)
+        skip = (page - 1) * limit
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort_key, sort_direction)
+            after = after_clause(sort_key, sort_direction, value, last_id)
+            query = {"$and": [query, after]} if query else after
+            skip = 0
+
+        # _id breaks ties so the order, and therefore the cursor, is total
+        sort = [(sort_key, sort_direction)] if sort_key == "_id" else [(sort_key, sort_direction), ("_id", sort_direction)]
+        docs = await db[self.collection].find(query).sort(sort).skip(skip).limit(limit + 1).to_list(None)
+        next_cursor = encode_cursor(sort_key, sort_direction, docs[limit - 1]) if len(docs) > limit else None
+        items = self.validate_many(docs[:limit])
+        return items, [item.id for item in items], next_cursor
+
+    async def count(self, db: AsyncIOMotorDatabase, q: Optional[str] = None, category_id=None, featured: Optional[bool] = None) -> int:
+        return await db[self.collection].count_documents(await self.build_query(db, q, category_id, featured))
+
+    async def count_cached(self, db: AsyncIOMotorDatabase, q: Optional[str] = None, category_id=None, featured: Optional[bool] = None) -> int:
+        """Total for a listing: estimated from collection metadata when
+        unfiltered, otherwise an exact count reused for CONTENT_COUNT_CACHE_TTL"""
+        query = await self.build_query(db, q, category_id, featured)
+        collection = db[self.collection]
+        if not query:
+            loader = collection.estimated_document_count
+        else:
+            async def loader():
+                return await collection.count_documents(query)
+        key = f"{self.collection}:{json_util.dumps(query, sort_keys=True)}"
+        return await _counts.get_or_load(key, loader, ttl=settings.CONTENT_COUNT_CACHE_TTL)
+
+    def _changed(self):
+        _counts.invalidate(f"{self.collection}:")
+        search.invalidate(self.collection)
+
+    async def search(self, db: AsyncIOMotorDatabase, q: str, skip: int = 0, limit: int = 50) -> List[ModelT]:
+        """Best matches first, by text score"""
+        return self.validate_many(await search.ranked_docs(db, self.collection, q, skip=skip, limit=limit))
+
+    # -- writes ---------------------------------------------------------------
+
+    async def create(self, db: AsyncIOMotorDatabase, data: dict) -> ModelT:
+        data["created_at"] = datetime.utcnow()
+        data["updated_at"] = datetime.utcnow()
+        sanitize_category(data)
+        result = await db[self.collection].insert_one(data)
+        self._changed()
+        data["_id"] = result.inserted_id
+        return self.model(**data)
+
+    async def bulk_create(self, db: AsyncIOMotorDatabase, items: List[dict]) -> List[str]:
+        if not items:
+            return []
+        now = datetime.utcnow()
+        for item in items:
+            item["created_at"] = now
+            item["updated_at"] = now
+            sanitize_category(item)
+        result = await db[self.collection].insert_many(items)
+        self._changed()
+        return [str(id) for id in result.inserted_ids]
+
+    async def update(self, db: AsyncIOMotorDatabase, item_id, data: dict) -> Optional[ModelT]:
+        item_id = as_object_id(item_id)
+        data["updated_at"] = datetime.utcnow()
+        sanitize_category(data)
+        updated = await db[self.collection].find_one_and_update(
+            {"_id": item_id}, {"$set": data}, return_document=True
+        )
+        self._changed()
+        return self.validate(updated)
+
+    async def toggle_featured(self, db: AsyncIOMotorDatabase, item_id) -> Optional[ModelT]:
+        item_id = as_object_id(item_id)
+        # Flip in one round trip with a pipeline update
+        updated = await db[self.collection].find_one_and_update(
+            {"_id": item_id},
+            [{"$set": {"featured": {"$not": [{"$ifNull": ["$featured", False]}]}, "updated_at": datetime.utcnow()}}],
+            return_document=True,
+        )
+        self._changed()
+        return self.validate(updated)
+
+    async def delete(self, db: AsyncIOMotorDatabase, item_id) -> bool:
+        item_id = as_object_id(item_id)
+        for collection in self.related:
+            await db[collection].delete_many({self.key: item_id})
+        result = await db[self.collection].delete_one({"_id": item_id})
+        self._changed()
+        return result.deleted_count > 0
+
+    async def delete_many(self, db: AsyncIOMotorDatabase, item_ids: List) -> int:
+        if not item_ids:
+            return 0
+        object_ids = as_object_ids(item_ids)
+        for collection in self.related:
+            await db[collection].delete_many({self.key: {"$in": object_ids}})
+        result = await db[self.collection].delete_many({"_id": {"$in": object_ids}})
+        self._changed()
+        return result.deleted_count
+
+    # -- counters -------------------------------------------------------------
+
+    async def increment_view(self, db: AsyncIOMotorDatabase, item_id) -> bool:
+        await counters.record_view(db, self.kind, as_object_id(item_id))
+        return True
+
+    async def views_count(self, db: AsyncIOMotorDatabase, item_id) -> int:
+        return await counters.read_count(db, self.kind, as_object_id(item_id), counters.VIEWS)
+
+    async def favorites_count(self, db: AsyncIOMotorDatabase, item_id) -> int:
+        return await counters.read_count(db, self.kind, as_object_id(item_id), counters.FAVORITES)
+
+    async def views_bulk(self, db: AsyncIOMotorDatabase, item_ids: List) -> Dict[str, int]:
+        return await counters.read_counts(db, self.kind, item_ids, counters.VIEWS)
+
+    async def favorites_bulk(self, db: AsyncIOMotorDatabase, item_ids: List) -> Dict[str, int]:
+        return await counters.read_counts(db, self.kind, item_ids, counters.FAVORITES)
+
+    @staticmethod
+    def counts_of(items: Sequence[BaseModel]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """(views, favorites) maps from already-loaded items, without a query"""
+        return (
+            {str(item.id): item.view_count for item in items},
+            {str(item.id): item.favorite_count for item in items},
+        )
+
+    async def toggle_favorite(self, db: AsyncIOMotorDatabase, item_id, user_id) -> bool:
+        item_id, user_id = as_object_id(item_id), as_object_id(user_id)
+        # Decide on the delete's result rather than a prior lookup, so two
+        # concurrent toggles can't both count
+        removed = await db[self.favorites].delete_one({self.key: item_id, "user_id": user_id})
+        if removed.deleted_count:
+            await counters.bump(db, self.kind, item_id, counters.FAVORITES, -1)
+        else:
+            await db[self.favorites].insert_one({self.key: item_id, "user_id": user_id, "created_at": datetime.utcnow()})
+            await counters.bump(db, self.kind, item_id, counters.FAVORITES)
+        return True
+
+    async def user_favorites(self, db: AsyncIOMotorDatabase, user_id, item_ids: List) -> Set[str]:
+        if not item_ids:
+            return set()
+        cursor = db[self.favorites].find(
+            {"user_id": as_object_id(user_id), self.key: {"$in": as_object_ids(item_ids)}},
+            {self.key: 1},
+        )
+        return {str(fav[self.key]) async for fav in cursor}
+
+    # -- categories -----------------------------------------------------------
+
+    async def all_categories(self, db: AsyncIOMotorDatabase) -> List[CategoryT]:
+        categories = await db[self.categories].find().sort("_id", 1).to_list(None)
+        return TypeAdapter(List[self.category_model]).validate_python(categories)
+
+    async def get_category(self, db: AsyncIOMotorDatabase, category_id) -> Optional[CategoryT]:
+        category = await db[self.categories].find_one({"_id": as_object_id(category_id)})
+        return self.category_model(**category) if category else None
+
+    async def create_category(self, db: AsyncIOMotorDatabase, data: dict) -> CategoryT:
+        data["created_at"] = datetime.utcnow()
+        result = await db[self.categories].insert_one(data)
+        data["_id"] = result.inserted_id
+        return self.category_model(**data)
+
+    async def update_category(self, db: AsyncIOMotorDatabase, category_id, data: dict) -> Optional[CategoryT]:
+        category_id = as_object_id(category_id)
+        updated = await db[self.categories].find_one_and_update(
+            {"_id": category_id}, {"$set": data}, return_document=True
+        )
+        return self.category_model(**updated) if updated else None
+
+    async def delete_category(self, db: AsyncIOMotorDatabase, category_id) -> bool:
+        category_id = as_object_id(category_id)
+        # Items keep existing, uncategorized
+        await db[self.collection].update_many({"category_id": category_filter(category_id)}, {"$set": {"category_id": None}})
+        self._changed()
+        result = await db[self.categories].delete_one({"_id": category_id})
+        return result.deleted_count > 0
@@ -0,0 +1,150 @@
+"""
+Denormalized conversation summaries.
+
+The admin inbox reads everything it shows from the conversation document
+itself, so no per-row lookups are needed:
+
+    user_email, user_name    copied from the user when the conversation is created
+    last_message             preview of the newest message
+    last_message_id          lets edits/deletes of that message refresh the preview
+    last_message_at          created_at of the newest message
+    last_sender_type         "user" or "admin"
+    unread_count             unread messages sent by the user
+    updated_at               last activity (already bumped on every message)
+
+The message endpoints keep these current with single atomic updates.
+`python -m src.utils.conversations backfill` fills them in for existing data
+and can be re-run at any time to resync (for example after users rename).
+"""
+import asyncio
+import logging
+import sys
+from typing import Optional
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_LENGTH = 100
+
+
+def message_preview(text: Optional[str], message_type: Optional[str] = None, file_url: Optional[str] = None) -> str:
+    text = text or ""
+    if len(text) > PREVIEW_LENGTH:
+        return text[:PREVIEW_LENGTH] + "..."
+    if not text and file_url:
+        return f"Sent a {message_type or 'file'}"
+    return text
+
+
+def user_summary(user: Optional[dict]) -> dict:
+    if not user:
+        return {"user_email": None, "user_name": None}
+    return {"user_email": user.get("email"), "user_name": user.get("username") or user.get("full_name")}
+
+
+def last_message_fields(message: Optional[dict]) -> dict:
+    if not message:
+        return {"last_message": None, "last_message_id": None, "last_message_at": None, "last_sender_type": None}
+    return {
+        "last_message": message_preview(message.get("message_text"), message.get("message_type"), message.get("file_url")),
+        "last_message_id": message["_id"],
+        "last_message_at": message.get("created_at"),
+        "last_sender_type": message.get("sender_type"),
+    }
+
+
+def _unread_plus(delta: int) -> dict:
+    """Pipeline expression for unread_count + delta, never below zero"""
+    return {"$max": [0, {"$add": [{"$ifNull": ["$unread_count", 0]}, delta]}]}
+
+
+def _literal_fields(fields: dict) -> dict:
+    # $literal so a preview starting with "$" isn't read as a field path
+    return {name: {"$literal": value} for name, value in fields.items()}
+
+
+async def record_message(db: AsyncIOMotorDatabase, message: dict):
+    """Fold a newly inserted message into its conversation's summary.
+
+    A pipeline update, so the last_* fields only move forward: when two
+    sends race, the older one can't overwrite the newer preview."""
+    at, message_id = message["created_at"], message["_id"]
+    newer = {"$or": [
+        {"$lt": ["$last_message_at", at]},
+        {"$and": [{"$eq": ["$last_message_at", at]}, {"$lt": ["$last_message_id", message_id]}]},
+    ]}
+    fields = last_message_fields(message)
+    await db["conversations"].update_one(
+        {"_id": message["conversation_id"]},
+        [{"$set": {
+            **{name: {"$cond": [newer, value, f"${name}"]} for name, value in _literal_fields(fields).items()},
+            "updated_at": {"$max": ["$updated_at", {"$literal": at}]},
+            "unread_count": _unread_plus(1 if message.get("sender_type") == "user" else 0),
+        }}],
+    )
+
+
+async def record_read(db: AsyncIOMotorDatabase, conv_id: ObjectId, count: int):
+    if count:
+        await db["conversations"].update_one({"_id": conv_id}, [{"$set": {"unread_count": _unread_plus(-count)}}])
+
+
+async def record_edit(db: AsyncIOMotorDatabase, message: dict):
+    """Refresh the preview if the edited message is the conversation's latest"""
+    await db["conversations"].update_one(
+        {"_id": message["conversation_id"], "last_message_id": message["_id"]},
+        {"$set": {"last_message": message_preview(message.get("message_text"), message.get("message_type"), message.get("file_url"))}},
+    )
+
+
+async def record_delete(db: AsyncIOMotorDatabase, message: dict):
+    conv_id = message.get("conversation_id")
+    update = {}
+    if message.get("sender_type") == "user" and message.get("status") != "read":
+        update["unread_count"] = _unread_plus(-1)
+    conv = await db["conversations"].find_one({"_id": conv_id}, {"last_message_id": 1})
+    if conv and conv.get("last_message_id") == message["_id"]:
+        latest = await db["messages"].find_one({"conversation_id": conv_id}, sort=[("_id", -1)])
+        update.update(_literal_fields(last_message_fields(latest)))
+    if update:
+        await db["conversations"].update_one({"_id": conv_id}, [{"$set": update}])
+
+
+async def summarize(db: AsyncIOMotorDatabase, conv: dict) -> dict:
+    """Recompute every denormalized field of one conversation from source"""
+    user = await db["users"].find_one({"_id": conv.get("user_id")}) if conv.get("user_id") else None
+    latest = await db["messages"].find_one({"conversation_id": conv["_id"]}, sort=[("_id", -1)])
+    unread = await db["messages"].count_documents(
+        {"conversation_id": conv["_id"], "sender_type": "user", "status": {"$ne": "read"}}
+    )
+    return {**user_summary(user), **last_message_fields(latest), "unread_count": unread}
+
+
+async def backfill_summaries(db: AsyncIOMotorDatabase) -> int:
+    done = 0
+    async for conv in db["conversations"].find({}):
+        await db["conversations"].update_one({"_id": conv["_id"]}, {"$set": await summarize(db, conv)})
+        done += 1
+        if done % 500 == 0:
+            logger.info(f"Backfilled {done} conversations")
+    return done
+
+
+async def _backfill():
+    from .. import database
+
+    await database.connect_to_mongo()
+    try:
+        done = await backfill_summaries(database.db)
+        logger.info(f"Backfilled {done} conversations")
+    finally:
+        await database.disconnect_from_mongo()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("usage: python -m src.utils.conversations backfill")
+        sys.exit(1)
+    asyncio.run(_backfill())
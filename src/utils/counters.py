@@ -0,0 +1,334 @@
+"""
+Materialized view/favorite counters for duas, hadiths and articles.
+
+Each content document carries `view_count` and `favorite_count`, kept up to
+date with `$inc` next to the raw event written to `*_views`/`*_favorites`.
+List endpoints read those fields straight off the documents, so no
+aggregation over the event collections is needed on the read path.
+
+The event collections stay the source of truth: `reconcile` recounts them
+and corrects any document whose counters drifted (a crash between the two
+writes, data that predates the counters). Corrections are conditional
+`$set`s, so every worker can run it in the background every
+COUNTER_RECONCILE_INTERVAL seconds without the fixes stacking up. It also
+runs from the command line:
+
+    python -m src.utils.counters reconcile [dua|hadith|article]
+
+Views are the hot write path, so they go through a write-behind
+ViewAccumulator: increments are summed per item in memory and flushed with
+one bulk_write of `$inc` ops every VIEW_FLUSH_INTERVAL seconds or
+VIEW_FLUSH_MAX_PENDING views, whichever comes first, and on shutdown. Those
+two settings bound the lag and what a crash can lose. Raw view events can be
+sampled down with VIEW_EVENT_SAMPLE_RATE; below 1.0 the event log no longer
+has every view, so reconciliation leaves view counters alone. A flush writes
+the events before the counters, and reconciliation skips the view counter
+of any item viewed since the flush watermark, so it never races a flush.
+Increments are only retried when they are known not to have been applied
+(see `_requeue_failed`). Favorite fixes are recounted once more before they
+are written, so they never race a toggle.
+"""
+import asyncio
+import logging
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+VIEWS = "view_count"
+FAVORITES = "favorite_count"
+RECONCILE_BATCH_SIZE = 1000
+
+
+class CounterSpec(NamedTuple):
+    collection: str
+    views: str
+    favorites: str
+    key: str
+
+
+COUNTERS: Dict[str, CounterSpec] = {
+    "dua": CounterSpec("duas", "dua_views", "dua_favorites", "dua_id"),
+    "hadith": CounterSpec("hadiths", "hadith_views", "hadith_favorites", "hadith_id"),
+    "article": CounterSpec("articles", "article_views", "article_favorites", "article_id"),
+}
+
+
+async def bump(db: AsyncIOMotorDatabase, kind: str, item_id: ObjectId, field: str, n: int = 1) -> bool:
+    result = await db[COUNTERS[kind].collection].update_one({"_id": item_id}, {"$inc": {field: n}})
+    return result.matched_count > 0
+
+
+async def read_count(db: AsyncIOMotorDatabase, kind: str, item_id: ObjectId, field: str) -> int:
+    doc = await db[COUNTERS[kind].collection].find_one({"_id": item_id}, {field: 1})
+    return (doc or {}).get(field, 0)
+
+
+async def read_counts(db: AsyncIOMotorDatabase, kind: str, item_ids: List, field: str) -> Dict[str, int]:
+    """Counters for many items in one `_id` lookup, keyed by str(id)"""
+    if not item_ids:
+        return {}
+    object_ids = [ObjectId(id) if isinstance(id, str) else id for id in item_ids]
+    cursor = db[COUNTERS[kind].collection].find({"_id": {"$in": object_ids}}, {field: 1})
+    return {str(doc["_id"]): doc.get(field, 0) async for doc in cursor}
+
+
+def _view_event(kind: str, item_id: ObjectId) -> Optional[dict]:
+    """A raw view event, or None when sampling skips this one"""
+    rate = settings.VIEW_EVENT_SAMPLE_RATE
+    if rate < 1.0 and random.random() >= rate:
+        return None
+    return {COUNTERS[kind].key: item_id, "user_id": None, "created_at": datetime.utcnow()}
+
+
+class ViewAccumulator:
+    def __init__(self):
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self.pending: Dict[Tuple[str, ObjectId], int] = defaultdict(int)
+        self.events: Dict[str, List[dict]] = defaultdict(list)
+        self.pending_views = 0
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def add(self, kind: str, item_id: ObjectId):
+        self.pending[(kind, item_id)] += 1
+        self.pending_views += 1
+        event = _view_event(kind, item_id)
+        if event is not None:
+            self.events[kind].append(event)
+        if self.pending_views >= settings.VIEW_FLUSH_MAX_PENDING and self._flushing is None:
+            self._flushing = asyncio.create_task(self.flush())
+            self._flushing.add_done_callback(lambda _: setattr(self, "_flushing", None))
+
+    async def flush(self):
+        async with self._lock:
+            pending, self.pending = self.pending, defaultdict(int)
+            events, self.events = self.events, defaultdict(list)
+            self.pending_views = 0
+            if not pending and not events:
+                return
+
+            by_kind: Dict[str, List[Tuple[ObjectId, int]]] = defaultdict(list)
+            for (kind, item_id), n in pending.items():
+                by_kind[kind].append((item_id, n))
+            for kind in set(by_kind) | set(events):
+                # Events first: the counter must never run ahead of the log
+                # it is reconciled against
+                docs = events.get(kind)
+                if docs:
+                    try:
+                        await self.db[COUNTERS[kind].views].insert_many(docs, ordered=False)
+                    except BulkWriteError as e:
+                        # Events keep the _id of their first attempt, so on a
+                        # retry the ones already written are duplicates
+                        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                            logger.warning(f"Writing {len(docs)} {kind} view events failed: {e}")
+                            self.events[kind].extend(docs)
+                            self._requeue(pending, kind)
+                            continue
+                    except Exception as e:
+                        # Retry the events and their increments together next time
+                        logger.warning(f"Writing {len(docs)} {kind} view events failed: {e}")
+                        self.events[kind].extend(docs)
+                        self._requeue(pending, kind)
+                        continue
+                increments = by_kind.get(kind)
+                if increments:
+                    ops = [UpdateOne({"_id": item_id}, {"$inc": {VIEWS: n}}) for item_id, n in increments]
+                    try:
+                        await self.db[COUNTERS[kind].collection].bulk_write(ops, ordered=False)
+                    except Exception as e:
+                        logger.warning(f"Flushing {len(ops)} {kind} view counters failed: {e}")
+                        self._requeue_failed(kind, increments, e)
+
+    def _requeue(self, pending: Dict[Tuple[str, ObjectId], int], kind: str):
+        for (k, item_id), n in pending.items():
+            if k == kind:
+                self.pending[(k, item_id)] += n
+                self.pending_views += n
+
+    def _requeue_failed(self, kind: str, increments: List[Tuple[ObjectId, int]], error: Exception):
+        """
+        Keep increments for the next flush only when they are known not to
+        have been applied and nothing else will repair them. With a full
+        event log the events are already in and reconciliation restores the
+        counter, whereas a retry landing after it would count twice. With
+        sampled events only the ops the server reported as failed are
+        retried; after any other error the outcome is unknown and the views
+        are dropped rather than risk counting them twice.
+        """
+        if settings.VIEW_EVENT_SAMPLE_RATE >= 1.0 or not isinstance(error, BulkWriteError):
+            return
+        for err in error.details.get("writeErrors", []):
+            item_id, n = increments[err["index"]]
+            self.pending[(kind, item_id)] += n
+            self.pending_views += n
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.VIEW_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"View flush failed: {e}")
+
+
+views = ViewAccumulator()
+
+
+async def record_view(db: AsyncIOMotorDatabase, kind: str, item_id: ObjectId):
+    """Count a view: buffered when the accumulator runs, written through otherwise"""
+    if views.running:
+        views.add(kind, item_id)
+        return
+    event = _view_event(kind, item_id)
+    if event is not None:
+        await db[COUNTERS[kind].views].insert_one(event)
+    await bump(db, kind, item_id, VIEWS)
+
+
+async def _event_counts(db: AsyncIOMotorDatabase, collection: str, key: str, match: Optional[dict] = None) -> Dict[ObjectId, int]:
+    pipeline = [{"$match": match}] if match else []
+    pipeline.append({"$group": {"_id": f"${key}", "count": {"$sum": 1}}})
+    return {r["_id"]: r["count"] async for r in db[collection].aggregate(pipeline, allowDiskUse=True)}
+
+
+def _flush_watermark() -> datetime:
+    """View events newer than this may not have reached their counter yet
+    (next flush, or a retry after a failed one)"""
+    return datetime.utcnow() - timedelta(seconds=max(60.0, 3 * settings.VIEW_FLUSH_INTERVAL))
+
+
+async def _settled(db: AsyncIOMotorDatabase, spec: CounterSpec, candidates: Dict[ObjectId, Tuple[dict, dict]]) -> List[UpdateOne]:
+    """
+    Fixes for documents whose favorite counter drifted. A toggle writes (or
+    deletes) its event and then `$inc`s the counter, so a drift seen across
+    the gap between the recount and the document scan may be a toggle still
+    in flight. The candidates are recounted and their counters reread; the
+    favorite fix stands only where both are unchanged, and the conditional
+    `$set` covers anything after that.
+    """
+    ids = list(candidates)
+    recount = await _event_counts(db, spec.favorites, spec.key, {spec.key: {"$in": ids}})
+    cursor = db[spec.collection].find({"_id": {"$in": ids}}, {FAVORITES: 1})
+    current = {doc["_id"]: doc.get(FAVORITES) async for doc in cursor}
+    ops = []
+    for item_id, (seen, drift) in candidates.items():
+        if recount.get(item_id, 0) != drift[FAVORITES] or current.get(item_id) != seen[FAVORITES]:
+            seen = {field: value for field, value in seen.items() if field != FAVORITES}
+            drift = {field: value for field, value in drift.items() if field != FAVORITES}
+        if drift:
+            ops.append(UpdateOne({"_id": item_id, **seen}, {"$set": drift}))
+    return ops
+
+
+async def reconcile(db: AsyncIOMotorDatabase, kind: str) -> int:
+    """Recount one content type from its event logs; returns documents corrected"""
+    spec = COUNTERS[kind]
+    logs = {FAVORITES: await _event_counts(db, spec.favorites, spec.key)}
+    unsettled = set()
+    if settings.VIEW_EVENT_SAMPLE_RATE >= 1.0:
+        recent = {"created_at": {"$gte": _flush_watermark()}}
+        unsettled = set(await _event_counts(db, spec.views, spec.key, recent))
+        logs[VIEWS] = await _event_counts(db, spec.views, spec.key)
+
+    fixed = 0
+    ops = []
+    candidates: Dict[ObjectId, Tuple[dict, dict]] = {}
+
+    async def write():
+        nonlocal fixed, ops
+        if ops:
+            result = await db[spec.collection].bulk_write(ops, ordered=False)
+            fixed += result.modified_count
+            ops = []
+
+    async for doc in db[spec.collection].find({}, {field: 1 for field in logs}):
+        actual = {field: counts.get(doc["_id"], 0) for field, counts in logs.items()}
+        if doc["_id"] in unsettled:
+            # Buffered increments may still be on their way; next run
+            actual.pop(VIEWS, None)
+        drift = {field: value for field, value in actual.items() if doc.get(field) != value}
+        if not drift:
+            continue
+        # $set only while the counter still holds the value read here: an
+        # increment that lands meanwhile, or another worker's reconciler
+        # getting there first, makes this a no-op instead of a double fix
+        seen = {field: doc.get(field) for field in drift}
+        if FAVORITES in drift:
+            candidates[doc["_id"]] = (seen, drift)
+            if len(candidates) >= RECONCILE_BATCH_SIZE:
+                ops.extend(await _settled(db, spec, candidates))
+                candidates = {}
+        else:
+            ops.append(UpdateOne({"_id": doc["_id"], **seen}, {"$set": drift}))
+        if len(ops) >= RECONCILE_BATCH_SIZE:
+            await write()
+    if candidates:
+        ops.extend(await _settled(db, spec, candidates))
+    await write()
+    return fixed
+
+
+async def reconcile_all(db: AsyncIOMotorDatabase) -> Dict[str, int]:
+    return {kind: await reconcile(db, kind) for kind in COUNTERS}
+
+
+async def run_reconciler(db: AsyncIOMotorDatabase):
+    """Background loop: reconcile at startup, then every COUNTER_RECONCILE_INTERVAL seconds"""
+    while True:
+        try:
+            fixed = await reconcile_all(db)
+            if any(fixed.values()):
+                logger.info(f"Counter reconciliation corrected {fixed}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Counter reconciliation failed: {e}")
+        await asyncio.sleep(settings.COUNTER_RECONCILE_INTERVAL)
+
+
+async def _reconcile(kinds: List[str]):
+    from .. import database
+
+    await database.connect_to_mongo()
+    try:
+        for kind in kinds:
+            logger.info(f"{kind}: corrected {await reconcile(database.db, kind)} documents")
+    finally:
+        await database.disconnect_from_mongo()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if len(sys.argv) < 2 or sys.argv[1] != "reconcile" or any(k not in COUNTERS for k in sys.argv[2:]):
+        print(f"usage: python -m src.utils.counters reconcile [{'|'.join(COUNTERS)}]")
+        sys.exit(1)
+    asyncio.run(_reconcile(sys.argv[2:] or list(COUNTERS)))
@@ -1,9 +1,17 @@
-from datetime import datetime
+import asyncio
+import logging
+from datetime import datetime, timedelta
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional
+from ..config import settings
 from .ws_manager import manager
 
+logger = logging.getLogger(__name__)
+
+# Keeps background jobs referenced until they finish
+_running_jobs = set()
+
 
 async def create_notifications(
     db: AsyncIOMotorDatabase,
@@ -13,10 +21,13 @@ async def create_notifications(
     user_ids: Optional[List[str]] = None,
     link: Optional[str] = None,
     recipient_role: Optional[str] = None,
+    progress: Optional[Callable[[int], Awaitable[None]]] = None,
 ):
     """
     Persist notifications and broadcast over websockets.
     If user_ids is None or empty AND recipient_role is None, treat as a global notification.
+    Per-user docs are written with insert_many in NOTIFICATION_BATCH_SIZE batches;
+    `progress` is awaited with the running count after each batch.
     """
     collection = db["notifications"]
     now = datetime.utcnow()
@@ -47,41 +58,162 @@ async def create_notifications(
             "created_at": now.isoformat() + "Z",
         }
         await manager.broadcast_room(room, {"event": "notification", "data": payload})
+        await _notify_admins(title, notif_type, 1, recipient_role=recipient_role)
         return [payload]
 
-    targets = user_ids or [None]
+    targets = [ObjectId(uid) if uid else None for uid in (user_ids or [None])]
     inserted = []
+    batch_size = settings.NOTIFICATION_BATCH_SIZE
 
-    for uid in targets:
-        doc = {
-            "title": title,
-            "message": message,
-            "type": notif_type,
-            "user_id": ObjectId(uid) if uid else None,
-            "recipient_role": None,
-            "link": link,
-            "read": False,
-            "created_at": now,
-        }
-        res = await collection.insert_one(doc)
-        payload = {
-            "id": str(res.inserted_id),
-            "title": title,
-            "message": message,
-            "type": notif_type,
-            "user_id": uid,
-            "link": link,
-            "read": False,
-            "created_at": now.isoformat() + "Z",
-        }
-        room = f"notifications:{uid}" if uid else "notifications:all"
-        inserted.append(payload)
-        # fire-and-forget websocket broadcast; ignore failures
-        await manager.broadcast_room(room, {"event": "notification", "data": payload})
+    for offset in range(0, len(targets), batch_size):
+        batch = targets[offset:offset + batch_size]
+        docs = [
+            {
+                "title": title,
+                "message": message,
+                "type": notif_type,
+                "user_id": oid,
+                "recipient_role": None,
+                "link": link,
+                "read": False,
+                "created_at": now,
+            }
+            for oid in batch
+        ]
+        res = await collection.insert_many(docs, ordered=False)
+        payloads = [
+            {
+                "id": str(doc_id),
+                "title": title,
+                "message": message,
+                "type": notif_type,
+                "user_id": str(oid) if oid else None,
+                "link": link,
+                "read": False,
+                "created_at": now.isoformat() + "Z",
+            }
+            for doc_id, oid in zip(res.inserted_ids, batch)
+        ]
+        inserted.extend(payloads)
+        # One broadcast at a time, yielding in between, so a large batch
+        # reaches the outboxes/the backplane at the pace they drain; a
+        # failed one must not hold up the rest
+        for p in payloads:
+            room = f"notifications:{p['user_id']}" if p["user_id"] else "notifications:all"
+            try:
+                await manager.broadcast_room(room, {"event": "notification", "data": p})
+            except Exception as e:
+                logger.warning(f"Notification broadcast to {room} failed: {e}")
+            await asyncio.sleep(0)
+        await _notify_admins(title, notif_type, len(payloads), sent=len(inserted))
+        if progress is not None:
+            await progress(len(inserted))
 
     return inserted
 
 
+async def _notify_admins(title: str, notif_type: str, count: int, **extra):
+    """One summary event per batch for admin sockets, which do not get a
+    copy of each notification"""
+    try:
+        await manager.broadcast_to_admins({
+            "event": "notifications_sent",
+            "data": {"title": title, "type": notif_type, "count": count, **extra},
+        })
+    except Exception as e:
+        logger.warning(f"Notification summary to admins failed: {e}")
+
+
+async def start_notification_job(
+    db: AsyncIOMotorDatabase,
+    title: str,
+    message: str,
+    notif_type: str = "info",
+    user_ids: Optional[List[str]] = None,
+    link: Optional[str] = None,
+) -> dict:
+    """
+    Run a large fan-out in the background. Progress is kept in the
+    notification_jobs collection so any worker can report it. Every batch
+    bumps the job's heartbeat_at; a job whose worker died stops beating and
+    is failed by `fail_stale_jobs`. Raises ValueError for an invalid user id
+    before anything is accepted.
+    """
+    invalid = [uid for uid in user_ids or [] if not ObjectId.is_valid(uid)]
+    if invalid:
+        raise ValueError(f"Invalid user id(s): {', '.join(map(str, invalid[:10]))}")
+
+    jobs = db["notification_jobs"]
+    now = datetime.utcnow()
+    job = {
+        "status": "queued",
+        "total": len(user_ids or []),
+        "sent": 0,
+        "error": None,
+        "created_at": now,
+        "heartbeat_at": now,
+        "finished_at": None,
+    }
+    res = await jobs.insert_one(job)
+    job_id = res.inserted_id
+
+    async def progress(sent: int):
+        await jobs.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "running", "sent": sent, "heartbeat_at": datetime.utcnow()}},
+        )
+
+    async def run():
+        try:
+            await progress(0)
+            await create_notifications(db, title, message, notif_type, user_ids, link, progress=progress)
+            update = {"status": "done"}
+        except Exception as e:
+            logger.exception("Notification job %s failed", job_id)
+            update = {"status": "failed", "error": str(e)}
+        await jobs.update_one({"_id": job_id}, {"$set": {**update, "finished_at": datetime.utcnow()}})
+
+    task = asyncio.create_task(run())
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return job_status({**job, "_id": job_id})
+
+
+def job_status(job: dict) -> dict:
+    return {
+        "job_id": str(job["_id"]),
+        "status": job.get("status"),
+        "total": job.get("total", 0),
+        "sent": job.get("sent", 0),
+        "error": job.get("error"),
+        "created_at": job["created_at"].isoformat() + "Z" if job.get("created_at") else None,
+        "finished_at": job["finished_at"].isoformat() + "Z" if job.get("finished_at") else None,
+    }
+
+
+async def fail_stale_jobs(db: AsyncIOMotorDatabase, job_id: Optional[ObjectId] = None) -> int:
+    """Fail unfinished jobs with no heartbeat for NOTIFICATION_JOB_STALE_AFTER
+    seconds (their worker restarted mid-job); all of them, or just `job_id`"""
+    now = datetime.utcnow()
+    query = {
+        "status": {"$in": ["queued", "running"]},
+        "heartbeat_at": {"$lt": now - timedelta(seconds=settings.NOTIFICATION_JOB_STALE_AFTER)},
+    }
+    if job_id is not None:
+        query["_id"] = job_id
+    res = await db["notification_jobs"].update_many(
+        query,
+        {"$set": {"status": "failed", "error": "Worker stopped before the job finished", "finished_at": now}},
+    )
+    return res.modified_count
+
+
+async def get_notification_job(db: AsyncIOMotorDatabase, job_id: ObjectId) -> Optional[dict]:
+    await fail_stale_jobs(db, job_id)
+    job = await db["notification_jobs"].find_one({"_id": job_id})
+    return job_status(job) if job else None
+
+
 async def mark_all_read(db: AsyncIOMotorDatabase, user_id: ObjectId):
     collection = db["notifications"]
     await collection.update_many(
@@ -0,0 +1,112 @@
+"""
+Admin presence: one cluster-wide "is any admin online" flag.
+
+Every node publishes its local admin count on the backplane when it crosses
+zero, and re-publishes it as a heartbeat while admins are connected. Each
+node folds what it hears into a single boolean and pushes `admin_status` to
+its local subscribers only when that boolean changes. Going online is
+announced at once; going offline waits PRESENCE_DEBOUNCE seconds, so an
+admin who reconnects or flaps inside the window causes no traffic at all.
+A node that stops sending heartbeats (crashed worker) ages out after three
+missed beats; every node that has heard a report or has subscribers runs
+the heartbeat timer, so it re-evaluates the flag even with no admins of
+its own.
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+from ..config import settings
+
+PRESENCE_CHANNEL = "presence"
+
+
+class AdminPresence:
+    def __init__(self, publish: Callable[[dict], Awaitable[None]], push: Callable[[Iterable[Any], dict], None]):
+        self._publish = publish
+        self._push = push
+        self.node_id = uuid.uuid4().hex
+        self.local_admins = 0
+        self.nodes: Dict[str, float] = {}  # node id -> when it last reported admins
+        self.subscribers: Set[Any] = set()
+        self.announced = False
+        self._offline_timer: Optional[asyncio.TimerHandle] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @property
+    def online(self) -> bool:
+        cutoff = time.monotonic() - 3 * settings.PRESENCE_HEARTBEAT
+        return any(seen >= cutoff for seen in self.nodes.values())
+
+    def status_message(self) -> dict:
+        return {"event": "admin_status", "data": {"status": "online" if self.announced else "offline"}}
+
+    def subscribe(self, websocket):
+        """Start pushing transitions to `websocket`, beginning with the current state"""
+        self.subscribers.add(websocket)
+        self._ensure_heartbeat()
+        self._push([websocket], self.status_message())
+
+    def unsubscribe(self, websocket):
+        self.subscribers.discard(websocket)
+
+    async def admin_connected(self):
+        self.local_admins += 1
+        self._ensure_heartbeat()
+        if self.local_admins == 1:
+            await self._report()
+
+    async def admin_disconnected(self):
+        self.local_admins = max(self.local_admins - 1, 0)
+        if self.local_admins == 0:
+            await self._report()
+
+    async def _report(self):
+        await self._publish({"node": self.node_id, "admins": self.local_admins})
+
+    def on_message(self, message: dict):
+        """Backplane delivery of a node's report (including this node's own)"""
+        if message.get("admins"):
+            self.nodes[message["node"]] = time.monotonic()
+        else:
+            self.nodes.pop(message.get("node"), None)
+        self._ensure_heartbeat()
+        self._reconcile()
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._run_heartbeat())
+
+    def _reconcile(self):
+        if self.online:
+            if self._offline_timer is not None:
+                self._offline_timer.cancel()
+                self._offline_timer = None
+            if not self.announced:
+                self.announced = True
+                self._push(self.subscribers, self.status_message())
+        elif self.announced and self._offline_timer is None:
+            self._offline_timer = asyncio.get_running_loop().call_later(settings.PRESENCE_DEBOUNCE, self._offline_due)
+
+    def _offline_due(self):
+        self._offline_timer = None
+        if self.announced and not self.online:
+            self.announced = False
+            self._push(self.subscribers, self.status_message())
+
+    def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self._offline_timer is not None:
+            self._offline_timer.cancel()
+            self._offline_timer = None
+
+    async def _run_heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.PRESENCE_HEARTBEAT)
+            if self.local_admins:
+                await self._report()
+            # Also on nodes without admins: a crashed node's reports only
+            # age out when someone looks at them
+            self._reconcile()
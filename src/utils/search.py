@@ -0,0 +1,150 @@
+"""
+Text search over the dua, hadith, article and Allah-name collections.
+
+Searches go through the MongoDB text index that `database.init_db` creates
+on each collection's search fields (TEXT_INDEXES), instead of an `$or` of
+unanchored case-insensitive regexes that no index can serve. The index is
+case- and diacritic-insensitive, so tashkeel and hamza carriers in either
+the stored Arabic or the query do not matter; `text_search` additionally
+strips tatweel from the query and drops unbalanced quotes, so user input
+can only ever be words, "quoted phrases" and -negations.
+
+The text index only matches whole words ("forgive" does not find
+"forgiveness"). When no document contains any word of the query,
+`search_filter` falls back to the escaped case-insensitive substring match
+over the same fields that the endpoints used to run. That path is a scan,
+but it is only taken for queries the index cannot answer.
+
+Ranked search results (ids in textScore order) and the fallback decision
+are cached for SEARCH_CACHE_TTL seconds per collection/query/window. The
+cache is per process: a write drops this worker's entries, but other
+workers keep theirs until the TTL runs out, so SEARCH_CACHE_TTL is the only
+bound on staleness across workers.
+"""
+import logging
+import re
+from typing import Dict, List, Optional
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from ..config import settings
+from .cache import CacheEngine
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERY_LENGTH = 200
+TATWEEL = "\u0640"
+SCORE = {"score": {"$meta": "textScore"}}
+
+# collection -> {field: weight}; titles and names outrank long bodies
+TEXT_INDEXES: Dict[str, Dict[str, int]] = {
+    "duas": {"title": 10, "transliteration": 5, "arabic": 5, "translation": 2},
+    "hadiths": {"translation": 5, "arabic": 5, "narrator": 3, "book": 3},
+    "articles": {"title": 10, "excerpt": 5, "author": 3, "content": 1},
+    "allah_names": {"transliteration": 10, "arabic": 10, "meaning": 5},
+}
+
+_results = CacheEngine(max_entries=4096, max_bytes=16 * 1024 * 1024)
+
+
+def text_search(q: Optional[str]) -> Optional[str]:
+    """Clean user input into a `$search` string, or None when nothing is left"""
+    q = (q or "")[:MAX_QUERY_LENGTH].replace(TATWEEL, "").strip()
+    if q.count('"') % 2:
+        q = q.replace('"', " ")
+    return q if q.strip(' "-') else None
+
+
+def text_filter(q: Optional[str]) -> dict:
+    search = text_search(q)
+    return {"$text": {"$search": search}} if search else {}
+
+
+def literal_regex(q: str) -> dict:
+    """Case-insensitive substring match of `q` as literal text (regex syntax
+    escaped); an unindexed scan, so only for fallbacks and small collections"""
+    return {"$regex": re.escape(q.strip()[:MAX_QUERY_LENGTH]), "$options": "i"}
+
+
+async def search_filter(db: AsyncIOMotorDatabase, collection: str, q: Optional[str]) -> dict:
+    """`$text` filter for `q`, or the substring fallback when the text index
+    has no document with any of its words; {} for an empty query"""
+    query = text_filter(q)
+    if not query:
+        return {}
+
+    async def indexed():
+        return await db[collection].find_one(query, {"_id": 1}) is not None
+
+    if await _results.get_or_load(f"{collection}:indexed:{query!r}", indexed, ttl=settings.SEARCH_CACHE_TTL):
+        return query
+    pattern = literal_regex(text_search(q))
+    return {"$or": [{field: pattern} for field in TEXT_INDEXES[collection]]}
+
+
+async def ranked_ids(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    q: str,
+    extra: Optional[dict] = None,
+    skip: int = 0,
+    limit: int = 50,
+) -> List[ObjectId]:
+    """Ids matching `q` (and `extra`), best textScore first; cached"""
+    query = await search_filter(db, collection, q)
+    if not query:
+        return []
+    ranked = "$text" in query
+    query.update(extra or {})
+
+    async def load():
+        if ranked:
+            cursor = db[collection].find(query, {"_id": 1, **SCORE}).sort([("score", SCORE["score"])])
+        else:
+            cursor = db[collection].find(query, {"_id": 1})
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [doc["_id"] async for doc in cursor]
+
+    key = f"{collection}:{query!r}:{skip}:{limit}"
+    return await _results.get_or_load(key, load, ttl=settings.SEARCH_CACHE_TTL)
+
+
+async def ranked_docs(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    q: str,
+    extra: Optional[dict] = None,
+    skip: int = 0,
+    limit: int = 50,
+) -> List[dict]:
+    """Full documents for `ranked_ids`, in rank order; counters stay current
+    because only the ranking is cached"""
+    ids = await ranked_ids(db, collection, q, extra, skip, limit)
+    if not ids:
+        return []
+    docs = {doc["_id"]: doc async for doc in db[collection].find({"_id": {"$in": ids}})}
+    return [docs[id] for id in ids if id in docs]
+
+
+def invalidate(collection: str):
+    _results.invalidate(f"{collection}:")
+
+
+async def create_text_indexes(db: AsyncIOMotorDatabase):
+    for collection, weights in TEXT_INDEXES.items():
+        try:
+            # No stemming (the fields mix Arabic, transliteration and
+            # English), and a language_override no document uses, so a
+            # stray `language` field can't break inserts
+            await db[collection].create_index(
+                [(field, "text") for field in weights],
+                weights=weights,
+                default_language="none",
+                language_override="text_language",
+                name=f"{collection}_text",
+            )
+        except Exception as e:
+            logger.warning(f"Text index creation warning for {collection}: {e}")
+
@@ -0,0 +1,89 @@
+"""Persistent second cache tier for upstream API responses, backed by MongoDB"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Optional, Tuple
+from pymongo import UpdateOne
+from .. import database
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "upstream_cache"
+_pending: set = set()
+
+
+def _collection():
+    # Persistence is best-effort: without a database the memory tier still works
+    if database.db is None:
+        return None
+    return database.db[COLLECTION]
+
+
+def _doc_id(kind: str, key: str) -> str:
+    return f"{kind}:{key}"
+
+
+async def load(kind: str, key: str) -> Optional[Tuple[Any, datetime]]:
+    """Return (value, expires_at) for a persisted entry that has not expired"""
+    collection = _collection()
+    if collection is None:
+        return None
+    try:
+        doc = await collection.find_one({"_id": _doc_id(kind, key), "expires_at": {"$gt": datetime.utcnow()}})
+    except Exception as e:
+        logger.warning(f"Upstream cache read failed for {kind}:{key}: {e}")
+        return None
+    return (doc["value"], doc["expires_at"]) if doc else None
+
+
+async def _write(ops: list):
+    collection = _collection()
+    if collection is None or not ops:
+        return
+    try:
+        await collection.bulk_write(ops, ordered=False)
+    except Exception as e:
+        logger.warning(f"Upstream cache write failed ({len(ops)} entries): {e}")
+
+
+def store_many(kind: str, items: Iterable[Tuple[str, Any]], expires_at: datetime):
+    """Persist entries in the background so the request path never waits on Mongo"""
+    ops = [
+        UpdateOne(
+            {"_id": _doc_id(kind, key)},
+            {"$set": {"kind": kind, "key": key, "value": value, "expires_at": expires_at}},
+            upsert=True,
+        )
+        for key, value in items
+    ]
+    if not ops or _collection() is None:
+        return
+    task = asyncio.create_task(_write(ops))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def store(kind: str, key: str, value: Any, ttl: timedelta):
+    store_many(kind, [(key, value)], datetime.utcnow() + ttl)
+
+
+async def warm(kind: str, apply: Callable[[str, Any, datetime], None]) -> int:
+    """Stream every live entry of `kind` into the memory tier via `apply`"""
+    collection = _collection()
+    if collection is None:
+        return 0
+    count = 0
+    try:
+        cursor = collection.find({"kind": kind, "expires_at": {"$gt": datetime.utcnow()}})
+        async for doc in cursor:
+            apply(doc["key"], doc["value"], doc["expires_at"])
+            count += 1
+    except Exception as e:
+        logger.warning(f"Upstream cache warm-up failed for {kind}: {e}")
+    return count
+
+
+async def flush():
+    """Wait for queued writes (called on shutdown)"""
+    if _pending:
+        await asyncio.gather(*list(_pending), return_exceptions=True)
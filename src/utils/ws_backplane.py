@@ -0,0 +1,222 @@
+"""
+Pub/sub backplane for ConnectionManager.
+
+Sockets only exist in the worker that accepted them, so broadcasts go
+through a backplane: `publish(channel, message)` must end in
+`deliver(channel, message)` on every node, this one included, and each node
+then writes to its own sockets.
+
+    memory  InProcessBackplane, single worker (the default)
+    mongo   MongoBackplane, a capped collection tailed by every worker; works
+            on standalone servers as well as replica sets, and needs nothing
+            beyond the database the app already uses
+
+Other transports (Redis, NATS, ...) implement Backplane and register in
+BACKPLANES. `python -m benchmarks.ws_backplane [workers]` runs a local
+multi-process check against the configured MongoDB.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from .. import database
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str, Any], Awaitable[None]]
+
+# Ephemeral events: a newer one from the same sender replaces one still
+# queued (in a socket's outbox or a backplane's write buffer), and they are
+# dropped rather than a reason to evict when a connection's queue is full
+COALESCED_EVENTS = {"typing"}
+
+
+def coalesce_key(message: Any) -> Optional[tuple]:
+    if not isinstance(message, dict) or message.get("event") not in COALESCED_EVENTS:
+        return None
+    data = message.get("data")
+    sender = None
+    if isinstance(data, dict):
+        sender = data.get("user_id") or data.get("sender_id") or data.get("sender")
+    return (message["event"], str(sender))
+
+
+class Backplane:
+    """Generic pub/sub interface"""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def bind(self, deliver: Deliver):
+        """Set the local delivery callback (done by ConnectionManager)"""
+        self._deliver = deliver
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, message: Any):
+        raise NotImplementedError
+
+
+class InProcessBackplane(Backplane):
+    async def publish(self, channel: str, message: Any):
+        await self._deliver(channel, message)
+
+
+class MongoBackplane(Backplane):
+    """
+    Every published message is delivered locally at once and appended to a
+    capped collection; each worker tails that collection with a tailable
+    await cursor and delivers the entries written by other workers.
+
+    Coalesced events (typing) are not written one by one: the newest per
+    channel and sender is buffered for COALESCE_DELAY seconds and written
+    with insert_many, together with the next regular message if one comes
+    first, so they never overtake it.
+    """
+
+    RETRY_DELAY = 1.0
+    COALESCE_DELAY = 0.05
+    # ObjectIds are minted by each worker's driver, with that host's clock
+    # and one-second resolution, so they only roughly follow insertion
+    # order. The tail filters on _id with this much slack, which bounds the
+    # clock skew tolerated between workers.
+    RESUME_SLACK = timedelta(minutes=5)
+
+    def __init__(self, collection: str, size_bytes: int):
+        super().__init__()
+        self.node_id = uuid.uuid4().hex
+        self.collection_name = collection
+        self.size_bytes = size_bytes
+        self.collection = None
+        self._last_id = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[tuple, dict] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if database.db is None:
+            raise RuntimeError("MongoBackplane needs a database connection")
+        try:
+            await database.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass
+        self.collection = database.db[self.collection_name]
+        # A tailable cursor on an empty capped collection dies at once, so
+        # make sure there is an entry to start after.
+        last = await self.collection.find_one({}, sort=[("$natural", -1)])
+        if last is None:
+            result = await self.collection.insert_one({"node": self.node_id, "channel": None})
+            self._last_id = result.inserted_id
+        else:
+            self._last_id = last["_id"]
+        self._task = asyncio.create_task(self._tail())
+        logger.info(f"Mongo WebSocket backplane started (node {self.node_id})")
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        await self._insert(self._take_pending())
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, channel: str, message: Any):
+        await self._deliver(channel, message)
+        entry = {"node": self.node_id, "channel": channel, "message": message}
+        key = coalesce_key(message)
+        if key is not None:
+            self._pending[(channel, *key)] = entry
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
+            return
+        await self._insert([*self._take_pending(), entry])
+
+    def _take_pending(self) -> list:
+        pending = list(self._pending.values())
+        self._pending.clear()
+        return pending
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.COALESCE_DELAY)
+        finally:
+            self._flush_task = None
+        await self._insert(self._take_pending())
+
+    async def _insert(self, entries: list):
+        if not entries:
+            return
+        try:
+            await self.collection.insert_many(entries)
+        except Exception as e:
+            channels = ", ".join(sorted({entry["channel"] for entry in entries}))
+            logger.warning(f"Backplane publish to {channels} failed: {e}")
+
+    def _resume_filter(self) -> dict:
+        if self._last_id is None:
+            return {}
+        return {"_id": {"$gt": ObjectId.from_datetime(self._last_id.generation_time - self.RESUME_SLACK)}}
+
+    async def _tail(self):
+        while True:
+            # The server only returns entries from around our position on,
+            # instead of the whole collection on every reconnect. Those are
+            # walked in natural (insertion) order, skipping up to the last
+            # entry already seen, since _ids from different workers do not
+            # order exactly.
+            skipping = self._last_id is not None
+            try:
+                cursor = self.collection.find(self._resume_filter(), cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for doc in cursor:
+                        if skipping:
+                            skipping = doc["_id"] != self._last_id
+                            continue
+                        self._last_id = doc["_id"]
+                        if doc.get("node") == self.node_id or not doc.get("channel"):
+                            continue
+                        try:
+                            await self._deliver(doc["channel"], doc.get("message"))
+                        except Exception as e:
+                            logger.warning(f"Backplane delivery on {doc['channel']} failed: {e}")
+                    if skipping:
+                        # Reached the end without meeting our last entry: it was
+                        # overwritten while we were disconnected; resume from the
+                        # newest entry.
+                        logger.warning("Backplane lost its position in the capped collection; some messages were missed")
+                        skipping = False
+                        newest = await self.collection.find_one({}, sort=[("$natural", -1)])
+                        if newest is not None:
+                            self._last_id = newest["_id"]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Backplane tail interrupted: {e}")
+            await asyncio.sleep(self.RETRY_DELAY)
+
+
+BACKPLANES: Dict[str, Callable[[], Backplane]] = {
+    "memory": InProcessBackplane,
+    "mongo": lambda: MongoBackplane(settings.WS_BACKPLANE_COLLECTION, settings.WS_BACKPLANE_SIZE_BYTES),
+}
+
+
+def create_backplane(name: str) -> Backplane:
+    try:
+        return BACKPLANES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown WebSocket backplane '{name}' (expected one of {', '.join(BACKPLANES)})")
+
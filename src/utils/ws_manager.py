@@ -1,78 +1,279 @@
-from typing import Dict, Set, Any
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Dict, Optional, Set, Any
 from fastapi import WebSocket, WebSocketDisconnect
+from ..config import settings
+from .presence import PRESENCE_CHANNEL, AdminPresence
+from .ws_backplane import Backplane, InProcessBackplane, coalesce_key
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ADMINS_CHANNEL = "admins"
+ROOM_CHANNEL_PREFIX = "room:"
+# Push-only rooms that never show admin presence
+NOTIFICATION_ROOM_PREFIX = "notifications:"
+SLOW_CONSUMER_CLOSE_CODE = 1013  # "try again later"
+
+
+def encode_message(message: Any) -> str:
+    """Encode a message once for every recipient (same output shape as
+    WebSocket.send_json); values JSON has no type for (a stray ObjectId)
+    are sent as strings"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(message, default=str).decode("utf-8")
+        except TypeError:
+            pass  # e.g. non-string dict keys, which json coerces
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class Outbox:
+    """
+    Bounded outbound queue for one socket, drained by its own writer task.
+    Broadcasting only appends here, so one slow client never holds up the
+    others; a client that lets the queue fill up with regular messages, or
+    takes longer than WS_SEND_TIMEOUT for one send, is reported through
+    `on_slow` and evicted.
+    """
+
+    def __init__(self, websocket: WebSocket, room: Optional[str], on_slow):
+        self.websocket = websocket
+        self.room = room
+        self.on_slow = on_slow
+        self.max_size = settings.WS_OUTBOX_SIZE
+        self.send_timeout = settings.WS_SEND_TIMEOUT
+        self.queue = deque()
+        self.dropped = 0
+        self.evicted = False
+        self._coalesce_slots: Dict[tuple, list] = {}
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, message: Any, encoded: Optional[str] = None):
+        """Queue `message`; pass `encoded` (from encode_message) when it is shared by many sockets"""
+        if self.evicted:
+            return
+        if encoded is None:
+            encoded = encode_message(message)
+        key = coalesce_key(message)
+        if key is not None:
+            slot = self._coalesce_slots.get(key)
+            if slot is not None:
+                slot[0] = encoded
+                return
+            if len(self.queue) >= self.max_size:
+                self.dropped += 1
+                return
+            slot = self._coalesce_slots[key] = [encoded]
+            self.queue.append((key, slot))
+        else:
+            if len(self.queue) >= self.max_size:
+                self._evict(f"outbound queue full ({self.max_size})")
+                return
+            self.queue.append((None, [encoded]))
+        self._ready.set()
+
+    def _evict(self, reason: str):
+        if not self.evicted:
+            self.evicted = True
+            self.queue.clear()
+            self.on_slow(self, reason)
+
+    def close(self):
+        self.evicted = True
+        self.queue.clear()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            while not self.queue:
+                self._ready.clear()
+                await self._ready.wait()
+            key, slot = self.queue.popleft()
+            if key is not None:
+                self._coalesce_slots.pop(key, None)
+            try:
+                await asyncio.wait_for(self.websocket.send_text(slot[0]), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._evict(f"send took longer than {self.send_timeout}s")
+                return
+            except Exception as e:
+                self._evict(f"send failed: {e}")
+                return
+
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         self.admin_connections: Set[WebSocket] = set()
+        self.outboxes: Dict[WebSocket, Outbox] = {}
+        self.backplane: Backplane = InProcessBackplane()
+        self.backplane.bind(self._deliver)
+        self.presence = AdminPresence(
+            lambda message: self.backplane.publish(PRESENCE_CHANNEL, message),
+            self._push,
+        )
+
+    async def use_backplane(self, backplane: Backplane):
+        """Route broadcasts through `backplane` so they reach sockets held by other workers"""
+        backplane.bind(self._deliver)
+        await backplane.start()
+        previous, self.backplane = self.backplane, backplane
+        await previous.stop()
+
+    async def close(self):
+        self.presence.stop()
+        await self.backplane.stop()
+
+    def _open_outbox(self, websocket: WebSocket, room: Optional[str]):
+        self.outboxes[websocket] = Outbox(websocket, room, self._on_slow_consumer)
+
+    def _close_outbox(self, websocket: WebSocket):
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox is not None:
+            outbox.close()
+
+    def _on_slow_consumer(self, outbox: Outbox, reason: str):
+        logger.warning("Evicting slow WebSocket consumer", extra={"room": outbox.room, "reason": reason, "dropped": outbox.dropped})
+        asyncio.create_task(self._evict(outbox))
+
+    async def _evict(self, outbox: Outbox):
+        websocket = outbox.websocket
+        if outbox.room is None:
+            await self.disconnect_admin_async(websocket)
+        else:
+            await self.disconnect_async(outbox.room, websocket)
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
 
     async def connect(self, room: str, websocket: WebSocket):
         await websocket.accept()
         conns = self.active_connections.setdefault(room, set())
         conns.add(websocket)
-        print(f"WS DEBUG: User connected to room {room}. Total connections in room: {len(conns)}")
+        self._open_outbox(websocket, room)
+        if not room.startswith(NOTIFICATION_ROOM_PREFIX):
+            self.presence.subscribe(websocket)
+        logger.debug("WebSocket connected", extra={"room": room, "room_size": len(conns)})
         await self.broadcast_to_admins({"event": "user_status", "data": {"conversation_id": room, "status": "online"}})
 
     async def connect_admin(self, websocket: WebSocket):
         await websocket.accept()
         self.admin_connections.add(websocket)
-        print(f"WS DEBUG: Admin connected. Total admins: {len(self.admin_connections)}")
-        for room in self.active_connections:
-            await self.broadcast_room(room, {"event": "admin_status", "data": {"status": "online"}})
+        self._open_outbox(websocket, None)
+        logger.debug("Admin WebSocket connected", extra={"admins": len(self.admin_connections)})
+        await self.presence.admin_connected()
 
     def disconnect(self, room: str, websocket: WebSocket):
+        self._close_outbox(websocket)
+        self.presence.unsubscribe(websocket)
         conns = self.active_connections.get(room)
         if conns and websocket in conns:
             conns.remove(websocket)
-            print(f"WS DEBUG: User disconnected from room {room}. Remaining: {len(conns)}")
+            logger.debug("WebSocket disconnected", extra={"room": room, "room_size": len(conns)})
             if not conns:
                 del self.active_connections[room]
 
     async def disconnect_async(self, room: str, websocket: WebSocket):
+         self._close_outbox(websocket)
+         self.presence.unsubscribe(websocket)
          conns = self.active_connections.get(room)
          if conns and websocket in conns:
             conns.remove(websocket)
-            print(f"WS DEBUG: User disconnected (async) from room {room}")
+            logger.debug("WebSocket disconnected", extra={"room": room, "room_size": len(conns)})
             if not conns:
                 del self.active_connections[room]
                 await self.broadcast_to_admins({"event": "user_status", "data": {"conversation_id": room, "status": "offline"}})
 
     def disconnect_admin(self, websocket: WebSocket):
+        self._close_outbox(websocket)
         if websocket in self.admin_connections:
             self.admin_connections.remove(websocket)
-            print(f"WS DEBUG: Admin disconnected. Remaining: {len(self.admin_connections)}")
+            logger.debug("Admin WebSocket disconnected", extra={"admins": len(self.admin_connections)})
+            asyncio.create_task(self.presence.admin_disconnected())
 
     async def disconnect_admin_async(self, websocket: WebSocket):
+        self._close_outbox(websocket)
         if websocket in self.admin_connections:
             self.admin_connections.remove(websocket)
-            print(f"WS DEBUG: Admin disconnected (async). Remaining: {len(self.admin_connections)}")
-            for room in self.active_connections:
-                 await self.broadcast_room(room, {"event": "admin_status", "data": {"status": "offline"}})
+            logger.debug("Admin WebSocket disconnected", extra={"admins": len(self.admin_connections)})
+            await self.presence.admin_disconnected()
 
     async def send_personal(self, websocket: WebSocket, message: Any):
-        await websocket.send_json(message)
+        outbox = self.outboxes.get(websocket)
+        if outbox is None:
+            await websocket.send_json(message)
+        else:
+            outbox.put(message)
 
     async def broadcast_to_admins(self, message: Any):
-        print(f"WS DEBUG: Broadcasting to {len(self.admin_connections)} admins: {message}")
-        for conn in list(self.admin_connections):
-            try:
-                await conn.send_json(message)
-            except Exception as e:
-                print(f"WS DEBUG: Failed to send to admin: {e}")
-                pass
+        await self.backplane.publish(ADMINS_CHANNEL, message)
 
     async def broadcast_room(self, room: str, message: Any):
-        print(f"WS DEBUG: Broadcasting to room {room}: {message}")
-        conns = self.active_connections.get(room, set())
-        for conn in list(conns):
-            try:
-                await conn.send_json(message)
-            except Exception as e:
-                print(f"WS DEBUG: Failed to send to room user: {e}")
-                pass
-        
-        # Send to all admins
-        await self.broadcast_to_admins(message)
+        await self.backplane.publish(ROOM_CHANNEL_PREFIX + room, message)
+
+    def _push(self, sockets, message: Any):
+        """Queue one message, encoded once, on the given sockets"""
+        try:
+            encoded = encode_message(message)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Dropping unencodable message: {e}")
+            return
+        for conn in list(sockets):
+            outbox = self.outboxes.get(conn)
+            if outbox is not None:
+                outbox.put(message, encoded)
+
+    async def _deliver(self, channel: str, message: Any):
+        """Backplane callback: queue a published message on this worker's sockets"""
+        if channel == PRESENCE_CHANNEL:
+            self.presence.on_message(message)
+            return
+        try:
+            encoded = encode_message(message)
+        except (TypeError, ValueError) as e:
+            # Never let one unencodable message fail the publisher (whose
+            # database write has already happened)
+            logger.error(f"Dropping unencodable message on {channel}: {e}")
+            return
+        room = channel[len(ROOM_CHANNEL_PREFIX):] if channel.startswith(ROOM_CHANNEL_PREFIX) else None
+        if room is not None:
+            self._send_room(room, message, encoded)
+        # Chat room traffic is mirrored to every admin; notification rooms
+        # are not (a fan-out would flood every admin outbox), their sender
+        # publishes a summary to the admins channel instead
+        if room is None or not room.startswith(NOTIFICATION_ROOM_PREFIX):
+            self._send_admins(message, encoded)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Broadcast queued", extra={
+                "channel": channel,
+                "event": message.get("event") if isinstance(message, dict) else None,
+                "room_size": len(self.active_connections.get(room, ())) if room is not None else 0,
+                "admins": len(self.admin_connections),
+                "bytes": len(encoded),
+            })
+
+    def _send_admins(self, message: Any, encoded: str):
+        for conn in list(self.admin_connections):
+            outbox = self.outboxes.get(conn)
+            if outbox is not None:
+                outbox.put(message, encoded)
+
+    def _send_room(self, room: str, message: Any, encoded: str):
+        for conn in list(self.active_connections.get(room, ())):
+            outbox = self.outboxes.get(conn)
+            if outbox is not None:
+                outbox.put(message, encoded)
 
 manager = ConnectionManager()
 